@@ -1,29 +1,31 @@
+from functools import cache
 from typing import Dict
-from django.contrib.auth.models import AnonymousUser
-from django.db.models import Q
+from django.conf import settings
+from django.urls import reverse
 
-from complaints.models import Complaint
+from complaints.notifications import count_for_key, stream_key
 
 
-def notifications(request) -> Dict[str, int]:
+def notifications(request) -> Dict[str, object]:
     """Provide notifications_count for staff roles.
     Counts OPEN complaints in the staff member's department (plus admins see all).
+
+    The count is a memoized callable: templates call it only when they actually
+    read ``notifications_count``, and the number itself comes from the cache.
+    ``notifications_stream`` is the URL of the badge's server-sent event stream.
     """
     user = getattr(request, 'user', None)
-    if not user or isinstance(user, AnonymousUser) or not user.is_authenticated:
+    # Neither isinstance() nor truthiness: both load the full row behind a
+    # cached SlimUser
+    if user is None or not user.is_authenticated:
         return {}
 
-    role = getattr(user, 'role', 'STUDENT')
-    dept = (getattr(user, 'department', '') or '').strip()
-
-    qs = Complaint.objects.filter(status='OPEN')
-    if role in ['FACULTY', 'HOD']:
-        if dept:
-            qs = qs.filter(Q(student__department__iexact=dept) | Q(student__department__isnull=True) | Q(student__department__exact=''))
-        count = qs.count()
-    elif role == 'ADMIN':
-        count = qs.count()
-    else:
+    key = stream_key(user)
+    if key is None:
         return {}
 
-    return {'notifications_count': int(count)}
+    context = {'notifications_count': cache(lambda: count_for_key(key))}
+    if settings.ASYNC_VIEWS:
+        # Under ASGI the badge is filled (and kept current) by the event stream
+        context['notifications_stream'] = reverse('notifications_stream')
+    return context
@@ -0,0 +1,281 @@
+import csv
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from accounts.models import User, STREAM_CHOICES
+from accounts.registration import WORKING_AT_VALUES, is_valid_mobile, normalize_phone, staff_profile
+from complaints import routing
+
+STREAMS = {key for key, _ in STREAM_CHOICES}
+# The staff form's working_at keys, also accepted as the stored values
+WORKING_AT_KEYS = {**{value: key for key, value in WORKING_AT_VALUES.items()}, **{key: key for key in WORKING_AT_VALUES}}
+
+
+def _init_worker():
+    # Spawned workers (Windows, macOS) start without Django configured
+    import django
+    django.setup()
+
+
+def _hash_password(item):
+    """Validate and hash one password in a pool worker: ``(hash, None)`` or ``(None, reason)``."""
+    password, attributes = item
+    try:
+        validate_password(password, user=User(**attributes))
+    except ValidationError as e:
+        return None, ' '.join(e.messages)
+    return make_password(password), None
+
+
+def registered_emails(users) -> set:
+    """Lower-cased emails of ``users`` that an existing account already uses."""
+    emails = {user.email.lower() for user in users}
+    return set(
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=emails).values_list('email_lower', flat=True)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-import students and staff from a CSV or JSONL file with the registration '
+        'forms\' validation rules, hashing passwords across a process pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv with a header row, or .jsonl with one object per line.')
+        parser.add_argument(
+            '--kind', choices=['student', 'staff'],
+            help='Account kind for rows without a "kind" column.',
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Password hashing processes (1 hashes in this process).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rejects', help='Write rejected rows to this CSV file.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and hash, but insert nothing.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist.')
+        self.kind = options['kind']
+        self.rejected = []
+        self.seen_usernames, self.seen_emails = set(), set()
+        imported = {'student': 0, 'staff': 0}
+
+        pool = None
+        if options['workers'] > 1:
+            pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker)
+        try:
+            rows = self.read(path)
+            while batch := list(islice(rows, options['batch_size'])):
+                users = self.check_batch(batch)
+                users = self.hash_passwords(users, pool, options['workers'])
+                if not options['dry_run']:
+                    users = self.insert(users)
+                for _, user in users:
+                    imported['student' if user.role == 'STUDENT' else 'staff'] += 1
+        finally:
+            if pool:
+                pool.shutdown()
+
+        if imported['staff'] and not options['dry_run']:
+            # bulk_create sends no post_save; new staff join the routing index
+            routing.staff_changed()
+        self.report(imported, options)
+
+    def read(self, path):
+        """``(line number, row dict)`` for every record in ``path``."""
+        with path.open(newline='', encoding='utf-8-sig') as handle:
+            if path.suffix.lower() == '.csv':
+                # Line 1 is the header
+                for number, row in enumerate(csv.DictReader(handle), start=2):
+                    yield number, row
+            elif path.suffix.lower() in ('.jsonl', '.ndjson'):
+                for number, line in enumerate(handle, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        self.reject(number, '', f'Invalid JSON: {e.msg}.')
+                        continue
+                    if not isinstance(row, dict):
+                        self.reject(number, '', 'Expected a JSON object.')
+                        continue
+                    yield number, row
+            else:
+                raise CommandError('Expected a .csv or .jsonl file.')
+
+    def reject(self, line, username, reason):
+        self.rejected.append((line, username, reason))
+
+    def build(self, line, row):
+        """``(User, password)`` for a valid row, or None after recording why not."""
+        # JSONL values may be numbers or lists; CSV values are all strings
+        text = {
+            key: value if isinstance(value, list) else ('' if value is None else str(value).strip())
+            for key, value in row.items() if key
+        }
+        kind = (text.get('kind') or self.kind or '').lower()
+        if kind not in ('student', 'staff'):
+            self.reject(line, '', 'Unknown kind; use a "kind" column or --kind.')
+            return None
+        username = text.get('enrollment_number' if kind == 'student' else 'college_id', '')
+        email = text.get('email', '')
+        phone_digits = normalize_phone(text.get('phone', ''))
+        # Unstripped, as the form takes it
+        password = '' if row.get('password') is None else str(row['password'])
+
+        if not username:
+            self.reject(line, '', 'Enrollment number is required.' if kind == 'student' else 'Member ID is required.')
+            return None
+        if not is_valid_mobile(phone_digits):
+            self.reject(line, username, 'Enter a valid 10-digit mobile number.')
+            return None
+        try:
+            validate_email(email)
+        except ValidationError:
+            self.reject(line, username, 'Enter a valid email address.')
+            return None
+        if not password:
+            self.reject(line, username, 'Password is required.')
+            return None
+
+        fields = {
+            'username': username,
+            'first_name': text.get('first_name', ''),
+            'last_name': text.get('last_name', ''),
+            'phone': phone_digits,
+            'email': email,
+        }
+        if kind == 'student':
+            stream = text.get('stream', '').upper()
+            if stream not in STREAMS:
+                self.reject(line, username, f'Unknown stream "{stream}".')
+                return None
+            fields.update(role='STUDENT', enrollment_number=username, stream=stream, department=stream)
+        else:
+            working_at = text.get('working_at', '')
+            if working_at and working_at not in WORKING_AT_KEYS:
+                self.reject(line, username, f'Unknown working_at "{working_at}".')
+                return None
+            streams = text.get('faculty_streams') or []
+            if isinstance(streams, str):
+                streams = [s.strip() for s in re.split(r'[;,]', streams) if s.strip()]
+            profile = staff_profile({**text, 'working_at': WORKING_AT_KEYS.get(working_at, '')}, streams)
+            fields.update(college_id=username, **profile)
+        return User(**fields), password
+
+    def check_batch(self, batch):
+        """Valid rows of ``batch`` whose username and email are new, as ``(line, user, password)``."""
+        candidates = []
+        for line, row in batch:
+            built = self.build(line, row)
+            if built is None:
+                continue
+            user, password = built
+            email = user.email.lower()
+            # Earlier rows of the file win
+            if user.username in self.seen_usernames:
+                self.reject(line, user.username, 'Duplicate username in this file.')
+                continue
+            if email in self.seen_emails:
+                self.reject(line, user.username, 'Duplicate email in this file.')
+                continue
+            self.seen_usernames.add(user.username)
+            self.seen_emails.add(email)
+            candidates.append((line, user, password))
+
+        usernames = {user.username for _, user, _ in candidates}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = registered_emails(user for _, user, _ in candidates)
+        fresh = []
+        for line, user, password in candidates:
+            if user.username in taken_usernames:
+                self.reject(line, user.username, 'Username already registered.')
+            elif user.email.lower() in taken_emails:
+                self.reject(line, user.username, 'Email already registered.')
+            else:
+                fresh.append((line, user, password))
+        return fresh
+
+    def hash_passwords(self, users, pool, workers):
+        """Run the password validators and hasher, in ``pool`` if given; returns ``(line, user)``."""
+        items = [
+            (password, {'username': user.username, 'email': user.email, 'first_name': user.first_name,
+                        'last_name': user.last_name})
+            for _, user, password in users
+        ]
+        if pool:
+            chunksize = max(1, len(items) // (workers * 4))
+            results = pool.map(_hash_password, items, chunksize=chunksize)
+        else:
+            results = map(_hash_password, items)
+        hashed = []
+        for (line, user, _), (password_hash, reason) in zip(users, results):
+            if reason:
+                self.reject(line, user.username, reason)
+                continue
+            user.password = password_hash
+            hashed.append((line, user))
+        return hashed
+
+    def insert(self, users):
+        try:
+            with transaction.atomic():
+                # Email is not unique in the schema, so look again for ones
+                # registered since check_batch
+                if not registered_emails(user for _, user in users):
+                    User.objects.bulk_create([user for _, user in users])
+                    return users
+        except IntegrityError:
+            pass
+        # Someone registered one of these meanwhile; find out which, row by row
+        inserted = []
+        for line, user in users:
+            user.pk = None
+            reason = None
+            try:
+                with transaction.atomic():
+                    if User.objects.filter(email__iexact=user.email).exists():
+                        reason = 'Email already registered.'
+                    else:
+                        user.save()
+            except IntegrityError as exc:
+                if User.objects.filter(username=user.username).exists():
+                    reason = 'Username already registered.'
+                else:
+                    reason = f'Database error: {exc}'
+            if reason:
+                self.reject(line, user.username, reason)
+            else:
+                inserted.append((line, user))
+        return inserted
+
+    def report(self, imported, options):
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {imported['student']} students and {imported['staff']} staff; {len(self.rejected)} rows rejected."
+        ))
+        for line, username, reason in sorted(self.rejected)[:20]:
+            self.stdout.write(f'  line {line}: {username or "-"}: {reason}')
+        if len(self.rejected) > 20:
+            self.stdout.write(f'  ... and {len(self.rejected) - 20} more')
+        if options['rejects'] and self.rejected:
+            with open(options['rejects'], 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['line', 'username', 'reason'])
+                writer.writerows(sorted(self.rejected))
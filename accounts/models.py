@@ -1,6 +1,5 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.utils import timezone
 
 STREAM_CHOICES = [
     ("BCA", "BCA"),
@@ -65,9 +64,9 @@ class User(AbstractUser):
     hod_department = models.CharField(max_length=20, choices=DEPARTMENT_GROUP_CHOICES, blank=True)
 
     def can_raise_again(self) -> bool:
-        if not self.last_complaint_at:
-            return True
-        return timezone.now() >= self.last_complaint_at + timezone.timedelta(days=5)
+        """Whether at least one complaint section currently accepts a new complaint."""
+        from complaints import ratelimit
+        return ratelimit.next_available(self) is None
 
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -0,0 +1,58 @@
+"""Field rules shared by the registration forms and ``import_users``."""
+import re
+
+# Staff "working at" options as posted by the staff registration form, with
+# the role that grants their permissions and the value stored on the user
+WORKING_AT_ROLES = {
+    'teachingFaculty': 'FACULTY',
+    'hod': 'HOD',
+    'adminOffice': 'ADMIN',
+    'staffMember': 'STAFF',
+    'infraManager': 'STAFF',
+    'studentCommittee': 'STAFF',
+}
+WORKING_AT_VALUES = {
+    'teachingFaculty': 'TEACHING_FACULTY',
+    'hod': 'HOD',
+    'adminOffice': 'ADMIN_OFFICE',
+    'staffMember': 'STAFF_MEMBER',
+    'infraManager': 'INFRA_MANAGER',
+    'studentCommittee': 'STUDENT_COMMITTEE',
+}
+
+
+def normalize_phone(raw: str) -> str:
+    """Strip non-digits and return just the digits."""
+    return re.sub(r"\D", "", raw or "")
+
+
+def is_valid_mobile(digits: str) -> bool:
+    """Basic 10-digit mobile validation after normalization."""
+    return len(digits) == 10 and digits.isdigit()
+
+
+def staff_profile(data, streams) -> dict:
+    """Role, department and staff attributes for a staff registration.
+
+    ``data`` holds the staff form's fields; ``streams`` the selected faculty streams.
+    """
+    # Map working_at to existing role for permissions
+    working_at = (data.get('working_at') or '').strip()
+
+    # Normalize department selections
+    faculty_department = (data.get('faculty_department') or '').upper()
+    if faculty_department == 'COMPUTING':
+        dept_label = 'Computing'
+    else:
+        dept_label = faculty_department
+
+    return {
+        'role': WORKING_AT_ROLES.get(working_at, 'STAFF'),
+        'department': dept_label,
+        'working_at': WORKING_AT_VALUES.get(working_at, ''),
+        'faculty_department': faculty_department,
+        'faculty_streams': list(streams),
+        'staff_description': data.get('staff_description', ''),
+        'infra_building': (data.get('infra_building') or '').upper(),
+        'hod_department': (data.get('hod_department') or '').upper(),
+    }
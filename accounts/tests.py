@@ -1,3 +1,156 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .management.commands.import_users import Command
+from .models import User
+from .usercache import SlimUser, forget_users
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+STUDENT = {'kind': 'student', 'first_name': 'A', 'last_name': 'B', 'password': 'Tr1cky-pass', 'stream': 'bca'}
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        User.objects.create_user('ENR-TAKEN', email='Taken@Example.com', password='x')
+
+    def write_csv(self, rows):
+        path = self.dir / 'users.csv'
+        fields = sorted({key for row in rows for key in row})
+        with path.open('w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def test_imports_valid_rows_and_reports_rejected_ones(self):
+        path = self.write_csv([
+            {**STUDENT, 'enrollment_number': 'ENR1', 'email': 'one@example.com', 'phone': '98765 43210'},
+            {**STUDENT, 'enrollment_number': 'ENR1', 'email': 'again@example.com', 'phone': '9876543210'},
+            {**STUDENT, 'enrollment_number': 'ENR-TAKEN', 'email': 'new@example.com', 'phone': '9876543210'},
+            {**STUDENT, 'enrollment_number': 'ENR2', 'email': 'taken@example.com', 'phone': '9876543210'},
+            {**STUDENT, 'enrollment_number': 'ENR3', 'email': 'three@example.com', 'phone': '12345'},
+            {**STUDENT, 'enrollment_number': 'ENR4', 'email': 'four@example.com', 'phone': '9876543210',
+             'password': '12345678'},
+            {'kind': 'staff', 'college_id': 'FAC1', 'email': 'fac@example.com', 'phone': '9876543210',
+             'password': 'Tr1cky-pass', 'working_at': 'hod', 'hod_department': 'computing',
+             'faculty_streams': 'BCA;MCA'},
+        ])
+        rejects = self.dir / 'rejects.csv'
+        out = StringIO()
+        call_command('import_users', str(path), '--workers', '1', '--rejects', str(rejects), stdout=out)
+
+        self.assertIn('Imported 1 students and 1 staff; 5 rows rejected.', out.getvalue())
+        student = User.objects.get(username='ENR1')
+        self.assertEqual((student.role, student.stream, student.department, student.phone),
+                         ('STUDENT', 'BCA', 'BCA', '9876543210'))
+        self.assertTrue(student.check_password('Tr1cky-pass'))
+        staff = User.objects.get(username='FAC1')
+        self.assertEqual((staff.role, staff.working_at, staff.hod_department, staff.faculty_streams),
+                         ('HOD', 'HOD', 'COMPUTING', ['BCA', 'MCA']))
+        with rejects.open() as handle:
+            reasons = {row['line']: row['reason'] for row in csv.DictReader(handle)}
+        self.assertEqual(reasons['3'], 'Duplicate username in this file.')
+        self.assertEqual(reasons['4'], 'Username already registered.')
+        self.assertEqual(reasons['5'], 'Email already registered.')
+        self.assertEqual(reasons['6'], 'Enter a valid 10-digit mobile number.')
+        self.assertIn('entirely numeric', reasons['7'])
+
+    def test_registrations_racing_the_import_are_reported_precisely(self):
+        path = self.write_csv([
+            {**STUDENT, 'enrollment_number': 'ENR5', 'email': 'five@example.com', 'phone': '9876543210'},
+            {**STUDENT, 'enrollment_number': 'ENR6', 'email': 'six@example.com', 'phone': '9876543210'},
+            {**STUDENT, 'enrollment_number': 'ENR7', 'email': 'seven@example.com', 'phone': '9876543210'},
+        ])
+        original = Command.hash_passwords
+
+        def register_meanwhile(command, *args):
+            hashed = original(command, *args)
+            # Others sign up between the duplicate checks and the insert
+            User.objects.create_user('ENR5', email='someone@example.com', password='x')
+            User.objects.create_user('OTHER', email='SIX@example.com', password='x')
+            return hashed
+
+        rejects = self.dir / 'rejects.csv'
+        with mock.patch.object(Command, 'hash_passwords', register_meanwhile):
+            call_command('import_users', str(path), '--workers', '1', '--rejects', str(rejects), stdout=StringIO())
+
+        with rejects.open() as handle:
+            reasons = {row['line']: row['reason'] for row in csv.DictReader(handle)}
+        self.assertEqual(reasons, {'2': 'Username already registered.', '3': 'Email already registered.'})
+        self.assertEqual(User.objects.filter(email__iexact='six@example.com').count(), 1)
+        self.assertTrue(User.objects.filter(username='ENR7').exists())
+
+    def test_jsonl_hashed_in_a_process_pool(self):
+        path = self.dir / 'staff.jsonl'
+        with path.open('w') as handle:
+            for n in range(6):
+                handle.write(json.dumps({
+                    'college_id': f'STAFF{n}', 'email': f'staff{n}@example.com', 'phone': 9876543210,
+                    'password': f'Tr1cky-pass-{n}', 'working_at': 'ADMIN_OFFICE',
+                }) + '\n')
+            handle.write('not json\n')
+        out = StringIO()
+        call_command('import_users', str(path), '--kind', 'staff', '--workers', '2', '--batch-size', '4', stdout=out)
+
+        self.assertIn('Imported 0 students and 6 staff; 1 rows rejected.', out.getvalue())
+        self.assertEqual(User.objects.filter(role='ADMIN', working_at='ADMIN_OFFICE').count(), 6)
+        self.assertTrue(User.objects.get(username='STAFF5').check_password('Tr1cky-pass-5'))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RegistrationTests(TestCase):
+    def test_staff_form_maps_working_at_to_role(self):
+        self.client.post('/register/staff/', {
+            'college_id': 'HOD1', 'first_name': 'H', 'last_name': 'D', 'email': 'hod@example.com', 'phone': '98765-43210',
+            'password': 'Tr1cky-pass', 'confirm_password': 'Tr1cky-pass', 'working_at': 'hod',
+            'hod_department': 'sst', 'faculty_department': 'computing', 'faculty_streams': ['BCA', 'MCA'],
+        })
+        user = User.objects.get(username='HOD1')
+        self.assertEqual(
+            (user.role, user.working_at, user.department, user.hod_department, user.faculty_streams, user.phone),
+            ('HOD', 'HOD', 'Computing', 'SST', ['BCA', 'MCA'], '9876543210'),
+        )
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('CACHED1', password='x', role='STUDENT', department='BCA', first_name='Asha')
+        self.client.force_login(self.user)
+        self.client.get('/dashboard/')
+
+    def test_warm_requests_use_the_cached_profile(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/complaints/new/')
+        user = response.wsgi_request.user
+        self.assertIsInstance(user._wrapped, SlimUser)
+        self.assertEqual((user.pk, user.role, user.department), (self.user.pk, 'STUDENT', 'BCA'))
+        # Anything outside the profile loads the row
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'CACHED1')
+
+    def test_profile_credit_and_password_changes_drop_it(self):
+        self.user.first_name = 'Bela'
+        self.user.save()
+        self.assertContains(self.client.get('/dashboard/'), 'Welcome, Bela!')
+
+        User.objects.filter(pk=self.user.pk).update(credits=42)
+        forget_users([self.user.pk])
+        self.assertContains(self.client.get('/dashboard/'), '42')
+
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertRedirects(self.client.get('/dashboard/'), '/login/?next=/dashboard/', fetch_redirect_response=False)
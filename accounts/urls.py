@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -8,5 +9,5 @@ urlpatterns = [
     path('register/staff/', views.register_staff, name='register_staff'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', views.dashboard_async if settings.ASYNC_VIEWS else views.dashboard, name='dashboard'),
 ]
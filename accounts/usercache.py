@@ -0,0 +1,117 @@
+"""Cached user profile behind ``request.user``.
+
+For a session whose user is in the cache, ``request.user`` is a
+:class:`SlimUser`: the id, role and department (plus the few fields the
+dashboards print) come from one cache read, and the full row is only loaded
+when something else is touched, e.g. saving it, admin permissions or a
+foreign-key assignment. Together with the ``cached_db`` session engine an
+ordinary page view reads neither ``django_session`` nor ``accounts_user``.
+
+The entry carries the session auth hash, so a password change still ends the
+user's other sessions. It is dropped whenever the row changes: on save and
+delete (``accounts.signals``) and by bulk credit updates (``forget_users``).
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import LazyObject, SimpleLazyObject, empty
+
+PROFILE_FIELDS = ('id', 'role', 'department', 'first_name', 'credits', 'last_complaint_at')
+
+
+def _key(user_id) -> str:
+    return f'auth:user:{user_id}'
+
+
+def remember(user) -> None:
+    profile = {name: getattr(user, name) for name in PROFILE_FIELDS}
+    profile['session_hash'] = user.get_session_auth_hash()
+    cache.set(_key(user.pk), profile, settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def forget_users(user_ids) -> None:
+    keys = [_key(pk) for pk in user_ids]
+    cache.delete_many(keys)
+    # Again once committed, in case a request re-cached the old row meanwhile
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _profile_field(name):
+    def get(self):
+        if self._wrapped is empty:
+            return self._profile[name]
+        return getattr(self._wrapped, name)
+    return property(get)
+
+
+class SlimUser(LazyObject):
+    """A logged-in user served from the cached profile; loads the row on demand."""
+    is_authenticated = True
+    is_anonymous = False
+    pk = _profile_field('id')
+    id = _profile_field('id')
+    role = _profile_field('role')
+    department = _profile_field('department')
+    first_name = _profile_field('first_name')
+    credits = _profile_field('credits')
+    last_complaint_at = _profile_field('last_complaint_at')
+
+    def __init__(self, profile):
+        self.__dict__['_profile'] = profile
+        super().__init__()
+
+    @property
+    def __class__(self):
+        # isinstance() checks (templates, foreign keys) without loading the row
+        return get_user_model()
+
+    def __getitem__(self, key):
+        # As for a model instance; templates try item lookup before attributes
+        raise TypeError('User objects are not subscriptable')
+
+    def _setup(self):
+        self._wrapped = get_user_model()._default_manager.get(pk=self._profile['id'])
+
+
+def get_user(request):
+    """The session's user: a :class:`SlimUser` if cached, else Django's lookup (then cached)."""
+    try:
+        user_id = request.session[SESSION_KEY]
+        backend = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    profile = cache.get(_key(user_id)) if backend in settings.AUTHENTICATION_BACKENDS else None
+    if profile and constant_time_compare(request.session.get(HASH_SESSION_KEY, ''), profile['session_hash']):
+        return SlimUser(profile)
+    user = auth.get_user(request)
+    # A row read from a replica may predate the latest write
+    if user.is_authenticated and user._state.db == DEFAULT_DB_ALIAS:
+        remember(user)
+    return user
+
+
+def _request_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def _arequest_user(request):
+    return await sync_to_async(_request_user)(request)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Django's AuthenticationMiddleware, with ``request.user`` from :func:`get_user`."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(partial(_request_user, request))
+        request.auser = partial(_arequest_user, request)
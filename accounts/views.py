@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
@@ -7,19 +8,13 @@ from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.contrib.auth.password_validation import validate_password
 from .models import User, STREAM_CHOICES, ROLE_CHOICES
+from .registration import is_valid_mobile, normalize_phone, staff_profile
 from complaints.models import Complaint, CATEGORY_CHOICES
+from complaints import counters, fragments, ratelimit
+from core import aio
+from core.replicas import replica_reads
 import math
-import re
-
-
-def _normalize_phone(raw: str) -> str:
-    """Strip non-digits and return just the digits."""
-    return re.sub(r"\D", "", raw or "")
-
-
-def _is_valid_mobile(digits: str) -> bool:
-    """Basic 10-digit mobile validation after normalization."""
-    return len(digits) == 10 and digits.isdigit()
+from functools import cache
 
 
 def home(request):
@@ -31,7 +26,7 @@ def register_student(request):
         data = request.POST
         username = (data.get('enrollment_number') or "").strip()
         email = (data.get('email') or "").strip()
-        phone_digits = _normalize_phone(data.get('phone'))
+        phone_digits = normalize_phone(data.get('phone'))
         password = data.get('password') or ""
 
         # Username/enrollment uniqueness
@@ -40,7 +35,7 @@ def register_student(request):
             return redirect('register_student')
 
         # Mobile number validation
-        if not _is_valid_mobile(phone_digits):
+        if not is_valid_mobile(phone_digits):
             messages.error(request, 'Enter a valid 10-digit mobile number.')
             return redirect('register_student')
 
@@ -85,7 +80,7 @@ def register_staff(request):
         data = request.POST
         username = (data.get('college_id') or "").strip()
         email = (data.get('email') or "").strip()
-        phone_digits = _normalize_phone(data.get('phone'))
+        phone_digits = normalize_phone(data.get('phone'))
         password = data.get('password') or ""
         confirm_password = data.get('confirm_password') or ""
 
@@ -95,7 +90,7 @@ def register_staff(request):
             return redirect('register_staff')
 
         # Mobile validation
-        if not _is_valid_mobile(phone_digits):
+        if not is_valid_mobile(phone_digits):
             messages.error(request, 'Enter a valid 10-digit mobile number.')
             return redirect('register_staff')
 
@@ -120,38 +115,6 @@ def register_staff(request):
             messages.error(request, ' '.join(e.messages))
             return redirect('register_staff')
 
-        # Map working_at to existing role for permissions
-        working_at = (data.get('working_at') or '').strip()
-        role_map = {
-            'teachingFaculty': 'FACULTY',
-            'hod': 'HOD',
-            'adminOffice': 'ADMIN',
-            'staffMember': 'STAFF',
-            'infraManager': 'STAFF',
-            'studentCommittee': 'STAFF',
-        }
-        resolved_role = role_map.get(working_at, 'STAFF')
-
-        # Normalize department selections
-        faculty_department = data.get('faculty_department') or ''
-        if faculty_department:
-            faculty_department = faculty_department.upper()
-            if faculty_department == 'COMPUTING':
-                dept_label = 'Computing'
-            elif faculty_department == 'SST':
-                dept_label = 'SST'
-            else:
-                dept_label = faculty_department
-        else:
-            dept_label = ''
-
-        hod_department = data.get('hod_department') or ''
-        if hod_department:
-            hod_department = hod_department.upper()
-
-        # Streams list (can be empty)
-        streams = data.getlist('faculty_streams')
-
         user = User.objects.create_user(
             username=username,
             password=password,
@@ -159,22 +122,8 @@ def register_staff(request):
             last_name=data.get('last_name'),
             phone=phone_digits,
             email=email,
-            role=resolved_role,
-            department=dept_label,
             college_id=username,
-            working_at={
-                'teachingFaculty': 'TEACHING_FACULTY',
-                'hod': 'HOD',
-                'adminOffice': 'ADMIN_OFFICE',
-                'staffMember': 'STAFF_MEMBER',
-                'infraManager': 'INFRA_MANAGER',
-                'studentCommittee': 'STUDENT_COMMITTEE',
-            }.get(working_at, ''),
-            faculty_department=faculty_department,
-            faculty_streams=streams,
-            staff_description=data.get('staff_description', ''),
-            infra_building=(data.get('infra_building') or '').upper(),
-            hod_department=hod_department,
+            **staff_profile(data, data.getlist('faculty_streams')),
         )
         messages.success(request, 'Staff registration successful. You can login now.')
         return redirect('login')
@@ -203,73 +152,106 @@ def logout_view(request):
     return redirect('login')
 
 
+@replica_reads
 @login_required
 def dashboard(request):
+    # Counters and recent rows are loaded lazily (memoized callables and
+    # unevaluated querysets), so a cached dashboard fragment skips them.
     if request.user.role == 'STUDENT':
         # Student metrics and recent items for a richer dashboard UI
-        qs = Complaint.objects.filter(student=request.user)
-        my_count = qs.count()
-        open_count = qs.filter(status='OPEN').count()
-        in_process_count = qs.filter(status='IN_PROCESS').count()
-        closed_count = qs.filter(status='CLOSED').count()
-        recent = list(qs.order_by('-created_at')[:5])
-
-        # Cooldown days remaining based on last_complaint_at (global hint)
-        days_remaining = 0
-        if request.user.last_complaint_at:
-            remaining = request.user.last_complaint_at + timezone.timedelta(days=5) - timezone.now()
-            if remaining.total_seconds() > 0:
-                days_remaining = math.ceil(remaining.total_seconds() / 86400)
+        qs = Complaint.objects.filter(student_id=request.user.pk)
 
         context = {
-            'my_count': my_count,
-            'open_count': open_count,
-            'in_process_count': in_process_count,
-            'closed_count': closed_count,
-            'recent_complaints': recent,
-            'days_remaining': days_remaining,
+            'mine': cache(lambda: counters.student_counter(request.user.pk)),
+            'recent_complaints': qs.order_by('-created_at')[:5],
+            'days_remaining': _days_remaining(ratelimit.next_available(request.user)),
+            **fragments.context(),
         }
         return render(request, 'accounts/dashboard_student.html', context)
     else:
         # Build staff dashboard context (global view across all complaints)
-        qs = Complaint.objects.all()
-        total = qs.count()
-        stats = {
-            'total': total,
-            'open': qs.filter(status='OPEN').count(),
-            'in_process': qs.filter(status='IN_PROCESS').count(),
-            'closed': qs.filter(status='CLOSED').count(),
-            'validated': qs.filter(is_valid=True).count(),
-        }
-        # Recent complaints, newest first
-        recent = list(qs.order_by('-created_at')[:5])
-        # Category breakdown with percentage bar widths
-        labels = dict(CATEGORY_CHOICES)
-        by_cat = []
-        emoji_map = {
-            'CLEANING': '🧹',
-            'FACULTY': '🎓',
-            'STAFF': '🧑‍🔧',
-            'INFRA': '🏗️',
-            'STUDENT': '🧑‍🎓',
-        }
-        for key, label in CATEGORY_CHOICES:
-            by_cat.append({
-                'key': key,
-                'label': label,
-                'count': qs.filter(category=key).count(),
-                'emoji': emoji_map.get(key, '•'),
-            })
-        max_count = max([c['count'] for c in by_cat] + [0])
-        for item in by_cat:
-            item['pct'] = 0 if max_count == 0 else round(item['count'] * 100 / max_count, 2)
         context = {
-            'stats': stats,
-            'recent_complaints': recent,
-            'category_breakdown': by_cat,
+            'summary': cache(_staff_summary),
+            # Recent complaints, newest first
+            'recent_complaints': Complaint.objects.order_by('-created_at')[:5],
+            **fragments.context(),
         }
         return render(request, 'accounts/dashboard_staff.html', context)
 
-from django.shortcuts import render
 
-# Create your views here.
+@replica_reads
+@login_required
+async def dashboard_async(request):
+    """:func:`dashboard` for the ASGI app.
+
+    The reads behind the page are independent, so they run concurrently
+    (:func:`core.aio.gather`); those feeding a fragment that is already
+    cached are skipped, as the lazy context of the sync view does.
+    """
+    user = request.user = await request.auser()
+    context = await sync_to_async(fragments.context)()
+    version = context['complaints_version']
+    if user.role == 'STUDENT':
+        recent = Complaint.objects.filter(student_id=user.pk).order_by('-created_at')[:5]
+        mine, recent_complaints, available_at = await aio.gather(
+            fragments.unless_cached(
+                lambda: counters.student_counter(user.pk), 'student_dashboard_counts', version, user.pk,
+            ),
+            fragments.unless_cached(lambda: list(recent), 'student_dashboard_recent', version, user.pk),
+            lambda: ratelimit.next_available(user),
+        )
+        context.update({
+            'mine': mine,
+            'recent_complaints': recent_complaints,
+            'days_remaining': _days_remaining(available_at),
+        })
+        template = 'accounts/dashboard_student.html'
+    else:
+        recent = Complaint.objects.order_by('-created_at')[:5]
+        summary, recent_complaints = await aio.gather(
+            fragments.unless_cached(_staff_summary, 'staff_dashboard', version),
+            fragments.unless_cached(lambda: list(recent), 'staff_dashboard', version),
+        )
+        context.update({'summary': summary, 'recent_complaints': recent_complaints})
+        template = 'accounts/dashboard_staff.html'
+    return await sync_to_async(render)(request, template, context)
+
+
+def _days_remaining(available_at) -> int:
+    """Whole days until the rate limiter opens a section again (0 if one is open)."""
+    if not available_at:
+        return 0
+    return math.ceil((available_at - timezone.now()).total_seconds() / 86400)
+
+
+def _staff_summary():
+    # All numbers come from the counters table in a single primary-key read
+    rows = counters.staff_counters()
+    overall = rows[counters.GLOBAL_KEY]
+    stats = {
+        'total': overall.total,
+        'open': overall.open,
+        'in_process': overall.in_process,
+        'closed': overall.closed,
+        'validated': overall.validated,
+    }
+    # Category breakdown with percentage bar widths
+    by_cat = []
+    emoji_map = {
+        'CLEANING': '🧹',
+        'FACULTY': '🎓',
+        'STAFF': '🧑‍🔧',
+        'INFRA': '🏗️',
+        'STUDENT': '🧑‍🎓',
+    }
+    for key, label in CATEGORY_CHOICES:
+        by_cat.append({
+            'key': key,
+            'label': label,
+            'count': rows[counters.category_key(key)].total,
+            'emoji': emoji_map.get(key, '•'),
+        })
+    max_count = max([c['count'] for c in by_cat] + [0])
+    for item in by_cat:
+        item['pct'] = 0 if max_count == 0 else round(item['count'] * 100 / max_count, 2)
+    return {'stats': stats, 'category_breakdown': by_cat}
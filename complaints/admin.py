@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Complaint, ValidationLog, CreditTransaction
+from .models import Complaint, ValidationLog, CreditTransaction, MediaBlob, MediaJob, StatusTransition
+from .search import matching
 
 @admin.register(Complaint)
 class ComplaintAdmin(admin.ModelAdmin):
@@ -7,11 +8,37 @@ class ComplaintAdmin(admin.ModelAdmin):
     list_filter = ('category', 'status', 'level', 'is_valid')
     search_fields = ('title', 'description')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Go through the full-text index instead of LIKE '%term%' scans
+        if not search_term:
+            return queryset, False
+        return matching(queryset, search_term), False
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'content_type', 'size', 'refcount', 'created_at')
+    list_filter = ('content_type',)
+    readonly_fields = ('sha256', 'name', 'size', 'content_type', 'refcount', 'created_at')
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'complaint', 'status', 'attempts', 'created_at', 'updated_at')
+    list_filter = ('status',)
+
 @admin.register(ValidationLog)
 class ValidationLogAdmin(admin.ModelAdmin):
     list_display = ('complaint', 'reviewer', 'valid', 'created_at')
     list_filter = ('valid',)
 
+@admin.register(StatusTransition)
+class StatusTransitionAdmin(admin.ModelAdmin):
+    list_display = ('complaint_id', 'from_status', 'to_status', 'from_level', 'to_level', 'changed_by', 'created_at')
+    list_filter = ('to_status', 'to_level', 'category')
+
+    def has_change_permission(self, request, obj=None):
+        # Append-only history
+        return False
+
 @admin.register(CreditTransaction)
 class CreditTransactionAdmin(admin.ModelAdmin):
     list_display = ('user', 'amount', 'reason', 'created_at')
@@ -0,0 +1,100 @@
+"""Hot/cold split of the complaint table.
+
+CLOSED complaints nobody has touched for ``COMPLAINT_ARCHIVE_AFTER_DAYS``
+move, with their validation logs, to :class:`ArchivedComplaint` and
+:class:`ArchivedValidationLog`, keeping their ids. Each batch is one
+transaction that copies the rows and deletes them from the hot tables, so an
+interrupted run loses nothing and the next one carries on where it stopped.
+
+Along with a complaint:
+
+* its credit transactions switch from ``complaint`` to ``archived_complaint``;
+* its attachment reference passes to the archive row (the blob's refcount
+  is unchanged);
+* the counters keep counting it (``counters.compute_counters`` reads both
+  tables), so dashboard totals don't drop;
+* its status history stays in :class:`StatusTransition`, which has no
+  database foreign key to the complaint;
+* it leaves the search index: archived complaints are reachable by id on
+  ``complaint_detail`` and through the exports, not from the search page.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import counters
+from .models import ArchivedComplaint, ArchivedValidationLog, Complaint, CreditTransaction, ValidationLog
+
+COMPLAINT_FIELDS = (
+    'id', 'student_id', 'department', 'category', 'title', 'description', 'media', 'media_blob_id',
+    'media_variants', 'status', 'level', 'is_valid', 'rewarded_at', 'created_at', 'updated_at',
+)
+VALIDATION_FIELDS = ('id', 'complaint_id', 'reviewer_id', 'valid', 'note', 'created_at')
+
+
+@dataclass
+class ArchiveResult:
+    complaints: int = 0
+    validations: int = 0
+    batches: int = 0
+
+
+def cutoff(days=None):
+    days = settings.COMPLAINT_ARCHIVE_AFTER_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def candidates(before):
+    """CLOSED complaints last updated before ``before``."""
+    qs = Complaint.objects.filter(status='CLOSED', updated_at__lt=before)
+    # The newest complaint always stays: MySQL before 8.0 resets AUTO_INCREMENT
+    # to MAX(id) + 1 on restart and would hand its id out again
+    newest = Complaint.objects.aggregate(newest=Max('pk'))['newest']
+    return qs.exclude(pk=newest) if newest is not None else qs
+
+
+def archive_batch(before, batch_size) -> tuple:
+    """Move up to ``batch_size`` complaints; returns ``(complaints, validations)`` moved."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(candidates(before).select_for_update().order_by('pk').values(*COMPLAINT_FIELDS)[:batch_size])
+        if not rows:
+            return 0, 0
+        ids = [row['id'] for row in rows]
+        ArchivedComplaint.objects.bulk_create([ArchivedComplaint(**row, archived_at=now) for row in rows])
+        logs = ValidationLog.objects.filter(complaint_id__in=ids)
+        archived_logs = ArchivedValidationLog.objects.bulk_create([
+            ArchivedValidationLog(**log) for log in logs.order_by('pk').values(*VALIDATION_FIELDS)
+        ])
+        CreditTransaction.objects.filter(complaint_id__in=ids).update(
+            archived_complaint_id=F('complaint_id'), complaint=None,
+        )
+        # The archive rows hold the attachment references now; cleared here
+        # so the delete signal doesn't release them. No updated_at: the rows
+        # are deleted next.
+        Complaint.objects.filter(pk__in=ids, media_blob__isnull=False).update(media_blob=None)
+        logs.delete()
+        with counters.keeping_counts():
+            Complaint.objects.filter(pk__in=ids).delete()
+    return len(rows), len(archived_logs)
+
+
+def archive_closed(days=None, batch_size=None, max_batches=None) -> ArchiveResult:
+    """Archive every eligible complaint, one transaction per batch."""
+    before = cutoff(days)
+    batch_size = batch_size or settings.COMPLAINT_ARCHIVE_BATCH_SIZE
+    result = ArchiveResult()
+    while max_batches is None or result.batches < max_batches:
+        complaints, validations = archive_batch(before, batch_size)
+        if not complaints:
+            break
+        result.complaints += complaints
+        result.validations += validations
+        result.batches += 1
+        if complaints < batch_size:
+            break
+    return result
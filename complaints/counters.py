@@ -0,0 +1,159 @@
+"""Incrementally maintained complaint counters.
+
+Every write that changes a complaint's existence, status or validity calls one
+of the ``record_*`` helpers inside the same transaction, so dashboards can read
+their numbers from :class:`~complaints.models.ComplaintCounter` rows by primary
+key instead of running ``COUNT(*)`` scans. Deleting a complaint (the admin, a
+cascade from its student) takes it back out through a ``post_delete`` signal;
+archiving deletes inside :func:`keeping_counts`, since archived complaints
+still count. ``rebuild_complaint_counters`` recomputes everything from the
+complaint table and reports drift.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import ArchivedComplaint, Complaint, ComplaintCounter, CATEGORY_CHOICES, normalize_department
+
+COLUMNS = ('total', 'open', 'in_process', 'closed', 'validated')
+STATUS_COLUMNS = {'OPEN': 'open', 'IN_PROCESS': 'in_process', 'CLOSED': 'closed'}
+
+GLOBAL_KEY = 'global'
+
+# Set while deleted complaints should stay counted
+_keeping_counts = ContextVar('keeping_counts', default=False)
+
+
+def category_key(category: str) -> str:
+    return f'category:{category}'
+
+
+def department_key(department: str) -> str:
+    return f'department:{normalize_department(department)}'
+
+
+def student_key(student_id: int) -> str:
+    return f'student:{student_id}'
+
+
+def scope_keys(category: str, department: str, student_id: int):
+    return [GLOBAL_KEY, category_key(category), department_key(department), student_key(student_id)]
+
+
+def apply_deltas(deltas: dict) -> None:
+    """Add ``{key: {column: n}}`` to the counter rows, creating missing rows.
+
+    Keys sharing the same delta are folded into a single UPDATE, so the common
+    single-complaint case costs one INSERT IGNORE plus one UPDATE.
+    """
+    deltas = {k: {c: n for c, n in d.items() if n} for k, d in deltas.items()}
+    deltas = {k: d for k, d in deltas.items() if d}
+    if not deltas:
+        return
+    ComplaintCounter.objects.bulk_create(
+        [ComplaintCounter(key=key) for key in deltas], ignore_conflicts=True
+    )
+    by_shape = defaultdict(list)
+    for key, delta in deltas.items():
+        by_shape[tuple(sorted(delta.items()))].append(key)
+    for shape, keys in by_shape.items():
+        ComplaintCounter.objects.filter(key__in=keys).update(
+            **{column: F(column) + n for column, n in shape}
+        )
+
+
+def _complaint_delta(status: str, is_valid: bool, sign: int = 1) -> dict:
+    delta = {'total': sign, STATUS_COLUMNS[status]: sign}
+    if is_valid:
+        delta['validated'] = sign
+    return delta
+
+
+def record_created(complaint: Complaint) -> None:
+    delta = _complaint_delta(complaint.status, complaint.is_valid)
+    apply_deltas({key: delta for key in scope_keys(complaint.category, complaint.department, complaint.student_id)})
+
+
+def record_deleted(complaint: Complaint) -> None:
+    if _keeping_counts.get():
+        return
+    delta = _complaint_delta(complaint.status, complaint.is_valid, sign=-1)
+    apply_deltas({key: delta for key in scope_keys(complaint.category, complaint.department, complaint.student_id)})
+
+
+@contextmanager
+def keeping_counts():
+    """Deletes inside the block leave the counters alone."""
+    token = _keeping_counts.set(True)
+    try:
+        yield
+    finally:
+        _keeping_counts.reset(token)
+
+
+def record_validation_changes(rows, valid: bool) -> None:
+    """Move the ``validated`` counters for rows whose validity just flipped to ``valid``.
+
+    ``rows`` are dicts with ``category``, ``department`` and ``student_id``.
+    """
+    deltas = defaultdict(lambda: {'validated': 0})
+    for row in rows:
+        for key in scope_keys(row['category'], row['department'], row['student_id']):
+            deltas[key]['validated'] += 1 if valid else -1
+    apply_deltas(deltas)
+
+
+def staff_counters():
+    """Global and per-category rows for the staff dashboard in one query."""
+    keys = [GLOBAL_KEY] + [category_key(key) for key, _ in CATEGORY_CHOICES]
+    rows = {row.key: row for row in ComplaintCounter.objects.filter(key__in=keys)}
+    return {key: rows.get(key) or ComplaintCounter(key=key) for key in keys}
+
+
+def student_counter(student_id: int) -> ComplaintCounter:
+    key = student_key(student_id)
+    return ComplaintCounter.objects.filter(key=key).first() or ComplaintCounter(key=key)
+
+
+def compute_counters() -> dict:
+    """Recompute every counter row from the complaint and archive tables (3 GROUP BY scans each)."""
+    totals = defaultdict(lambda: dict.fromkeys(COLUMNS, 0))
+
+    def fold(key, status, is_valid, n):
+        for column, sign in _complaint_delta(status, is_valid).items():
+            totals[key][column] += sign * n
+
+    # Archived complaints still count
+    for base in (Complaint.objects.order_by(), ArchivedComplaint.objects.order_by()):
+        for row in base.values('category', 'status', 'is_valid').annotate(n=Count('id')):
+            fold(GLOBAL_KEY, row['status'], row['is_valid'], row['n'])
+            fold(category_key(row['category']), row['status'], row['is_valid'], row['n'])
+        for row in base.values('department', 'status', 'is_valid').annotate(n=Count('id')):
+            fold(department_key(row['department']), row['status'], row['is_valid'], row['n'])
+        for row in base.values('student_id', 'status', 'is_valid').annotate(n=Count('id')):
+            fold(student_key(row['student_id']), row['status'], row['is_valid'], row['n'])
+    return dict(totals)
+
+
+def find_drift(expected: dict) -> dict:
+    """Return ``{key: (stored, expected)}`` for every row that disagrees."""
+    zero = dict.fromkeys(COLUMNS, 0)
+    stored = {row['key']: {c: row[c] for c in COLUMNS} for row in ComplaintCounter.objects.values('key', *COLUMNS)}
+    drift = {}
+    for key in set(stored) | set(expected):
+        have, want = stored.get(key, zero), expected.get(key, zero)
+        if have != want:
+            drift[key] = (have, want)
+    return drift
+
+
+def rebuild(expected: dict, batch_size: int = 1000) -> None:
+    with transaction.atomic():
+        ComplaintCounter.objects.all().delete()
+        ComplaintCounter.objects.bulk_create(
+            [ComplaintCounter(key=key, **values) for key, values in expected.items()],
+            batch_size=batch_size,
+        )
@@ -0,0 +1,113 @@
+"""SLA escalation of complaints left untouched at a level.
+
+Every complaint that is not CLOSED and below ADMIN carries ``escalate_at``:
+when it was filed or last triaged, plus the hours
+``COMPLAINT_ESCALATION_HOURS`` allows its category at its level. A tick of
+``escalate_complaints`` (from cron, or ``--loop`` as a worker) claims due rows
+through the ``escalate_at`` index, earliest first, and moves each batch up one
+level (CLASS -> HOD -> ADMIN) with one UPDATE that also sets the next
+deadline, so it never reads rows that are not due.
+
+Batches are claimed with :func:`complaints.queue.claim`, so several workers
+may run at once: SKIP LOCKED on MySQL, the IMMEDIATE write lock on SQLite.
+Each escalation is appended to the status transition log with no
+``changed_by``, and the complaint is re-routed so the next level's staff see
+it in their inboxes.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from . import routing
+from .fragments import bump_complaints_version
+from .models import CATEGORY_CHOICES, NEXT_LEVEL, Complaint, StatusTransition, escalation_due, escalation_hours
+from .queue import claim
+
+PREVIOUS_LEVEL = {level: previous for previous, level in NEXT_LEVEL.items()}
+
+
+@dataclass
+class EscalationResult:
+    escalated: int = 0
+    batches: int = 0
+
+
+def due(now):
+    return Complaint.objects.filter(escalate_at__lte=now).order_by('escalate_at', 'pk')
+
+
+def _escalation(now) -> dict:
+    """UPDATE values moving a row up one level and setting its next deadline."""
+    categories = [key for key, _ in CATEGORY_CHOICES]
+    # escalate_at comes first: MySQL evaluates SET left to right, so later
+    # assignments would see the new level
+    return {
+        'escalate_at': Case(
+            *[When(level='CLASS', category=c, then=Value(escalation_due(c, 'HOD', now))) for c in categories],
+            default=Value(None), output_field=DateTimeField(),
+        ),
+        'level': Case(*[When(level=level, then=Value(up)) for level, up in NEXT_LEVEL.items()], default=F('level')),
+        'updated_at': now,
+    }
+
+
+def escalate_batch(batch_size: int, now=None) -> list:
+    """Escalate up to ``batch_size`` due complaints in one transaction; return their pks."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        pks = claim(due(now), batch_size, **_escalation(now))
+        if not pks:
+            return pks
+        rows = list(
+            Complaint.objects.filter(pk__in=pks).values('id', 'category', 'department', 'status', 'level', 'created_at')
+        )
+        StatusTransition.objects.bulk_create([
+            StatusTransition(
+                complaint_id=row['id'], category=row['category'],
+                from_status=row['status'], to_status=row['status'],
+                from_level=PREVIOUS_LEVEL[row['level']], to_level=row['level'],
+                elapsed=max(0, int((now - row['created_at']).total_seconds())), created_at=now,
+            )
+            for row in rows
+        ])
+        routing.route(rows)
+        bump_complaints_version()
+    return pks
+
+
+def run(batch_size: int, max_batches: int = None) -> EscalationResult:
+    """Escalate everything due now, one batch per transaction."""
+    result = EscalationResult()
+    now = timezone.now()
+    while max_batches is None or result.batches < max_batches:
+        pks = escalate_batch(batch_size, now)
+        if not pks:
+            break
+        result.escalated += len(pks)
+        result.batches += 1
+        if len(pks) < batch_size:
+            break
+    return result
+
+
+def backfill(batch_size: int) -> int:
+    """Give open complaints filed before ``escalate_at`` existed a deadline, counted from their last update."""
+    pending = Complaint.objects.filter(escalate_at__isnull=True, level__in=list(NEXT_LEVEL)).exclude(status='CLOSED')
+    total, last = 0, 0
+    while True:
+        pks = list(pending.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return total
+        window = pending.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        with transaction.atomic():
+            for category, _ in CATEGORY_CHOICES:
+                for level in NEXT_LEVEL:
+                    hours = escalation_hours(category, level)
+                    if hours:
+                        total += window.filter(category=category, level=level).update(
+                            escalate_at=F('updated_at') + timedelta(hours=hours),
+                        )
+        last = pks[-1]
@@ -0,0 +1,226 @@
+"""Streaming CSV/JSONL exports of complaints, validations and credit transactions.
+
+Rows are read with ``values_list`` in primary-key keyset batches of
+``EXPORT_CHUNK_SIZE``, serialized into ~64 KB chunks and optionally gzipped
+as they go, so memory stays flat however large the export. Batches rather
+than one long ``.iterator()`` cursor: MySQL's client library buffers a whole
+result set, and a slow download would keep a cursor (and its snapshot) open.
+
+Staff exports leave students anonymous, as ``complaint_detail`` does: only
+the complaint's department snapshot is included, never the student or the
+credited user. ``identities=True`` (the ``export_data`` command's
+``--with-identities``) adds them.
+
+Archived complaints (``complaints.archive``) and their validations and
+credits are merged back in by id, so an export covers both tables.
+"""
+import csv
+import heapq
+import io
+import json
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .filters import apply_filters
+from .models import ArchivedComplaint, ArchivedValidationLog, Complaint, CreditTransaction, ValidationLog
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+FLUSH_BYTES = 64 * 1024
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+@dataclass(frozen=True)
+class Export:
+    # The first column must be the primary key; batches resume after it
+    model: type
+    # Reaches the complaint fields used by the filters
+    filter_prefix: str
+    columns: tuple
+    identity_columns: tuple = ()
+    # Restricts ``model`` to this export's rows
+    where: dict = field(default_factory=dict)
+    # Same columns read from the archive (complaints.archive), merged in by id
+    archive: 'Export | None' = None
+
+    def lookups(self, identities: bool) -> list:
+        return [lookup for _, lookup in self.columns + (self.identity_columns if identities else ())]
+
+    def header(self, identities: bool) -> list:
+        return [name for name, _ in self.columns + (self.identity_columns if identities else ())]
+
+
+COMPLAINT_COLUMNS = (
+    ('id', 'id'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ('category', 'category'), ('status', 'status'), ('level', 'level'),
+    ('department', 'department'), ('is_valid', 'is_valid'),
+    ('title', 'title'), ('description', 'description'),
+)
+COMPLAINT_IDENTITY_COLUMNS = (('student_id', 'student_id'), ('student_username', 'student__username'))
+VALIDATION_COLUMNS = (
+    ('id', 'id'), ('created_at', 'created_at'), ('complaint_id', 'complaint_id'),
+    ('category', 'complaint__category'), ('status', 'complaint__status'),
+    ('department', 'complaint__department'), ('reviewer_id', 'reviewer_id'),
+    ('valid', 'valid'), ('note', 'note'),
+)
+CREDIT_IDENTITY_COLUMNS = (('user_id', 'user_id'), ('username', 'user__username'))
+
+
+def _credit_columns(relation):
+    return (
+        ('id', 'id'), ('created_at', 'created_at'), ('complaint_id', f'{relation}_id'),
+        ('category', f'{relation}__category'), ('department', f'{relation}__department'),
+        ('amount', 'amount'), ('reason', 'reason'),
+    )
+
+
+EXPORTS = {
+    'complaints': Export(
+        model=Complaint,
+        filter_prefix='',
+        columns=COMPLAINT_COLUMNS,
+        identity_columns=COMPLAINT_IDENTITY_COLUMNS,
+        archive=Export(
+            model=ArchivedComplaint, filter_prefix='', columns=COMPLAINT_COLUMNS,
+            identity_columns=COMPLAINT_IDENTITY_COLUMNS,
+        ),
+    ),
+    'validations': Export(
+        model=ValidationLog,
+        filter_prefix='complaint__',
+        columns=VALIDATION_COLUMNS,
+        archive=Export(model=ArchivedValidationLog, filter_prefix='complaint__', columns=VALIDATION_COLUMNS),
+    ),
+    'credits': Export(
+        model=CreditTransaction,
+        filter_prefix='complaint__',
+        columns=_credit_columns('complaint'),
+        identity_columns=CREDIT_IDENTITY_COLUMNS,
+        where={'archived_complaint__isnull': True},
+        archive=Export(
+            model=CreditTransaction, filter_prefix='archived_complaint__',
+            columns=_credit_columns('archived_complaint'), identity_columns=CREDIT_IDENTITY_COLUMNS,
+            where={'archived_complaint__isnull': False},
+        ),
+    ),
+}
+
+
+def parse_range(params):
+    """``(since, until)`` datetimes from ``since``/``until`` dates (``until`` inclusive).
+
+    Raises ValueError for a date that doesn't parse.
+    """
+    bounds = []
+    for name, shift in (('since', 0), ('until', 1)):
+        value = (params.get(name) or '').strip()
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValueError(f'{name} must be a YYYY-MM-DD date.')
+        bounds.append(timezone.make_aware(datetime.combine(day + timedelta(days=shift), time.min)))
+    return tuple(bounds)
+
+
+def rows(kind, filters=None, since=None, until=None, identities=False, chunk_size=None, using=None):
+    """Value tuples for an export, oldest first, read in keyset batches from ``using``."""
+    export = EXPORTS[kind]
+    sources = [_rows(export, filters, since, until, identities, chunk_size, using)]
+    if export.archive:
+        sources.append(_rows(export.archive, filters, since, until, identities, chunk_size, using))
+    # Both sources come in id order, and archived rows keep their ids
+    return heapq.merge(*sources, key=itemgetter(0))
+
+
+def _rows(export, filters, since, until, identities, chunk_size, using):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    qs = apply_filters(export.model.objects.using(using).filter(**export.where), filters or {}, export.filter_prefix)
+    if since:
+        qs = qs.filter(created_at__gte=since)
+    if until:
+        qs = qs.filter(created_at__lt=until)
+    # Rows added while the export runs are left out
+    last_id = export.model.objects.using(using).order_by('-pk').values_list('pk', flat=True).first()
+    if last_id is None:
+        return
+    qs = qs.filter(pk__lte=last_id).order_by('pk')
+    lookups = export.lookups(identities)
+    after = 0
+    while True:
+        batch = list(qs.filter(pk__gt=after).values_list(*lookups)[:chunk_size])
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        after = batch[-1][0]
+
+
+def _csv_cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode(header, records, fmt):
+    """Serialize ``records`` as CSV or JSONL, yielding ~64 KB byte chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(header)
+    for record in records:
+        if fmt == 'csv':
+            writer.writerow([_csv_cell(value) for value in record])
+        else:
+            buffer.write(json.dumps(dict(zip(header, record)), cls=DjangoJSONEncoder) + '\n')
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream(kind, fmt='csv', compress=False, filters=None, since=None, until=None, identities=False, using=None):
+    """Byte chunks of a complete export file."""
+    export = EXPORTS[kind]
+    chunks = encode(export.header(identities), rows(kind, filters, since, until, identities, using=using), fmt)
+    return gzipped(chunks) if compress else chunks
+
+
+def filename(kind, fmt, compress=False) -> str:
+    return f"{kind}-{timezone.localdate():%Y%m%d}.{fmt}{'.gz' if compress else ''}"
+
+
+async def aiterate(chunks):
+    """Feed a sync chunk iterator to an ASGI response one chunk at a time.
+
+    Given a sync iterator, Django's ASGI handler would read it into a list
+    first. Each step runs on the request's sync thread.
+    """
+    done = object()
+    step = sync_to_async(next)
+    while (chunk := await step(chunks, done)) is not done:
+        yield chunk
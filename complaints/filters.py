@@ -0,0 +1,31 @@
+from .models import CATEGORY_CHOICES, STATUS_CHOICES, LEVEL_CHOICES, normalize_department
+
+FILTER_FIELDS = ('category', 'status', 'level', 'department')
+
+
+def clean_filters(params) -> dict:
+    """Pick the supported listing filters out of a QueryDict, dropping unknown values."""
+    allowed = {
+        'category': dict(CATEGORY_CHOICES),
+        'status': dict(STATUS_CHOICES),
+        'level': dict(LEVEL_CHOICES),
+    }
+    cleaned = {}
+    for field in FILTER_FIELDS:
+        value = (params.get(field) or '').strip()
+        if not value:
+            continue
+        if field in allowed and value not in allowed[field]:
+            continue
+        cleaned[field] = value
+    return cleaned
+
+
+def apply_filters(qs, filters: dict, prefix: str = ''):
+    """Filter ``qs`` by complaint fields; ``prefix`` (e.g. ``complaint__``) reaches them from related rows."""
+    for field in ('category', 'status', 'level'):
+        if filters.get(field):
+            qs = qs.filter(**{prefix + field: filters[field]})
+    if filters.get('department'):
+        qs = qs.filter(**{prefix + 'department': normalize_department(filters['department'])})
+    return qs
@@ -0,0 +1,71 @@
+"""Version numbers that key the cached template fragments.
+
+List and dashboard fragments vary on a global complaints version; detail
+fragments vary on the complaint's own ``updated_at``. Writes never delete
+fragments: they bump the global version once their transaction commits, so
+stale entries simply stop being looked up and age out of the fragment cache
+(the ``template_fragments`` alias, which Django's ``{% cache %}`` tag uses).
+A replica may not have the write yet when the new version is first rendered,
+so fragments rendered from a replica expire within ``DATABASE_REPLICA_MAX_LAG``.
+"""
+import functools
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+from core import replicas
+
+FRAGMENT_CACHE = 'template_fragments'
+VERSION_KEY = 'fragments:complaints:version'
+
+
+def complaints_version() -> int:
+    cache = caches[FRAGMENT_CACHE]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() so concurrent first readers agree on one starting version
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_complaints_version() -> None:
+    """Retire every list/dashboard fragment once the current transaction commits."""
+    transaction.on_commit(lambda: caches[FRAGMENT_CACHE].set(VERSION_KEY, time.time_ns(), None))
+
+
+def complaint_version(complaint) -> int:
+    return int(complaint.updated_at.timestamp() * 1_000_000)
+
+
+def timeout() -> int:
+    if replicas.reads_from_replica():
+        return min(settings.FRAGMENT_CACHE_TIMEOUT, settings.DATABASE_REPLICA_MAX_LAG)
+    return settings.FRAGMENT_CACHE_TIMEOUT
+
+
+def context() -> dict:
+    """Template variables for the ``{% cache %}`` blocks."""
+    return {
+        'fragment_timeout': timeout(),
+        'complaints_version': complaints_version(),
+    }
+
+
+def is_cached(fragment_name: str, *vary_on) -> bool:
+    """Whether ``{% cache ... fragment_name *vary_on %}`` would be a hit right now."""
+    return caches[FRAGMENT_CACHE].has_key(make_template_fragment_key(fragment_name, vary_on))
+
+
+def unless_cached(func, fragment_name: str, *vary_on):
+    """``func`` wrapped to skip calling it when the fragment it feeds is cached.
+
+    On a hit the wrapper returns ``func`` itself, memoized, rather than its
+    result: if the fragment is evicted before the template renders, the
+    template calls it and still gets the data.
+    """
+    func = functools.cache(func)
+    return lambda: func if is_cached(fragment_name, *vary_on) else func()
@@ -0,0 +1,91 @@
+"""In-process fan-out of values to the clients of a streaming endpoint.
+
+One :class:`Hub` per process keeps every open stream's :class:`Subscription`
+under a key. ``publish`` may be called from any thread (typically a sync view
+committing a write); each subscriber's event loop is handed the value, and a
+subscriber that falls behind only ever sees the latest one.
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+
+class Subscription:
+    def __init__(self, key):
+        self.key = key
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=1)
+
+    def offer(self, value):
+        """Hand ``value`` to the subscriber's loop; safe from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._replace, value)
+        except RuntimeError:
+            # The loop is closed; its stream will unsubscribe as it unwinds
+            pass
+
+    def _replace(self, value):
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(value)
+
+    async def get(self, timeout):
+        """Next value; raises TimeoutError if none arrives within ``timeout`` seconds."""
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._latest = {}
+        self._last_sweep = 0.0
+
+    def subscribe(self, key) -> Subscription:
+        """Register a stream for ``key``; call from the stream's event loop."""
+        subscription = Subscription(key)
+        with self._lock:
+            self._subscriptions[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.key)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.key]
+                self._latest.pop(subscription.key, None)
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._subscriptions)
+
+    def publish(self, key, value) -> int:
+        """Send ``value`` to every subscriber of ``key`` unless it is what they last got.
+
+        Returns the number of subscribers notified.
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.get(key)
+            if not subscriptions or self._latest.get(key) == value:
+                return 0
+            self._latest[key] = value
+            subscriptions = list(subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(value)
+        return len(subscriptions)
+
+    def sweep_due(self, interval: float) -> bool:
+        """True for at most one caller per ``interval`` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < interval:
+                return False
+            self._last_sweep = now
+            return True
+
+
+hub = Hub()
@@ -0,0 +1,82 @@
+"""Validation outcomes and the credit rewards they pay out.
+
+All writes for one call happen in a single transaction: the complaint rows
+are locked, validity flips go through one UPDATE, logs and ledger entries
+are bulk-inserted, and student balances move with an F() expression, so
+concurrent reviewers can neither lose an update nor pay the same complaint
+twice (``Complaint.rewarded_at`` is the idempotency guard).
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.usercache import forget_users
+from . import counters
+from .fragments import bump_complaints_version
+from .models import Complaint, CreditTransaction, ValidationLog
+
+REWARD_AMOUNT = 5
+REWARD_REASON = 'Valid Complaint Reward'
+
+
+@dataclass
+class ValidationResult:
+    validated: list = field(default_factory=list)
+    rewarded: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+    credits_paid: int = 0
+
+
+def record_validations(complaint_ids, reviewer, valid: bool, note: str = '') -> ValidationResult:
+    """Record one review outcome for every complaint in ``complaint_ids``."""
+    complaint_ids = sorted(set(complaint_ids))
+    result = ValidationResult()
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock in id order so overlapping batches cannot deadlock each other.
+        rows = list(
+            Complaint.objects.select_for_update()
+            .filter(pk__in=complaint_ids)
+            .order_by('pk')
+            .values('id', 'student_id', 'category', 'department', 'is_valid', 'rewarded_at')
+        )
+        found = {row['id'] for row in rows}
+        result.missing = [pk for pk in complaint_ids if pk not in found]
+        result.validated = sorted(found)
+        if not rows:
+            return result
+
+        flipped = [row for row in rows if row['is_valid'] != valid]
+        if flipped:
+            Complaint.objects.filter(pk__in=[row['id'] for row in flipped]).update(is_valid=valid, updated_at=now)
+            counters.record_validation_changes(flipped, valid)
+            bump_complaints_version()
+
+        ValidationLog.objects.bulk_create([
+            ValidationLog(complaint_id=row['id'], reviewer=reviewer, valid=valid, note=note) for row in rows
+        ])
+
+        if valid:
+            unpaid = [row for row in rows if row['rewarded_at'] is None]
+            if unpaid:
+                Complaint.objects.filter(pk__in=[row['id'] for row in unpaid]).update(rewarded_at=now)
+                per_student = Counter(row['student_id'] for row in unpaid)
+                User.objects.filter(pk__in=per_student).update(credits=F('credits') + Case(
+                    *[When(pk=pk, then=Value(n * REWARD_AMOUNT)) for pk, n in per_student.items()],
+                    default=Value(0), output_field=IntegerField(),
+                ))
+                forget_users(per_student)
+                CreditTransaction.objects.bulk_create([
+                    CreditTransaction(
+                        user_id=row['student_id'], complaint_id=row['id'],
+                        amount=REWARD_AMOUNT, reason=REWARD_REASON,
+                    )
+                    for row in unpaid
+                ])
+                result.rewarded = [row['id'] for row in unpaid]
+                result.credits_paid = REWARD_AMOUNT * len(unpaid)
+    return result
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from complaints import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move CLOSED complaints untouched for COMPLAINT_ARCHIVE_AFTER_DAYS, with their validation '
+        'logs, to the archive tables in batches. Safe to interrupt and re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.COMPLAINT_ARCHIVE_AFTER_DAYS,
+            help='Archive complaints last updated more than this many days ago.',
+        )
+        parser.add_argument('--batch-size', type=int, default=settings.COMPLAINT_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the complaints that would move.')
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if options['dry_run']:
+            count = archive.candidates(archive.cutoff(days)).count()
+            self.stdout.write(f'{count} complaint(s) would be archived.')
+            return
+        result = archive.archive_closed(days, options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {result.complaints} complaint(s) and {result.validations} validation log(s) '
+            f'in {result.batches} batch(es).'
+        ))
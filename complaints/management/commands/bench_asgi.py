@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from accounts.models import User
+from complaints.benchmarking import summarize
+from complaints.fragments import FRAGMENT_CACHE
+from complaints.models import Complaint
+
+DUMMY = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+LIST_QUERIES = ['', 'status=OPEN', 'status=CLOSED', 'category=INFRA', 'level=HOD', 'status=IN_PROCESS']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and tail latency of the dashboard, list and detail pages '
+        'served by the sync views through the WSGI handler and by the async views '
+        'through the ASGI handler, with the same number of concurrent workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='WSGI threads, and concurrent ASGI requests.')
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--fragment-cache', action='store_true',
+                            help='Keep the fragment cache on (default: off, to time the views themselves).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], help='Internal: run one side and print JSON.')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            return self.run_mode(options)
+        results = {mode: self.spawn(mode, options) for mode in ('wsgi', 'asgi')}
+        self.report(results, options)
+
+    def spawn(self, mode, options):
+        # URL routing picks sync or async views at import, so each side gets its own process
+        env = {**os.environ, 'ASYNC_VIEWS': 'true' if mode == 'asgi' else 'false'}
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_asgi', '--mode', mode,
+            '--workers', str(options['workers']), '--requests', str(options['requests']),
+            '--seed', str(options['seed']),
+        ]
+        if options['fragment_cache']:
+            command.append('--fragment-cache')
+        done = subprocess.run(command, env=env, capture_output=True, text=True)
+        if done.returncode != 0:
+            raise CommandError(f'{mode} run failed:\n{done.stderr}')
+        return json.loads(done.stdout)
+
+    def run_mode(self, options):
+        if settings.ASYNC_VIEWS != (options['mode'] == 'asgi'):
+            raise CommandError('Run without --mode; it is set by the parent process.')
+        student = User.objects.filter(role='STUDENT', complaints__isnull=False).order_by('pk').first()
+        staff = User.objects.filter(role='ADMIN').order_by('pk').first()
+        if not (student and staff):
+            raise CommandError('Need a student with complaints and an ADMIN; run seed_data first.')
+        rng = random.Random(options['seed'])
+        detail_ids = list(Complaint.objects.order_by('-id').values_list('id', flat=True)[:200])
+        plan = []
+        for _ in range(options['requests']):
+            role, url = rng.choice([
+                ('staff', '/dashboard/'),
+                ('student', '/dashboard/'),
+                ('staff', f'/complaints/?{rng.choice(LIST_QUERIES)}'),
+                ('student', '/complaints/'),
+                ('staff', f'/complaints/{rng.choice(detail_ids)}/'),
+            ])
+            plan.append((role, url))
+        users = {'staff': staff, 'student': student}
+
+        caches = dict(settings.CACHES)
+        if not options['fragment_cache']:
+            caches[FRAGMENT_CACHE] = DUMMY
+        run = self.run_wsgi if options['mode'] == 'wsgi' else self.run_asgi
+        with override_settings(ALLOWED_HOSTS=['testserver'], CACHES=caches):
+            timings, errors, elapsed = run(users, plan, options['workers'])
+        self.stdout.write(json.dumps({
+            **summarize(timings),
+            'errors': errors,
+            'elapsed': elapsed,
+            'throughput': len(timings) / elapsed if elapsed else 0.0,
+        }))
+
+    def run_wsgi(self, users, plan, workers):
+        pending = iter(plan)
+        timings, errors = [], []
+        lock = threading.Lock()
+        clients = []
+        for _ in range(workers):
+            pair = {role: Client() for role in users}
+            for role, client in pair.items():
+                client.force_login(users[role])
+            clients.append(pair)
+
+        def work(pair):
+            try:
+                while True:
+                    with lock:
+                        role, url = next(pending, (None, None))
+                    if url is None:
+                        return
+                    began = time.perf_counter()
+                    response = pair[role].get(url)
+                    took = time.perf_counter() - began
+                    with lock:
+                        timings.append(took)
+                        if response.status_code != 200:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(pair,)) for pair in clients]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        for pair in clients:
+            for client in pair.values():
+                client.logout()
+        return timings, errors, elapsed
+
+    def run_asgi(self, users, plan, workers):
+        return asyncio.run(self._run_asgi(users, plan, workers))
+
+    async def _run_asgi(self, users, plan, workers):
+        pending = iter(plan)
+        timings, errors = [], []
+        clients = []
+        for _ in range(workers):
+            pair = {role: AsyncClient() for role in users}
+            for role, client in pair.items():
+                await client.aforce_login(users[role])
+            clients.append(pair)
+
+        async def work(pair):
+            # One event loop, so pulling from the shared plan needs no lock
+            for role, url in pending:
+                began = time.perf_counter()
+                response = await pair[role].get(url)
+                timings.append(time.perf_counter() - began)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        began = time.perf_counter()
+        await asyncio.gather(*(work(pair) for pair in clients))
+        elapsed = time.perf_counter() - began
+        for pair in clients:
+            for client in pair.values():
+                await client.alogout()
+        return timings, errors, elapsed
+
+    def report(self, results, options):
+        self.stdout.write(
+            f"{options['workers']} workers, {options['requests']} requests, "
+            f"fragment cache {'on' if options['fragment_cache'] else 'off'}"
+        )
+        self.stdout.write(f"{'handler':<8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"{mode:<8}{stats['throughput']:>9.1f}{stats['p50_ms']:>9}{stats['p95_ms']:>9}"
+                f"{stats['p99_ms']:>9}{len(stats['errors']):>8}"
+            )
+        self.stdout.write('Latencies in ms.')
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import User
+from complaints import counters
+from complaints.benchmarking import summarize
+from complaints.ledger import REWARD_AMOUNT
+from complaints.models import Complaint, CreditTransaction
+
+PREFIX = 'bench-validate-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the bulk validation endpoint from concurrent reviewers and check '
+        'that every complaint is rewarded exactly once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviewers', type=int, default=4, help='Concurrent reviewer sessions.')
+        parser.add_argument('--complaints', type=int, default=200)
+        parser.add_argument('--students', type=int, default=20)
+        parser.add_argument('--batch', type=int, default=25, help='Complaint ids per request.')
+        parser.add_argument(
+            '--overlap', action='store_true',
+            help='Have every reviewer validate every complaint (worst-case contention).',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError(f'Leftover {PREFIX}* users found; delete them before benchmarking.')
+        rng = random.Random(options['seed'])
+        students, reviewers, ids = self.create_data(options)
+        try:
+            timings, errors, elapsed = self.run(reviewers, ids, options, rng)
+            self.report(students, ids, timings, errors, elapsed)
+        finally:
+            Complaint.objects.filter(student__in=students).delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+            counters.rebuild(counters.compute_counters())
+
+    def create_data(self, options):
+        password = make_password(None)
+        students = User.objects.bulk_create([
+            User(username=f'{PREFIX}student-{n}', password=password, role='STUDENT', department='BENCH')
+            for n in range(options['students'])
+        ])
+        reviewers = User.objects.bulk_create([
+            User(username=f'{PREFIX}reviewer-{n}', password=password, role='HOD', department='BENCH')
+            for n in range(options['reviewers'])
+        ])
+        complaints = Complaint.objects.bulk_create([
+            Complaint(
+                student=students[n % len(students)], department='BENCH', category='INFRA',
+                title=f'Bench complaint {n}', description='Created by bench_bulk_validate.',
+            )
+            for n in range(options['complaints'])
+        ])
+        return students, reviewers, [c.pk for c in complaints]
+
+    def run(self, reviewers, ids, options, rng):
+        batch = options['batch']
+        timings, errors = [], []
+        lock = threading.Lock()
+
+        def work(reviewer, own_ids):
+            client = Client()
+            client.force_login(reviewer)
+            try:
+                for start in range(0, len(own_ids), batch):
+                    chunk = own_ids[start:start + batch]
+                    began = time.perf_counter()
+                    response = client.post(
+                        '/complaints/validate/bulk/',
+                        {'complaint_ids': ','.join(map(str, chunk)), 'valid': 'true'},
+                        HTTP_ACCEPT='application/json',
+                    )
+                    took = time.perf_counter() - began
+                    with lock:
+                        timings.append(took)
+                        if response.status_code != 200:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = []
+        for n, reviewer in enumerate(reviewers):
+            own_ids = list(ids) if options['overlap'] else ids[n::len(reviewers)]
+            rng.shuffle(own_ids)
+            threads.append(threading.Thread(target=work, args=(reviewer, own_ids)))
+        began = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return timings, errors, time.perf_counter() - began
+
+    def report(self, students, ids, timings, errors, elapsed):
+        stats = summarize(timings)
+        self.stdout.write(
+            f"{stats['count']} requests in {elapsed:.2f}s "
+            f"({stats['count'] / elapsed:.1f} req/s, {len(ids) / elapsed:.1f} complaints/s)"
+        )
+        self.stdout.write(f"latency p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms")
+
+        paid_twice = (
+            CreditTransaction.objects.filter(complaint_id__in=ids)
+            .values('complaint_id').annotate(n=Count('id')).filter(n__gt=1).count()
+        )
+        credited = User.objects.filter(pk__in=[s.pk for s in students]).aggregate(total=Sum('credits'))['total']
+        expected = len(ids) * REWARD_AMOUNT + len(students) * User._meta.get_field('credits').default
+        problems = []
+        if errors:
+            problems.append(f'{len(errors)} request(s) failed (statuses {sorted(set(errors))})')
+        if paid_twice:
+            problems.append(f'{paid_twice} complaint(s) paid more than once')
+        if credited != expected:
+            problems.append(f'student balances total {credited}, expected {expected}')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Every complaint was rewarded exactly once.'))
@@ -0,0 +1,108 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import User
+from complaints.benchmarking import summarize
+from complaints.fragments import FRAGMENT_CACHE
+from complaints.models import Complaint
+from core import metrics
+
+DUMMY = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare latency and template render time of the fragment-cached pages with '
+        'the fragment cache disabled and enabled, and report its hit rate.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument(
+            '--distinct', type=int, default=10,
+            help='Distinct detail pages / list filters cycled through (lower means more hits).',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        student = User.objects.filter(role='STUDENT', complaints__isnull=False).order_by('pk').first()
+        staff = User.objects.filter(role='ADMIN').order_by('pk').first()
+        if not (student and staff):
+            raise CommandError('Need a student with complaints and an ADMIN; run seed_data first.')
+        rng = random.Random(options['seed'])
+        distinct = options['distinct']
+        detail_ids = list(Complaint.objects.order_by('-id').values_list('id', flat=True)[:distinct])
+        list_queries = ['', 'status=OPEN', 'status=CLOSED', 'category=INFRA', 'category=CLEANING',
+                        'level=HOD', 'status=IN_PROCESS', 'category=FACULTY', 'level=ADMIN', 'category=STAFF'][:distinct]
+        scenarios = {
+            'dashboard_student': ('dashboard', student, lambda: '/dashboard/'),
+            'dashboard_staff': ('dashboard', staff, lambda: '/dashboard/'),
+            'list_student': ('complaints_list', student, lambda: '/complaints/'),
+            'list_staff': ('complaints_list', staff, lambda: f'/complaints/?{rng.choice(list_queries)}'),
+            'detail': ('complaint_detail', staff, lambda: f'/complaints/{rng.choice(detail_ids)}/'),
+        }
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver', 'localhost']), transaction.atomic():
+            for mode in ('off', 'on'):
+                fragment_caches = dict(settings.CACHES)
+                if mode == 'off':
+                    fragment_caches[FRAGMENT_CACHE] = DUMMY
+                with override_settings(CACHES=fragment_caches):
+                    caches[FRAGMENT_CACHE].clear()
+                    for name, (view, user, url) in scenarios.items():
+                        results.setdefault(name, {})[mode] = self.measure(view, user, url, options['iterations'])
+            transaction.set_rollback(True)
+        self.report(results)
+
+    def measure(self, view, user, url, iterations):
+        client = Client()
+        client.force_login(user)
+        fragment_cache = caches[FRAGMENT_CACHE]
+        lookups = {'hits': 0, 'misses': 0}
+        original_get = fragment_cache.get
+
+        def counting_get(key, default=None, version=None):
+            value = original_get(key, default, version)
+            if key.startswith('template.cache.'):
+                lookups['hits' if value is not None else 'misses'] += 1
+            return value
+
+        fragment_cache.get = counting_get
+        metrics.REQUEST_RENDER_TIME.reset()
+        timings = []
+        try:
+            for _ in range(iterations):
+                began = time.perf_counter()
+                response = client.get(url())
+                timings.append(time.perf_counter() - began)
+                if response.status_code != 200:
+                    raise CommandError(f'{url()} returned HTTP {response.status_code}')
+        finally:
+            del fragment_cache.get
+        count, render = metrics.REQUEST_RENDER_TIME.totals(view)
+        stats = summarize(timings)
+        stats['render_ms'] = round(render / count * 1000, 2) if count else 0.0
+        looked_up = lookups['hits'] + lookups['misses']
+        stats['hit_rate'] = lookups['hits'] / looked_up if looked_up else 0.0
+        return stats
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'scenario':<20}{'p50 off':>9}{'p50 on':>9}{'p95 off':>9}{'p95 on':>9}"
+            f"{'render off':>12}{'render on':>11}{'hits':>7}"
+        )
+        for name, modes in results.items():
+            off, on = modes['off'], modes['on']
+            self.stdout.write(
+                f"{name:<20}{off['p50_ms']:>9}{on['p50_ms']:>9}{off['p95_ms']:>9}{on['p95_ms']:>9}"
+                f"{off['render_ms']:>12}{on['render_ms']:>11}{on['hit_rate']:>7.0%}"
+            )
+        self.stdout.write('Times in ms; render is mean template render time per request.')
@@ -0,0 +1,194 @@
+import json
+import platform
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from accounts.context_processors import notifications
+from accounts.models import User
+from complaints.benchmarking import summarize
+from complaints.models import Complaint
+
+PREFIX = 'bench-views-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure p50/p95/p99 latency and query counts of the main views against the '
+        'current database (seed it with seed_data first). Requests run in autocommit, as '
+        'in production, and the accounts and complaints they create are deleted afterwards; '
+        'the cache is cleared too, so point it at a development database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--only', nargs='*', help='Run just these scenarios.')
+        parser.add_argument('--save', metavar='PATH', help='Write the results as a JSON baseline.')
+        parser.add_argument('--compare', metavar='PATH', help='Compare against a saved baseline.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed relative p95 slowdown before --compare reports a regression.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.clients = []
+        # No surrounding transaction: commit hooks (fragment version bumps, cache
+        # invalidation, deferred file writes) must run as they do in production
+        with override_settings(ALLOWED_HOSTS=['testserver', 'localhost']):
+            self.clean_up()
+            try:
+                scenarios = self.scenarios(options['iterations'] + options['warmup'])
+                wanted = options['only'] or list(scenarios)
+                unknown = set(wanted) - set(scenarios)
+                if unknown:
+                    raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+                results = {name: self.measure(scenarios[name], options) for name in wanted}
+            finally:
+                self.clean_up()
+        cache.clear()
+
+        self.print_table(results)
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'vendor': connection.vendor,
+                'python': platform.python_version(),
+                'complaints': Complaint.objects.count(),
+                'iterations': options['iterations'],
+            },
+            'scenarios': results,
+        }
+        if options['save']:
+            with open(options['save'], 'w') as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save']}")
+        if options['compare']:
+            self.compare(report, options['compare'], options['tolerance'])
+
+    def client(self, user):
+        client = Client()
+        client.force_login(user)
+        self.clients.append(client)
+        return client
+
+    def clean_up(self):
+        """Log the benchmark's clients out and delete the accounts it created.
+
+        Their complaints go with them; the delete signals take those back out of
+        the counters and notification counts.
+        """
+        for client in self.clients:
+            client.logout()
+        self.clients = []
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+    def scenarios(self, runs):
+        """Map scenario name -> callable doing one request (setup happens here, untimed)."""
+        student = User.objects.filter(role='STUDENT', complaints__isnull=False).order_by('pk').first()
+        hod = User.objects.filter(role__in=['HOD', 'FACULTY']).exclude(department='').order_by('pk').first()
+        admin = User.objects.filter(role='ADMIN').order_by('pk').first()
+        if not (student and hod and admin):
+            raise CommandError('Need at least one student with complaints, a FACULTY/HOD and an ADMIN; run seed_data.')
+        recent_ids = list(Complaint.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:500])
+
+        clients = {label: self.client(user) for label, user in (('student', student), ('hod', hod), ('admin', admin))}
+
+        # Fresh students for create_complaint so the 5-day cooldown never kicks in.
+        password = make_password(None)
+        users = User.objects.bulk_create([
+            User(username=f'{PREFIX}{n}', password=password, role='STUDENT', department=student.department)
+            for n in range(runs)
+        ])
+        if users and users[0].pk is None:
+            users = User.objects.filter(username__startswith=PREFIX)
+        creators = iter([self.client(user) for user in users])
+
+        def create():
+            return next(creators).post('/complaints/new/INFRA/', {
+                'category': 'INFRA', 'title': 'Benchmark complaint', 'description': 'Created by bench_views.',
+            })
+
+        factory = RequestFactory()
+
+        def processor(cold):
+            def run():
+                if cold:
+                    cache.clear()
+                request = factory.get('/dashboard/')
+                request.user = hod
+                return notifications(request)['notifications_count']()
+            return run
+
+        return {
+            'dashboard_student': lambda: clients['student'].get('/dashboard/'),
+            'dashboard_staff': lambda: clients['hod'].get('/dashboard/'),
+            'list_student': lambda: clients['student'].get('/complaints/'),
+            'list_staff': lambda: clients['admin'].get('/complaints/'),
+            'list_staff_filtered': lambda: clients['admin'].get('/complaints/?status=OPEN&category=INFRA'),
+            'detail': lambda: clients['hod'].get(f'/complaints/{self.rng.choice(recent_ids)}/'),
+            'create_complaint': create,
+            'notifications_cold': processor(cold=True),
+            'notifications_warm': processor(cold=False),
+        }
+
+    def measure(self, run, options):
+        timings, queries = [], []
+        for n in range(options['warmup'] + options['iterations']):
+            with CaptureQueriesContext(connection) as captured:
+                began = time.perf_counter()
+                response = run()
+                took = time.perf_counter() - began
+            status = getattr(response, 'status_code', 200)
+            if status >= 400:
+                raise CommandError(f'Scenario returned HTTP {status}')
+            if n >= options['warmup']:
+                timings.append(took)
+                queries.append(len(captured.captured_queries))
+        stats = summarize(timings)
+        stats['queries_p50'] = statistics.median(queries)
+        stats['queries_max'] = max(queries)
+        return stats
+
+    def print_table(self, results):
+        self.stdout.write(f"{'scenario':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<22}{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['queries_max']:>9}"
+            )
+
+    def compare(self, report, path, tolerance):
+        try:
+            with open(path) as fh:
+                baseline = json.load(fh)['scenarios']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+        regressions = []
+        self.stdout.write(f'\nCompared with {path}:')
+        for name, stats in report['scenarios'].items():
+            before = baseline.get(name)
+            if not before:
+                self.stdout.write(f'{name:<22}(not in baseline)')
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+            self.stdout.write(
+                f"{name:<22}p95 {before['p95_ms']} -> {stats['p95_ms']} ms ({change:+.0%}), "
+                f"queries {before['queries_max']} -> {stats['queries_max']}"
+            )
+            if change > tolerance:
+                regressions.append(f'{name} p95 {change:+.0%}')
+            if stats['queries_max'] > before['queries_max']:
+                regressions.append(f"{name} queries {before['queries_max']} -> {stats['queries_max']}")
+        if regressions:
+            raise CommandError('Regressions: ' + '; '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from complaints import escalation
+
+
+class Command(BaseCommand):
+    help = (
+        'Move complaints left untouched past their COMPLAINT_ESCALATION_HOURS deadline up one level '
+        '(CLASS -> HOD -> ADMIN), once or every --interval seconds. Several workers may run at once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.COMPLAINT_ESCALATION_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='Stop each tick after this many batches.')
+        parser.add_argument('--loop', action='store_true', help='Keep ticking instead of running once.')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between ticks.')
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='First give open complaints that predate escalate_at a deadline, counted from their last update.',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            count = escalation.backfill(options['batch_size'])
+            self.stdout.write(f'Scheduled {count} existing complaint(s).')
+        while True:
+            close_old_connections()
+            result = escalation.run(options['batch_size'], options['max_batches'])
+            if result.escalated or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Escalated {result.escalated} complaint(s) in {result.batches} batch(es).'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
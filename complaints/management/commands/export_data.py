@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import exports
+from complaints.filters import clean_filters
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream complaints, validations or credit transactions to a CSV/JSONL file '
+        '(optionally gzipped) with the same filters as the staff export endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', '-o', default='-', help='File to write; "-" for stdout.')
+        parser.add_argument('--since', help='First day to include (YYYY-MM-DD).')
+        parser.add_argument('--until', help='Last day to include (YYYY-MM-DD).')
+        parser.add_argument('--category')
+        parser.add_argument('--status')
+        parser.add_argument('--level')
+        parser.add_argument('--department')
+        parser.add_argument(
+            '--with-identities', action='store_true',
+            help='Include student/user ids and usernames (not anonymized).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since, until = exports.parse_range(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+        filters = clean_filters(options)
+        chunks = exports.stream(
+            options['kind'], options['format'], options['gzip'], filters, since, until,
+            identities=options['with_identities'],
+        )
+        if options['output'] == '-':
+            target = sys.stdout.buffer
+            for chunk in chunks:
+                target.write(chunk)
+            target.flush()
+            return
+        written = 0
+        with open(options['output'], 'wb') as target:
+            for chunk in chunks:
+                target.write(chunk)
+                written += len(chunk)
+        self.stderr.write(f"Wrote {written} bytes to {options['output']}.")
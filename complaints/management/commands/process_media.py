@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from complaints.fragments import bump_complaints_version
+from complaints.media import MediaSkipped, render_variants
+from complaints.models import Complaint, MediaJob
+from complaints.queue import claim
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnails and compressed previews for queued complaint attachments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Size of the process pool.')
+        parser.add_argument('--batch', type=int, default=20, help='Jobs claimed per poll.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of draining once.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls when idle.')
+        parser.add_argument('--max-attempts', type=int, default=3)
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which a RUNNING job from a dead worker is requeued.',
+        )
+
+    def handle(self, *args, **options):
+        done = 0
+        max_attempts = options['max_attempts']
+        pool = ProcessPoolExecutor(max_workers=options['workers'])
+        try:
+            while True:
+                close_old_connections()
+                self.requeue_stale(options['stale_after'], max_attempts)
+                ids = claim(
+                    MediaJob.objects.filter(status='PENDING', attempts__lt=max_attempts).order_by('id'),
+                    options['batch'],
+                    status='RUNNING', claimed_at=timezone.now(), attempts=F('attempts') + 1,
+                    updated_at=timezone.now(),
+                )
+                if ids:
+                    try:
+                        done += self.run_batch(pool, ids, max_attempts)
+                    except BrokenProcessPool:
+                        # A worker died (e.g. crashed on a malformed image); the
+                        # claim already counted the attempt, so it cannot loop forever.
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = ProcessPoolExecutor(max_workers=options['workers'])
+                        self.requeue(MediaJob.objects.filter(pk__in=ids, status='RUNNING'), max_attempts,
+                                     'Worker process died')
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} media job(s).'))
+
+    def requeue_stale(self, seconds, max_attempts):
+        cutoff = timezone.now() - timedelta(seconds=seconds)
+        self.requeue(MediaJob.objects.filter(status='RUNNING', claimed_at__lt=cutoff), max_attempts,
+                     'Worker hung or died')
+
+    def requeue(self, jobs, max_attempts, error):
+        """Put ``jobs`` back in the queue, failing those out of attempts."""
+        jobs.filter(attempts__gte=max_attempts).update(status='FAILED', last_error=error, updated_at=timezone.now())
+        jobs.filter(attempts__lt=max_attempts).update(status='PENDING', last_error=error, updated_at=timezone.now())
+
+    def run_batch(self, pool, ids, max_attempts):
+        jobs = MediaJob.objects.filter(pk__in=ids).select_related('complaint__media_blob')
+        futures = {}
+        for job in jobs:
+            complaint = job.complaint
+            blob = complaint.media_blob
+            content_type = blob.content_type if blob else ''
+            if not complaint.media or not content_type.startswith('image/'):
+                self.finish(job, 'SKIPPED', error='Not an image attachment')
+                continue
+            key = blob.sha256
+            future = pool.submit(render_variants, complaint.media.path, str(settings.MEDIA_ROOT), key)
+            futures[future] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                variants = future.result()
+            except MediaSkipped as exc:
+                self.finish(job, 'SKIPPED', error=str(exc))
+            except BrokenProcessPool:
+                raise
+            except Exception as exc:
+                retry = job.attempts < max_attempts
+                self.finish(job, 'PENDING' if retry else 'FAILED', error=f'{type(exc).__name__}: {exc}')
+            else:
+                Complaint.objects.filter(pk=job.complaint_id).update(
+                    media_variants=variants, updated_at=timezone.now()
+                )
+                # Listing thumbnails live in version-keyed fragments
+                bump_complaints_version()
+                self.finish(job, 'DONE')
+        return len(ids)
+
+    def finish(self, job, status, error=''):
+        MediaJob.objects.filter(pk=job.pk).update(status=status, last_error=error, updated_at=timezone.now())
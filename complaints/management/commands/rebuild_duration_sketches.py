@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import sketches
+
+
+class Command(BaseCommand):
+    help = 'Replay the status transition log into the resolution-time sketches, or check them for drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift between stored and replayed buckets; exit non-zero if any.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expected = sketches.compute_buckets()
+        drift = sketches.find_drift(expected)
+        for (metric, category, level, index), (stored, wanted) in sorted(drift.items()):
+            self.stdout.write(f'{metric} {category} {level} bucket {index}: {stored}->{wanted}')
+
+        if options['check']:
+            if drift:
+                raise CommandError(f'{len(drift)} sketch bucket(s) drifted.')
+            self.stdout.write(self.style.SUCCESS('Sketches are consistent.'))
+            return
+
+        sketches.rebuild(expected, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(expected)} sketch bucket(s); fixed {len(drift)} drifted.'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from complaints import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold complaints and validations changed since the last run into the daily rollup tables '
+        'behind the analytics page, or rebuild them from the whole history.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute every day, ROLLUP_CHUNK_DAYS per transaction, instead of only changed ones.',
+        )
+
+    def handle(self, *args, **options):
+        result = rollups.rebuild() if options['rebuild'] else rollups.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {result.complaint_days} complaint day(s) and {result.validation_days} validation day(s).'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from complaints import routing
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-route every unresolved complaint to the staff responsible for it, rewriting the inbox '
+        'assignments. Run after bulk staff changes, or once after upgrading.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=routing.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        routing.staff_changed()
+        complaints, assignments = routing.route_open(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Routed {complaints} complaint(s) to {assignments} inbox assignment(s).'
+        ))
@@ -0,0 +1,254 @@
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import User, STREAM_CHOICES, WORKING_AT_CHOICES, DEPARTMENT_GROUP_CHOICES
+from accounts.registration import WORKING_AT_ROLES, WORKING_AT_VALUES
+from complaints import counters, routing, sketches
+from complaints.fragments import bump_complaints_version
+from complaints.ledger import REWARD_AMOUNT, REWARD_REASON
+from complaints.models import (
+    Complaint, CreditTransaction, StatusTransition, ValidationLog, CATEGORY_CHOICES, LEVEL_CHOICES, escalation_due,
+)
+from complaints.notifications import invalidate_open_count
+
+# register_staff's working_at -> role mapping, keyed by the stored value
+STAFF_ROLES = {WORKING_AT_VALUES[key]: role for key, role in WORKING_AT_ROLES.items()}
+STATUS_WEIGHTS = {'OPEN': 3, 'IN_PROCESS': 2, 'CLOSED': 5}
+TITLES = {
+    'INFRA': ['Projector not working in room {n}', 'Broken bench in lab {n}', 'Wi-Fi down on floor {n}'],
+    'FACULTY': ['Lecture {n} cancelled without notice', 'Assignment {n} never graded'],
+    'STAFF': ['Rude behaviour at counter {n}', 'Fee receipt {n} not issued'],
+    'STUDENT': ['Ragging near block {n}', 'Noise in library section {n}'],
+    'CLEANING': ['Washroom {n} not cleaned', 'Garbage piling up near gate {n}'],
+}
+DESCRIPTION = (
+    'Reported by the seed_data command. This happens most days of the week and '
+    'nobody has responded to the earlier verbal complaints about it.'
+)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at values."""
+    fields = [
+        f for model in models for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Seed realistic volumes of students, staff, complaints, validations and credit transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--staff', type=int, default=120)
+        parser.add_argument('--complaints', type=int, default=100000)
+        parser.add_argument('--valid-rate', type=float, default=0.35, help='Share of complaints marked valid.')
+        parser.add_argument('--days', type=int, default=365, help='Spread complaints over this many days.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed-', help='Username prefix of generated accounts.')
+        parser.add_argument('--password', default='seed-password', help='Password shared by generated accounts.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded accounts first.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if options['clear']:
+            self.clear(prefix)
+        # Hash once; every generated account shares the same password.
+        password = make_password(options['password'])
+        students = self.create_students(prefix, password, options['students'])
+        staff = self.create_staff(prefix, password, options['staff'])
+        credits = self.create_complaints(students, options)
+        self.create_reviews(prefix, staff)
+        self.create_transitions(prefix, staff)
+        self.pay_credits(credits)
+
+        counters.rebuild(counters.compute_counters())
+        sketches.rebuild(sketches.compute_buckets())
+        routing.staff_changed()
+        routed, assignments = routing.route_open(self.batch_size)
+        self.stdout.write(f'  {assignments} inbox assignments for {routed} open complaints')
+        bump_complaints_version()
+        for department in {s.department for s in students} | {''}:
+            invalidate_open_count(department)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(students)} students, {len(staff)} staff and {options['complaints']} complaints."
+        ))
+
+    def clear(self, prefix):
+        seeded = User.objects.filter(username__startswith=prefix)
+        for chunk in batched(seeded.values_list('pk', flat=True).iterator(), self.batch_size):
+            # The transition log has no foreign key to cascade along
+            StatusTransition.objects.filter(complaint__student_id__in=chunk).delete()
+            # The counters are rebuilt once seeding is done
+            with counters.keeping_counts():
+                Complaint.objects.filter(student_id__in=chunk).delete()
+        deleted, _ = seeded.delete()
+        self.stdout.write(f'Removed {deleted} previously seeded row(s).')
+
+    def create_students(self, prefix, password, count):
+        streams = [key for key, _ in STREAM_CHOICES]
+        users = (
+            User(
+                username=f'{prefix}student-{n}', password=password, role='STUDENT',
+                first_name='Student', last_name=str(n), email=f'{prefix}student-{n}@example.com',
+                phone=f'9{n:09d}'[-10:], enrollment_number=f'{prefix}student-{n}',
+                stream=streams[n % len(streams)], department=streams[n % len(streams)],
+            )
+            for n in range(count)
+        )
+        return self.insert(User, users, 'students')
+
+    def create_staff(self, prefix, password, count):
+        places = [key for key, _ in WORKING_AT_CHOICES]
+        groups = [key for key, _ in DEPARTMENT_GROUP_CHOICES]
+        labels = dict(DEPARTMENT_GROUP_CHOICES)
+        streams = [key for key, _ in STREAM_CHOICES]
+        users = []
+        for n in range(count):
+            working_at = places[n % len(places)]
+            group = groups[n % len(groups)] if working_at in ('TEACHING_FACULTY', 'HOD') else ''
+            users.append(User(
+                username=f'{prefix}staff-{n}', password=password, role=STAFF_ROLES[working_at],
+                first_name='Staff', last_name=str(n), email=f'{prefix}staff-{n}@example.com',
+                college_id=f'{prefix}staff-{n}', working_at=working_at,
+                department=labels.get(group, ''), faculty_department=group,
+                hod_department=group if working_at == 'HOD' else '',
+                faculty_streams=self.rng.sample(streams, 2) if working_at == 'TEACHING_FACULTY' else [],
+            ))
+        return self.insert(User, users, 'staff')
+
+    def create_complaints(self, students, options):
+        """Insert complaints in batches; return the reward owed to each student."""
+        now = timezone.now()
+        span = options['days'] * 86400
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+        categories = [key for key, _ in CATEGORY_CHOICES]
+        levels = [key for key, _ in LEVEL_CHOICES]
+        credits = Counter()
+
+        def generate():
+            for n in range(options['complaints']):
+                student = self.rng.choice(students)
+                category = self.rng.choice(categories)
+                status = self.rng.choices(statuses, weights)[0]
+                created = now - timedelta(seconds=self.rng.randrange(span))
+                updated = min(now, created + timedelta(hours=self.rng.randrange(1, 240)))
+                valid = status != 'OPEN' and self.rng.random() < options['valid_rate']
+                if valid:
+                    credits[student.pk] += REWARD_AMOUNT
+                level = levels[0] if status == 'OPEN' else self.rng.choice(levels)
+                yield Complaint(
+                    student=student, department=student.department, category=category, status=status,
+                    level=level, escalate_at=escalation_due(category, level, updated, status),
+                    title=self.rng.choice(TITLES.get(category, ['Complaint {n}'])).format(n=n % 97),
+                    description=DESCRIPTION, is_valid=valid, rewarded_at=updated if valid else None,
+                    created_at=created, updated_at=updated,
+                )
+
+        with explicit_timestamps(Complaint):
+            self.insert(Complaint, generate(), 'complaints', keep=False)
+        return credits
+
+    def create_reviews(self, prefix, staff):
+        """One validation log per reviewed complaint, plus the matching credit entry."""
+        reviewers = [u.pk for u in staff if u.role != 'STAFF'] or [u.pk for u in staff]
+        reviewed = (
+            Complaint.objects.filter(student__username__startswith=prefix)
+            .filter(Q(status='CLOSED') | Q(is_valid=True))
+            .order_by('pk')
+            .values_list('id', 'student_id', 'is_valid', 'updated_at')
+        )
+        logs, payouts = 0, 0
+        with explicit_timestamps(ValidationLog, CreditTransaction):
+            for chunk in batched(reviewed.iterator(chunk_size=self.batch_size), self.batch_size):
+                with transaction.atomic():
+                    ValidationLog.objects.bulk_create([
+                        ValidationLog(
+                            complaint_id=pk, reviewer_id=self.rng.choice(reviewers), valid=valid, created_at=at,
+                        )
+                        for pk, _, valid, at in chunk
+                    ])
+                    paid = [
+                        CreditTransaction(
+                            user_id=student_id, complaint_id=pk, amount=REWARD_AMOUNT,
+                            reason=REWARD_REASON, created_at=at,
+                        )
+                        for pk, student_id, valid, at in chunk if valid
+                    ]
+                    CreditTransaction.objects.bulk_create(paid)
+                logs += len(chunk)
+                payouts += len(paid)
+        self.stdout.write(f'  {logs} validation logs, {payouts} credit transactions')
+
+    def create_transitions(self, prefix, staff):
+        """Status history ending in each complaint's seeded status: OPEN -> IN_PROCESS (-> CLOSED)."""
+        handlers = [u.pk for u in staff]
+        changed = (
+            Complaint.objects.filter(student__username__startswith=prefix).exclude(status='OPEN')
+            .order_by('pk')
+            .values_list('id', 'category', 'status', 'level', 'created_at', 'updated_at')
+        )
+
+        def generate():
+            for pk, category, status, level, created, updated in changed.iterator(chunk_size=self.batch_size):
+                steps = [('OPEN', 'CLASS', 'IN_PROCESS', level, updated)]
+                if status == 'CLOSED':
+                    picked_up = created + (updated - created) * self.rng.random()
+                    steps = [
+                        ('OPEN', 'CLASS', 'IN_PROCESS', 'CLASS', picked_up),
+                        ('IN_PROCESS', 'CLASS', 'CLOSED', level, updated),
+                    ]
+                for from_status, from_level, to_status, to_level, at in steps:
+                    yield StatusTransition(
+                        complaint_id=pk, changed_by_id=self.rng.choice(handlers), category=category,
+                        from_status=from_status, to_status=to_status, from_level=from_level, to_level=to_level,
+                        elapsed=int((at - created).total_seconds()), created_at=at,
+                    )
+
+        self.insert(StatusTransition, generate(), 'status transitions', keep=False)
+
+    def pay_credits(self, credits):
+        users = [User(pk=pk, credits=User._meta.get_field('credits').default + amount) for pk, amount in credits.items()]
+        User.objects.bulk_update(users, ['credits'], batch_size=self.batch_size)
+
+    def insert(self, model, objects, label, keep=True):
+        created, total = [], 0
+        for chunk in batched(objects, self.batch_size):
+            with transaction.atomic():
+                rows = model.objects.bulk_create(chunk)
+            total += len(rows)
+            if keep:
+                created.extend(rows)
+        self.stdout.write(f'  {total} {label}')
+        if keep and created and created[0].pk is None:
+            # Backends that cannot return ids from bulk inserts (MySQL).
+            names = [obj.username for obj in created]
+            created = list(model.objects.filter(username__in=names))
+        return created
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary onto the DB_REPLICA_FILES replicas, once or every --interval '
+        'seconds, so replica reads can be tried locally with a realistic lag.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep copying instead of syncing once.')
+        parser.add_argument(
+            '--interval', type=float, default=settings.DATABASE_REPLICA_MAX_LAG,
+            help='Seconds between copies; replicas trail the primary by up to this much.',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Only SQLite replicas are synced by this command.')
+        targets = [connections[alias].settings_dict['NAME'] for alias in settings.DATABASE_REPLICAS]
+        if not targets:
+            raise CommandError('No replicas configured; set DB_REPLICA_FILES.')
+        while True:
+            began = time.perf_counter()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for name in targets:
+                    target = sqlite3.connect(name)
+                    try:
+                        # Online backup: a consistent snapshot, even with writers active
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(
+                f'Synced {len(targets)} replica(s) in {(time.perf_counter() - began) * 1000:.0f} ms.'
+            )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
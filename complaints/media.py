@@ -0,0 +1,58 @@
+"""Derived image variants for complaint attachments.
+
+:func:`render_variants` runs inside worker processes of the ``process_media``
+pool, so it only takes plain paths and returns plain dicts; the parent
+process does all database work. Pillow is optional: without it image jobs
+are skipped and pages keep linking to the original.
+"""
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+# (name, longest edge in px, JPEG quality)
+VARIANTS = [
+    ('thumb', 320, 70),
+    ('preview', 1280, 80),
+]
+
+
+class MediaSkipped(Exception):
+    """The attachment cannot be processed (not an image, or no Pillow)."""
+
+
+def variant_name(key: str, kind: str) -> str:
+    return f'derived/{key[:2]}/{key}_{kind}.jpg'
+
+
+def render_variants(source_path: str, media_root: str, key: str) -> dict:
+    """Write metadata-free JPEG variants of ``source_path`` and describe them.
+
+    Variants are named after ``key`` (the blob digest), so an image shared by
+    several complaints is only rendered once.
+    """
+    if Image is None:
+        raise MediaSkipped('Pillow is not installed')
+    results = {}
+    with Image.open(source_path) as original:
+        # Apply EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for kind, edge, quality in VARIANTS:
+            name = variant_name(key, kind)
+            path = os.path.join(media_root, name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                variant = image.copy()
+                variant.thumbnail((edge, edge))
+                # No exif/icc_profile arguments: EXIF, GPS and embedded
+                # thumbnails from the camera are not carried over.
+                variant.save(path + '.tmp', 'JPEG', quality=quality, optimize=True, progressive=True)
+                os.replace(path + '.tmp', path)
+            with Image.open(path) as written:
+                width, height = written.size
+            results[kind] = {'name': name, 'width': width, 'height': height, 'size': os.path.getsize(path)}
+    return results
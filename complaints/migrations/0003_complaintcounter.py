@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:43
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    """Populate counters for complaints filed before counters existed."""
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintCounter = apps.get_model('complaints', 'ComplaintCounter')
+    status_columns = {'OPEN': 'open', 'IN_PROCESS': 'in_process', 'CLOSED': 'closed'}
+    totals = defaultdict(lambda: defaultdict(int))
+    rows = Complaint.objects.order_by().values(
+        'category', 'student_id', 'student__department', 'status', 'is_valid'
+    ).annotate(n=Count('id'))
+    for row in rows:
+        dept = (row['student__department'] or '').strip().upper()
+        for key in ('global', f"category:{row['category']}", f'department:{dept}', f"student:{row['student_id']}"):
+            totals[key]['total'] += row['n']
+            totals[key][status_columns[row['status']]] += row['n']
+            if row['is_valid']:
+                totals[key]['validated'] += row['n']
+    ComplaintCounter.objects.bulk_create(
+        [ComplaintCounter(key=key, **values) for key, values in totals.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0002_complaint_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintCounter',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('total', models.IntegerField(default=0)),
+                ('open', models.IntegerField(default=0)),
+                ('in_process', models.IntegerField(default=0)),
+                ('closed', models.IntegerField(default=0)),
+                ('validated', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
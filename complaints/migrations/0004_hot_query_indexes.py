@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_complaintcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['student', 'category', 'created_at'], name='complaint_cooldown_idx'),
+        ),
+    ]
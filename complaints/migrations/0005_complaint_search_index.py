@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# The DDL is frozen here rather than imported from complaints.search, so
+# later edits to the search module never change what this migration does.
+SQLITE_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS complaints_complaint_fts USING fts5(
+        title, description,
+        content='complaints_complaint', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_ai AFTER INSERT ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_ad AFTER DELETE ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_au AFTER UPDATE OF title, description ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO complaints_complaint_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    "INSERT INTO complaints_complaint_fts(complaints_complaint_fts) VALUES ('rebuild')",
+]
+SQLITE_TEARDOWN = [
+    'DROP TRIGGER IF EXISTS complaints_complaint_fts_ai',
+    'DROP TRIGGER IF EXISTS complaints_complaint_fts_ad',
+    'DROP TRIGGER IF EXISTS complaints_complaint_fts_au',
+    'DROP TABLE IF EXISTS complaints_complaint_fts',
+]
+MYSQL_SETUP = ['ALTER TABLE complaints_complaint ADD FULLTEXT INDEX complaint_fulltext_idx (title, description)']
+MYSQL_TEARDOWN = ['ALTER TABLE complaints_complaint DROP INDEX complaint_fulltext_idx']
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_SETUP, 'mysql': MYSQL_SETUP}),
+            run({'sqlite': SQLITE_TEARDOWN, 'mysql': MYSQL_TEARDOWN}),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the FTS sync triggers from migration 0005
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_ai AFTER INSERT ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_ad AFTER DELETE ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_au AFTER UPDATE OF title, description ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO complaints_complaint_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+
+def reinstall_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in FTS_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='media_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed'), ('SKIPPED', 'Skipped')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='complaints.complaint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='mediajob_status_idx')],
+            },
+        ),
+        # Adding media_variants rebuilds the complaint table on SQLite
+        migrations.RunPython(reinstall_sqlite_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_already_rewarded(apps, schema_editor):
+    """Complaints that were ever validated as valid have already been paid."""
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Complaint.objects.filter(validations__valid=True).update(rewarded_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0007_media_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='rewarded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='complaint',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_transactions', to='complaints.complaint'),
+        ),
+        migrations.RunPython(mark_already_rewarded, migrations.RunPython.noop),
+    ]
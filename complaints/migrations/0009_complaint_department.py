@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.db.models.functions import Trim, Upper
+
+BATCH_SIZE = 5000
+
+# Frozen copy of the FTS sync triggers from migration 0005
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_ai AFTER INSERT ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_ad AFTER DELETE ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_au AFTER UPDATE OF title, description ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO complaints_complaint_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+
+def reinstall_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in FTS_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+def backfill_department(apps, schema_editor):
+    """Copy each student's department onto their complaints, one pk range per transaction.
+
+    Short transactions keep locks brief on large tables, and a rerun after an
+    interruption only has to redo the ranges that were not committed.
+    """
+    Complaint = apps.get_model('complaints', 'Complaint')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    db = schema_editor.connection.alias
+    bounds = Complaint.objects.using(db).aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    department = Subquery(User.objects.using(db).filter(pk=OuterRef('student_id')).values('department')[:1])
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        with transaction.atomic(using=db):
+            Complaint.objects.using(db).filter(
+                pk__gte=start, pk__lt=start + BATCH_SIZE, department='',
+            ).update(department=Upper(Trim(department)))
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ('complaints', '0008_credit_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='department',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        # Adding the column rebuilds the complaint table on SQLite
+        migrations.RunPython(reinstall_sqlite_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_department, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'department'], name='complaint_status_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['department', 'created_at', 'id'], name='complaint_dept_created_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:27
+
+import complaints.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_complaint_department'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComplaint',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('department', models.CharField(blank=True, default='', max_length=20)),
+                ('category', models.CharField(choices=[('CLEANING', 'Cleaning'), ('FACULTY', 'Teaching Faculty'), ('STAFF', 'Staff Behavior'), ('INFRA', 'Infrastructure'), ('STUDENT', 'Student Behavior')], max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('media', models.FileField(blank=True, null=True, upload_to='complaints/')),
+                ('media_variants', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('IN_PROCESS', 'In Process'), ('CLOSED', 'Closed')], max_length=20)),
+                ('level', models.CharField(choices=[('CLASS', 'Class Mentor'), ('HOD', 'Head of Department'), ('ADMIN', 'Admin Office')], max_length=20)),
+                ('is_valid', models.BooleanField(default=False)),
+                ('rewarded_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('media_blob', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_complaints', to='complaints.mediablob')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_complaints', to=settings.AUTH_USER_MODEL)),
+            ],
+            bases=(complaints.models.AttachmentVariantsMixin, models.Model),
+        ),
+        migrations.AddField(
+            model_name='credittransaction',
+            name='archived_complaint',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_transactions', to='complaints.archivedcomplaint'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedValidationLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('valid', models.BooleanField()),
+                ('note', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='validations', to='complaints.archivedcomplaint')),
+                ('reviewer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyComplaintStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('CLEANING', 'Cleaning'), ('FACULTY', 'Teaching Faculty'), ('STAFF', 'Staff Behavior'), ('INFRA', 'Infrastructure'), ('STUDENT', 'Student Behavior')], max_length=20)),
+                ('department', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('IN_PROCESS', 'In Process'), ('CLOSED', 'Closed')], max_length=20)),
+                ('complaints', models.PositiveIntegerField(default=0)),
+                ('validated', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyValidationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('CLEANING', 'Cleaning'), ('FACULTY', 'Teaching Faculty'), ('STAFF', 'Staff Behavior'), ('INFRA', 'Infrastructure'), ('STUDENT', 'Student Behavior')], max_length=20)),
+                ('department', models.CharField(blank=True, max_length=20)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('valid', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['updated_at'], name='complaint_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='validationlog',
+            index=models.Index(fields=['created_at'], name='validationlog_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycomplaintstat',
+            constraint=models.UniqueConstraint(fields=('day', 'category', 'department', 'status'), name='dailycomplaintstat_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyvalidationstat',
+            constraint=models.UniqueConstraint(fields=('day', 'category', 'department'), name='dailyvalidationstat_key'),
+        ),
+    ]
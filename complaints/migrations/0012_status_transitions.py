@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_daily_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DurationBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('TO_CLOSE', 'Time to close'), ('OPEN', 'Time open'), ('IN_PROCESS', 'Time in process')], max_length=20)),
+                ('category', models.CharField(choices=[('CLEANING', 'Cleaning'), ('FACULTY', 'Teaching Faculty'), ('STAFF', 'Staff Behavior'), ('INFRA', 'Infrastructure'), ('STUDENT', 'Student Behavior')], max_length=20)),
+                ('level', models.CharField(choices=[('CLASS', 'Class Mentor'), ('HOD', 'Head of Department'), ('ADMIN', 'Admin Office')], max_length=20)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'category', 'level', 'bucket'), name='durationbucket_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('CLEANING', 'Cleaning'), ('FACULTY', 'Teaching Faculty'), ('STAFF', 'Staff Behavior'), ('INFRA', 'Infrastructure'), ('STUDENT', 'Student Behavior')], max_length=20)),
+                ('from_status', models.CharField(choices=[('OPEN', 'Open'), ('IN_PROCESS', 'In Process'), ('CLOSED', 'Closed')], max_length=20)),
+                ('to_status', models.CharField(choices=[('OPEN', 'Open'), ('IN_PROCESS', 'In Process'), ('CLOSED', 'Closed')], max_length=20)),
+                ('from_level', models.CharField(choices=[('CLASS', 'Class Mentor'), ('HOD', 'Head of Department'), ('ADMIN', 'Admin Office')], max_length=20)),
+                ('to_level', models.CharField(choices=[('CLASS', 'Class Mentor'), ('HOD', 'Head of Department'), ('ADMIN', 'Admin Office')], max_length=20)),
+                ('elapsed', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_changes', to=settings.AUTH_USER_MODEL)),
+                ('complaint', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transitions', to='complaints.complaint')),
+            ],
+        ),
+    ]
@@ -1,5 +1,8 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.utils import timezone
 
 CATEGORY_CHOICES = [
@@ -22,21 +25,153 @@ LEVEL_CHOICES = [
     ('ADMIN', 'Admin Office'),
 ]
 
-class Complaint(models.Model):
+class MediaBlob(models.Model):
+    """One stored attachment, addressed by the SHA-256 of its content.
+
+    ``refcount`` tracks how many complaints point at the blob; the file is
+    removed once the last of them is deleted.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.content_type}, {self.refcount} refs)"
+
+def normalize_department(value) -> str:
+    return (value or '').strip().upper()
+
+
+# Where the escalation scheduler moves a stale complaint next
+NEXT_LEVEL = {'CLASS': 'HOD', 'HOD': 'ADMIN'}
+
+
+def escalation_hours(category, level) -> int:
+    """Hours a complaint may sit untouched at ``level``; 0 if it never escalates from there."""
+    if level not in NEXT_LEVEL:
+        return 0
+    hours = settings.COMPLAINT_ESCALATION_HOURS
+    return hours.get(category, hours['*'])[level]
+
+
+def escalation_due(category, level, since, status='OPEN'):
+    """When a complaint left at ``level`` since ``since`` escalates; None if it never does."""
+    hours = 0 if status == 'CLOSED' else escalation_hours(category, level)
+    return since + timedelta(hours=hours) if hours else None
+
+
+class AttachmentVariantsMixin:
+    """URLs of the derived previews in ``media_variants``."""
+
+    def _variant_url(self, kind):
+        variant = (self.media_variants or {}).get(kind)
+        return default_storage.url(variant['name']) if variant else None
+
+    @property
+    def thumbnail_url(self):
+        return self._variant_url('thumb')
+
+    @property
+    def preview_url(self):
+        return self._variant_url('preview')
+
+
+class Complaint(AttachmentVariantsMixin, models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='complaints')
+    # Snapshot of the student's department (normalized) taken when the
+    # complaint is filed, so staff paths never need the student row
+    department = models.CharField(max_length=20, blank=True, default='', editable=False)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     title = models.CharField(max_length=200)
     description = models.TextField()
     media = models.FileField(upload_to='complaints/', blank=True, null=True)
+    media_blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='complaints')
+    # Derived previews written by the media worker, e.g.
+    # {"thumb": {"name": "derived/..", "width": 320, "height": 240, "size": 9120}}
+    media_variants = models.JSONField(default=dict, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, default='CLASS')
     is_valid = models.BooleanField(default=False)
+    # Set once the validation reward has been paid; guards against paying twice
+    rewarded_at = models.DateTimeField(null=True, blank=True)
+    # Next SLA escalation (complaints.escalation); None once CLOSED or at ADMIN
+    escalate_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination walks these newest-first on (created_at, id).
+            models.Index(fields=['created_at', 'id'], name='complaint_created_id_idx'),
+            models.Index(fields=['student', 'created_at', 'id'], name='complaint_student_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='complaint_status_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='complaint_category_created_idx'),
+            # Per-category cooldown: latest complaint for (student, category).
+            models.Index(fields=['student', 'category', 'created_at'], name='complaint_cooldown_idx'),
+            # OPEN counts per department and the staff department filter.
+            models.Index(fields=['status', 'department'], name='complaint_status_dept_idx'),
+            models.Index(fields=['department', 'created_at', 'id'], name='complaint_dept_created_idx'),
+            # Rows changed since the rollup watermark (complaints.rollups)
+            models.Index(fields=['updated_at'], name='complaint_updated_idx'),
+            # Due escalations, earliest first
+            models.Index(fields=['escalate_at'], name='complaint_escalate_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.department:
+            self.department = normalize_department(self.student.department)
+        if self._state.adding and self.escalate_at is None:
+            self.escalate_at = escalation_due(self.category, self.level, timezone.now(), self.status)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.get_category_display()}: {self.title} ({self.get_status_display()})"
 
+MEDIA_JOB_STATUS_CHOICES = [
+    ('PENDING', 'Pending'),
+    ('RUNNING', 'Running'),
+    ('DONE', 'Done'),
+    ('FAILED', 'Failed'),
+    ('SKIPPED', 'Skipped'),
+]
+
+class MediaJob(models.Model):
+    """Queue entry asking the media worker to derive previews for a complaint."""
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='media_jobs')
+    status = models.CharField(max_length=10, choices=MEDIA_JOB_STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='mediajob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Media job {self.id} for complaint {self.complaint_id} ({self.status})"
+
+class ComplaintCounter(models.Model):
+    """Running complaint tallies for one scope, maintained by the write views.
+
+    ``key`` is ``global``, ``category:<CODE>``, ``department:<DEPT>`` or
+    ``student:<id>``; per-status counts live in the columns of each row.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    total = models.IntegerField(default=0)
+    open = models.IntegerField(default=0)
+    in_process = models.IntegerField(default=0)
+    closed = models.IntegerField(default=0)
+    validated = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}: {self.total}"
+
 class ValidationLog(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='validations')
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='reviews')
@@ -44,11 +179,156 @@ class ValidationLog(models.Model):
     note = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='validationlog_created_idx'),
+        ]
+
 class CreditTransaction(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='credit_transactions')
+    complaint = models.ForeignKey(Complaint, on_delete=models.SET_NULL, null=True, blank=True, related_name='credit_transactions')
+    # Takes over from ``complaint`` once the complaint is archived
+    archived_complaint = models.ForeignKey(
+        'ArchivedComplaint', on_delete=models.SET_NULL, null=True, blank=True, related_name='credit_transactions',
+    )
     amount = models.IntegerField()
     reason = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class ArchivedComplaint(AttachmentVariantsMixin, models.Model):
+    """A CLOSED complaint moved out of the hot table by ``archive_complaints``.
+
+    Keeps the complaint's id and fields, and takes over its attachment
+    reference; read-only from then on.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_complaints')
+    department = models.CharField(max_length=20, blank=True, default='')
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    media = models.FileField(upload_to='complaints/', blank=True, null=True)
+    media_blob = models.ForeignKey(
+        MediaBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='archived_complaints',
+    )
+    media_variants = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    is_valid = models.BooleanField(default=False)
+    rewarded_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_category_display()}: {self.title} (archived)"
+
+class ArchivedValidationLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    complaint = models.ForeignKey(ArchivedComplaint, on_delete=models.CASCADE, related_name='validations')
+    reviewer = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='archived_reviews',
+    )
+    valid = models.BooleanField()
+    note = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+
+
+class DailyComplaintStat(models.Model):
+    """Complaints filed on ``day``, per category, department and current status."""
+    day = models.DateField()
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    department = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    complaints = models.PositiveIntegerField(default=0)
+    validated = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'department', 'status'], name='dailycomplaintstat_key'),
+        ]
+
+class DailyValidationStat(models.Model):
+    """Validation reviews recorded on ``day``, per complaint category and department."""
+    day = models.DateField()
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    department = models.CharField(max_length=20, blank=True)
+    reviews = models.PositiveIntegerField(default=0)
+    valid = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'department'], name='dailyvalidationstat_key'),
+        ]
+
+class RollupWatermark(models.Model):
+    """How far ``complaints.rollups`` has folded changes into the daily tables."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value:%Y-%m-%d %H:%M:%S}"
+
+class StatusTransition(models.Model):
+    """One status and/or level change, appended by ``triage.apply`` in the same transaction.
+
+    No database foreign key on ``complaint``, so the history outlives
+    archiving; never updated or deleted.
+    """
+    complaint = models.ForeignKey(
+        Complaint, on_delete=models.DO_NOTHING, db_constraint=False, related_name='transitions',
+    )
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='status_changes',
+    )
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    from_status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    from_level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    to_level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    # Seconds between filing the complaint and this change
+    elapsed = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Complaint {self.complaint_id}: {self.from_status}/{self.from_level} -> {self.to_status}/{self.to_level}"
+
+class ComplaintAssignment(models.Model):
+    """An unresolved complaint in one staff member's inbox, written by ``complaints.routing``."""
+    staff = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='assignments')
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='assignments')
+    # Copied from the complaint so the inbox pages on this table's index alone
+    complaint_created_at = models.DateTimeField()
+    assigned_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['staff', 'complaint'], name='complaintassignment_key'),
+        ]
+        indexes = [
+            # The inbox, newest complaint first
+            models.Index(fields=['staff', 'complaint_created_at', 'complaint'], name='assignment_inbox_idx'),
+        ]
+
+DURATION_METRIC_CHOICES = [
+    ('TO_CLOSE', 'Time to close'),
+    ('OPEN', 'Time open'),
+    ('IN_PROCESS', 'Time in process'),
+]
+
+class DurationBucket(models.Model):
+    """One bucket of a duration sketch (``complaints.sketches``) per metric, category and level."""
+    metric = models.CharField(max_length=20, choices=DURATION_METRIC_CHOICES)
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'category', 'level', 'bucket'], name='durationbucket_key'),
+        ]
+
+
 # Create your models here.
@@ -0,0 +1,111 @@
+"""Cached OPEN-complaint counts behind the staff notification badge.
+
+Counts are cached per department (the snapshot stored on each complaint) plus
+one bucket for complaints whose student had no department (those are visible
+to every department), so a FACULTY/HOD count is the sum of two cache entries
+and an ADMIN count is one.
+Writes that change the set of OPEN complaints drop the affected entries once
+their transaction commits.
+
+Open badge streams (``notifications_stream``) subscribe to the in-process
+:data:`~complaints.hub.hub` under :func:`stream_key`. A commit that drops
+counts recounts each affected key once and pushes the result to every
+subscriber. A periodic sweep picks up writes made by other processes.
+
+Counts may be read from a replica (the marked reporting views and the
+sweep); those are cached for at most ``DATABASE_REPLICA_MAX_LAG`` seconds so
+a count taken before the replica caught up with a write doesn't stick.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import replicas
+from .hub import hub
+from .models import Complaint, normalize_department
+
+ALL_KEY = 'notifications:open:all'
+# Hub key of the streams that show the count over all departments
+STREAM_ALL = '*'
+
+
+def _department_key(department: str) -> str:
+    return f"notifications:open:dept:{(department or '').strip().lower()}"
+
+
+def _timeout() -> int:
+    if replicas.reads_from_replica():
+        return min(settings.NOTIFICATIONS_CACHE_TIMEOUT, settings.DATABASE_REPLICA_MAX_LAG)
+    return settings.NOTIFICATIONS_CACHE_TIMEOUT
+
+
+def _count_department(department: str) -> int:
+    return Complaint.objects.filter(status='OPEN', department=normalize_department(department)).count()
+
+
+def open_count_all() -> int:
+    count = cache.get(ALL_KEY)
+    if count is None:
+        count = Complaint.objects.filter(status='OPEN').count()
+        cache.set(ALL_KEY, count, _timeout())
+    return count
+
+
+def open_count_for_department(department: str) -> int:
+    """OPEN complaints from ``department`` plus those with no department."""
+    department = (department or '').strip()
+    if not department:
+        return open_count_all()
+    buckets = {_department_key(department): department, _department_key(''): ''}
+    cached = cache.get_many(list(buckets))
+    for key, dept in buckets.items():
+        if key not in cached:
+            cached[key] = _count_department(dept)
+            cache.set(key, cached[key], _timeout())
+    return sum(cached.values())
+
+
+def invalidate_open_count(department: str) -> None:
+    """Drop cached counts touched by a complaint from ``department`` entering or leaving OPEN."""
+    keys = [ALL_KEY, _department_key(department)]
+
+    def drop_and_push():
+        cache.delete_many(keys)
+        push_counts(department)
+
+    transaction.on_commit(drop_and_push)
+
+
+def stream_key(user):
+    """Hub key for the count on ``user``'s badge, or None for roles without one."""
+    if user.role == 'ADMIN':
+        return STREAM_ALL
+    if user.role in ('FACULTY', 'HOD'):
+        return normalize_department(user.department) or STREAM_ALL
+    return None
+
+
+def count_for_key(key: str) -> int:
+    return open_count_all() if key == STREAM_ALL else open_count_for_department(key)
+
+
+def push_counts(department=None) -> None:
+    """Recount the streamed keys a change in ``department`` affects (all if None) and publish them.
+
+    Costs nothing while no stream is open; otherwise one (cached) count per key,
+    however many streams share it.
+    """
+    keys = hub.keys()
+    department = normalize_department(department) if department is not None else None
+    if department:
+        # Complaints without a department show up in every department's count
+        keys = [key for key in keys if key in (STREAM_ALL, department)]
+    for key in keys:
+        hub.publish(key, count_for_key(key))
+
+
+def sweep_counts() -> None:
+    """Republish every streamed count, at most once per heartbeat interval per process."""
+    if hub.sweep_due(settings.NOTIFICATIONS_STREAM_HEARTBEAT):
+        with replicas.use_replica():
+            push_counts()
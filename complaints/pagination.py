@@ -0,0 +1,141 @@
+"""Keyset (cursor) pagination for complaint listings.
+
+Pages are addressed by the ``(created_at, id)`` of their boundary row rather
+than by OFFSET, so fetching page 1 and page 10,000 costs the same index range
+scan regardless of how many rows the table holds.
+"""
+import base64
+import binascii
+from datetime import datetime
+from functools import cached_property
+
+from django.db.models import Q
+from django.utils.http import urlencode
+
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(direction: str, created_at: datetime, pk: int) -> str:
+    raw = f"{direction}|{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Return ``(direction, created_at, pk)`` or ``None`` for a malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, ts, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        created_at, pk = datetime.fromisoformat(ts), int(pk)
+        # Cursors we issue carry an aware timestamp and a pk the database can bind
+        if direction not in ('n', 'p') or created_at.tzinfo is None or not -MAX_PK <= pk <= MAX_PK:
+            return None
+        return direction, created_at, pk
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """One page of a queryset ordered newest-first on ``(created_at, id)``.
+
+    The page is evaluated lazily on first access, so a template that never
+    touches it (e.g. a cached fragment) does not hit the database.
+    """
+
+    def __init__(self, queryset, cursor=None, page_size=25, fields=('created_at', 'id'), params=None):
+        self.queryset = queryset
+        self.page_size = page_size
+        self.fields = fields
+        self.params = params or {}
+        self.cursor = decode_cursor(cursor)
+
+    def _boundary_filter(self, op, ts, pk):
+        ts_field, pk_field = self.fields
+        return Q(**{f'{ts_field}__{op}': ts}) | Q(**{ts_field: ts, f'{pk_field}__{op}': pk})
+
+    def _window_query(self):
+        ts_field, pk_field = self.fields
+        qs = self.queryset
+        backwards = bool(self.cursor) and self.cursor[0] == 'p'
+        if self.cursor:
+            _, ts, pk = self.cursor
+            qs = qs.filter(self._boundary_filter('gt' if backwards else 'lt', ts, pk))
+        if backwards:
+            qs = qs.order_by(ts_field, pk_field)
+        else:
+            qs = qs.order_by(f'-{ts_field}', f'-{pk_field}')
+        # One extra row tells us whether another page exists past this one.
+        return qs[:self.page_size + 1], backwards
+
+    @cached_property
+    def _window(self):
+        qs, backwards = self._window_query()
+        return self._settle(list(qs), backwards)
+
+    async def aload(self):
+        """Fetch the page with the async ORM, for async views; returns the page."""
+        if '_window' not in self.__dict__:
+            qs, backwards = self._window_query()
+            self.__dict__['_window'] = self._settle([row async for row in qs], backwards)
+        return self
+
+    def _settle(self, rows, backwards):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        return rows, has_more, backwards
+
+    @property
+    def object_list(self):
+        return self._window[0]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _key(self, obj):
+        ts_field, pk_field = self.fields
+        return getattr(obj, ts_field), getattr(obj, pk_field)
+
+    @property
+    def has_next(self):
+        rows, has_more, backwards = self._window
+        # Walking backwards always leaves newer-to-older pages behind us.
+        return bool(rows) and (backwards or has_more)
+
+    @property
+    def has_previous(self):
+        rows, has_more, backwards = self._window
+        return bool(rows) and self.cursor is not None and (has_more or not backwards)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return encode_cursor('n', *self._key(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        return encode_cursor('p', *self._key(self.object_list[0]))
+
+    @property
+    def next_query(self):
+        return page_querystring(self.params, self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return page_querystring(self.params, self.previous_cursor)
+
+
+def page_querystring(params: dict, cursor: str) -> str:
+    """Rebuild the listing querystring with a different cursor, keeping filters."""
+    query = {k: v for k, v in params.items() if v and k != 'cursor'}
+    if cursor:
+        query['cursor'] = cursor
+    return urlencode(query)
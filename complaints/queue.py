@@ -0,0 +1,26 @@
+"""Claiming batches of rows for background workers.
+
+Several worker processes may poll the same table. On MySQL the batch is
+picked with ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent workers take
+disjoint rows without waiting on each other. SQLite has no row locks; there
+the project runs transactions in IMMEDIATE mode (see ``DATABASES``), so the
+select-then-update below holds the database write lock and claims serialize.
+"""
+from django.db import connections, router, transaction
+
+
+def claim(queryset, limit: int, **changes):
+    """Mark up to ``limit`` rows of ``queryset`` with ``changes``; return their pks.
+
+    The UPDATE re-applies ``queryset``'s filter, so a row claimed elsewhere in
+    the meantime is never taken twice.
+    """
+    using = router.db_for_write(queryset.model)
+    with transaction.atomic(using=using):
+        candidates = queryset.using(using)
+        if connections[using].features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        pks = list(candidates.values_list('pk', flat=True)[:limit])
+        if pks:
+            queryset.using(using).filter(pk__in=pks).update(**changes)
+    return pks
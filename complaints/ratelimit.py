@@ -0,0 +1,112 @@
+"""Submission rate limits for raising complaints.
+
+Each category has a cooldown window (``COMPLAINT_CATEGORY_COOLDOWNS``,
+falling back to ``COMPLAINT_COOLDOWN``), and an optional global window
+(``COMPLAINT_GLOBAL_COOLDOWN``) spaces out complaints across categories.
+
+A student's latest filing time per category lives in one cache entry, so
+checking every category costs a single cache read. The entry is stamped with
+the student's ``last_complaint_at``, which moves on every filing; a stamp that
+no longer matches the user row marks the entry stale, and it is rebuilt from
+the complaint table with one grouped query.
+
+Submissions lock the student row before checking, so concurrent
+double-submits serialize and the second one sees the first one's complaint.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User
+from .models import Complaint, CATEGORY_CHOICES
+
+
+class RateLimited(Exception):
+    def __init__(self, category, available_at):
+        super().__init__(f'{category} is rate limited until {available_at:%Y-%m-%d %H:%M}')
+        self.category = category
+        self.available_at = available_at
+
+
+def window(category: str) -> timedelta:
+    return settings.COMPLAINT_CATEGORY_COOLDOWNS.get(category, settings.COMPLAINT_COOLDOWN)
+
+
+def _longest_window() -> timedelta:
+    windows = [window(key) for key, _ in CATEGORY_CHOICES] + [settings.COMPLAINT_GLOBAL_COOLDOWN]
+    return max(windows)
+
+
+def _cache_key(student_id: int) -> str:
+    return f'ratelimit:complaints:{student_id}'
+
+
+def _store(student_id, as_of, last):
+    cache.set(_cache_key(student_id), {'as_of': as_of, 'last': last}, _longest_window().total_seconds())
+
+
+def last_filed(user) -> dict:
+    """``{category: created_at}`` of the student's complaints still inside a window."""
+    cached = cache.get(_cache_key(user.pk))
+    if cached is not None and cached['as_of'] == user.last_complaint_at:
+        return cached['last']
+    since = timezone.now() - _longest_window()
+    rows = (
+        Complaint.objects.filter(student_id=user.pk, created_at__gte=since)
+        .order_by().values('category').annotate(last=Max('created_at'))
+    )
+    last = {row['category']: row['last'] for row in rows}
+    _store(user.pk, user.last_complaint_at, last)
+    return last
+
+
+def available_at(user, category: str, now=None):
+    """When ``user`` may next file in ``category``, or None if they may now."""
+    now = now or timezone.now()
+    last = last_filed(user)
+    candidates = []
+    if category in last:
+        candidates.append(last[category] + window(category))
+    if settings.COMPLAINT_GLOBAL_COOLDOWN and last:
+        candidates.append(max(last.values()) + settings.COMPLAINT_GLOBAL_COOLDOWN)
+    until = max(candidates, default=None)
+    return until if until and until > now else None
+
+
+def locked_categories(user, now=None) -> dict:
+    """``{category: available_at}`` for every category ``user`` cannot file in yet."""
+    now = now or timezone.now()
+    locked = {key: available_at(user, key, now) for key, _ in CATEGORY_CHOICES}
+    return {key: until for key, until in locked.items() if until}
+
+
+def next_available(user, now=None):
+    """When ``user`` may file in at least one category, or None if they may now."""
+    locked = locked_categories(user, now)
+    if len(locked) < len(CATEGORY_CHOICES):
+        return None
+    return min(locked.values())
+
+
+def acquire(user, category: str) -> None:
+    """Lock the student row and raise :class:`RateLimited` if ``category`` is closed.
+
+    Must run inside the transaction that creates the complaint.
+    """
+    locked = User.objects.select_for_update().only('last_complaint_at').get(pk=user.pk)
+    user.last_complaint_at = locked.last_complaint_at
+    until = available_at(user, category)
+    if until:
+        raise RateLimited(category, until)
+
+
+def record(user, complaint) -> None:
+    """Note a new complaint; the cache entry is replaced once the transaction commits."""
+    last = {**last_filed(user), complaint.category: complaint.created_at}
+    user.last_complaint_at = complaint.created_at
+    user.save(update_fields=['last_complaint_at'])
+    transaction.on_commit(lambda: _store(user.pk, complaint.created_at, last))
@@ -0,0 +1,217 @@
+"""Daily rollups behind the staff analytics page.
+
+:class:`DailyComplaintStat` counts complaints by the day they were filed,
+category, department and current status; :class:`DailyValidationStat`
+counts validation reviews (and how many found the complaint valid) by day,
+category and department. The analytics views read only these tables.
+
+:func:`refresh` (``manage.py rollup_stats``, e.g. every few minutes from
+cron) finds complaints updated and reviews recorded since the watermark and
+recomputes every day they touch in full, from the hot and archive tables
+alike, so reprocessing a day is harmless. The scan reaches back
+``ROLLUP_OVERLAP_SECONDS`` before the watermark to catch transactions that
+committed after a previous run had started. Complaints deleted outright,
+rather than archived, only drop out on a :func:`rebuild`, which walks the
+whole history ``ROLLUP_CHUNK_DAYS`` days per transaction.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .exports import parse_range
+from .filters import apply_filters
+from .models import (
+    ArchivedComplaint, ArchivedValidationLog, Complaint, DailyComplaintStat, DailyValidationStat,
+    RollupWatermark, ValidationLog,
+)
+
+WATERMARK = 'daily'
+GROUPINGS = ('category', 'department', 'status')
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+
+@dataclass
+class RollupResult:
+    complaint_days: int = 0
+    validation_days: int = 0
+
+
+def _start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _in_days(days, field='created_at') -> Q:
+    """``field`` falls on one of ``days``, as one range per run of consecutive days."""
+    condition = Q()
+    days = sorted(days)
+    while days:
+        first = last = days.pop(0)
+        while days and days[0] == last + timedelta(days=1):
+            last = days.pop(0)
+        condition |= Q(**{f'{field}__gte': _start(first), f'{field}__lt': _start(last + timedelta(days=1))})
+    return condition
+
+
+def _touched_days(qs) -> set:
+    return set(qs.annotate(day=TruncDate('created_at')).order_by().values_list('day', flat=True).distinct())
+
+
+def _chunks(days, size):
+    days = sorted(days)
+    for i in range(0, len(days), size):
+        yield days[i:i + size]
+
+
+def _recompute_complaints(days):
+    totals = Counter()
+    validated = Counter()
+    for model in (Complaint, ArchivedComplaint):
+        rows = (
+            model.objects.filter(_in_days(days)).annotate(day=TruncDate('created_at')).order_by()
+            .values('day', 'category', 'department', 'status')
+            .annotate(n=Count('id'), valid=Count('id', filter=Q(is_valid=True)))
+        )
+        for row in rows:
+            key = (row['day'], row['category'], row['department'], row['status'])
+            totals[key] += row['n']
+            validated[key] += row['valid']
+    DailyComplaintStat.objects.filter(day__in=days).delete()
+    DailyComplaintStat.objects.bulk_create([
+        DailyComplaintStat(
+            day=day, category=category, department=department, status=status,
+            complaints=n, validated=validated[day, category, department, status],
+        )
+        for (day, category, department, status), n in totals.items()
+    ])
+
+
+def _recompute_validations(days):
+    reviews = Counter()
+    valid = Counter()
+    for model in (ValidationLog, ArchivedValidationLog):
+        rows = (
+            model.objects.filter(_in_days(days)).annotate(day=TruncDate('created_at')).order_by()
+            .values('day', 'complaint__category', 'complaint__department')
+            .annotate(n=Count('id'), valid_n=Count('id', filter=Q(valid=True)))
+        )
+        for row in rows:
+            key = (row['day'], row['complaint__category'], row['complaint__department'])
+            reviews[key] += row['n']
+            valid[key] += row['valid_n']
+    DailyValidationStat.objects.filter(day__in=days).delete()
+    DailyValidationStat.objects.bulk_create([
+        DailyValidationStat(
+            day=day, category=category, department=department, reviews=n, valid=valid[day, category, department],
+        )
+        for (day, category, department), n in reviews.items()
+    ])
+
+
+def recompute(complaint_days=(), validation_days=()):
+    """Rebuild the given days of each table, ``ROLLUP_CHUNK_DAYS`` per transaction."""
+    for chunk in _chunks(complaint_days, settings.ROLLUP_CHUNK_DAYS):
+        with transaction.atomic():
+            _recompute_complaints(chunk)
+    for chunk in _chunks(validation_days, settings.ROLLUP_CHUNK_DAYS):
+        with transaction.atomic():
+            _recompute_validations(chunk)
+
+
+def _set_watermark(value):
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': value})
+
+
+def refresh() -> RollupResult:
+    """Fold changes since the watermark into the daily tables (a rebuild the first time)."""
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).values_list('value', flat=True).first()
+    if watermark is None:
+        return rebuild()
+    now = timezone.now()
+    since = watermark - timedelta(seconds=settings.ROLLUP_OVERLAP_SECONDS)
+    complaint_days = _touched_days(Complaint.objects.filter(updated_at__gte=since, updated_at__lt=now))
+    validation_days = _touched_days(ValidationLog.objects.filter(created_at__gte=since, created_at__lt=now))
+    recompute(complaint_days, validation_days)
+    _set_watermark(now)
+    return RollupResult(len(complaint_days), len(validation_days))
+
+
+def rebuild() -> RollupResult:
+    """Recompute every day from the first complaint to today."""
+    now = timezone.now()
+    firsts = [
+        model.objects.aggregate(first=Min('created_at'))['first']
+        for model in (Complaint, ArchivedComplaint, ValidationLog, ArchivedValidationLog)
+    ]
+    firsts = [timezone.localtime(first).date() for first in firsts if first]
+    days = []
+    if firsts:
+        day, today = min(firsts), timezone.localdate(now)
+        while day <= today:
+            days.append(day)
+            day += timedelta(days=1)
+    recompute(days, days)
+    # Days outside the history, e.g. of complaints since deleted
+    stale = ~Q(day__range=(days[0], days[-1])) if days else Q()
+    DailyComplaintStat.objects.filter(stale).delete()
+    DailyValidationStat.objects.filter(stale).delete()
+    _set_watermark(now)
+    return RollupResult(len(days), len(days))
+
+
+def parse_days(params, today=None):
+    """``(first, last)`` dates from ``since``/``until`` (both inclusive); the last 30 days by default.
+
+    Raises ValueError for a bad date or a range over ``MAX_DAYS``.
+    """
+    today = today or timezone.localdate()
+    since, until = parse_range(params)
+    last = (until - timedelta(days=1)).date() if until else today
+    first = since.date() if since else last - timedelta(days=DEFAULT_DAYS - 1)
+    if first > last:
+        raise ValueError('since must not be after until.')
+    if (last - first).days >= MAX_DAYS:
+        raise ValueError(f'At most {MAX_DAYS} days at a time.')
+    return first, last
+
+
+def trends(first, last, by='category', filters=None) -> dict:
+    """Daily complaint counts split by ``by``, and the daily validation rate, from the rollups."""
+    filters = filters or {}
+    days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+    index = {day: n for n, day in enumerate(days)}
+
+    complaints = DailyComplaintStat.objects.filter(day__range=(first, last))
+    complaints = apply_filters(complaints, {k: v for k, v in filters.items() if k in GROUPINGS})
+    series = {}
+    for row in complaints.order_by().values('day', by).annotate(n=Sum('complaints')):
+        series.setdefault(row[by], [0] * len(days))[index[row['day']]] = row['n']
+
+    # Reviews have no status of their own
+    reviews = DailyValidationStat.objects.filter(day__range=(first, last))
+    reviews = apply_filters(reviews, {k: v for k, v in filters.items() if k in ('category', 'department')})
+    rate = [None] * len(days)
+    totals = {'reviews': 0, 'valid': 0}
+    for row in reviews.order_by().values('day').annotate(reviews=Sum('reviews'), valid=Sum('valid')):
+        rate[index[row['day']]] = round(row['valid'] / row['reviews'], 4) if row['reviews'] else None
+        totals['reviews'] += row['reviews']
+        totals['valid'] += row['valid']
+
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).values_list('value', flat=True).first()
+    return {
+        'since': first,
+        'until': last,
+        'by': by,
+        'days': days,
+        'series': dict(sorted(series.items())),
+        'totals': {key: sum(counts) for key, counts in sorted(series.items())},
+        'validation_rate': rate,
+        'reviews': totals,
+        'as_of': watermark,
+    }
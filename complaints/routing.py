@@ -0,0 +1,172 @@
+"""Routing complaints to the staff responsible for them.
+
+A complaint's handlers depend on its category, the student's stream (the
+``department`` snapshot) and its level:
+
+* FACULTY complaints go to the teaching faculty who list that stream in
+  ``faculty_streams``; STUDENT ones to the student committee; STAFF ones to
+  the admin office; INFRA ones to infrastructure managers; CLEANING ones to
+  staff members;
+* from HOD level on, the HOD of the stream's department group joins, and
+  at ADMIN level the admin office;
+* a complaint nobody matches goes to the admin office.
+
+:class:`RoutingIndex` answers this from memory. It is built from one query
+over the staff profiles (``faculty_streams`` is read here, never filtered on
+in SQL) and kept per process. Saving or deleting a staff member
+(``complaints.signals``) or importing staff bumps a version number in the
+cache, and every process rebuilds its index on its next lookup.
+
+Routing results are stored in :class:`ComplaintAssignment`, which backs the
+per-staff inbox. Only unresolved complaints have rows there. Filing, triage
+and escalation re-route the complaints they change. After staff changes,
+``manage.py route_complaints`` re-routes the complaints already open.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import User
+from .models import ComplaintAssignment, Complaint
+
+VERSION_KEY = 'routing:staff:version'
+CHUNK_SIZE = 500
+
+# Department group of each stream, as offered by the staff registration form
+STREAM_GROUPS = {
+    'BCA': 'COMPUTING', 'MCA': 'COMPUTING', 'BTECH': 'COMPUTING', 'MTECH': 'COMPUTING',
+    'BSCIT': 'SST', 'MSCIT': 'SST', 'I_BSCIT': 'SST', 'I_MSCIT': 'SST',
+}
+# working_at of the first responders per category (FACULTY goes by stream)
+CATEGORY_HANDLERS = {
+    'STUDENT': 'STUDENT_COMMITTEE',
+    'STAFF': 'ADMIN_OFFICE',
+    'INFRA': 'INFRA_MANAGER',
+    'CLEANING': 'STAFF_MEMBER',
+}
+PROFILE_FIELDS = ('role', 'working_at', 'faculty_streams', 'hod_department', 'is_active')
+
+
+@dataclass
+class RoutingIndex:
+    faculty: dict = field(default_factory=dict)      # stream -> staff ids
+    hods: dict = field(default_factory=dict)         # department group -> staff ids
+    working_at: dict = field(default_factory=dict)   # working_at -> staff ids
+    admins: frozenset = frozenset()
+    routes: dict = field(default_factory=dict)       # (category, department, level) -> staff ids
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        admins = set()
+        staff = User.objects.exclude(role='STUDENT').filter(is_active=True).values_list(
+            'id', 'role', 'working_at', 'faculty_streams', 'hod_department',
+        )
+        for pk, role, working_at, streams, hod_department in staff:
+            if working_at:
+                index.working_at.setdefault(working_at, set()).add(pk)
+            if working_at == 'TEACHING_FACULTY' or role == 'FACULTY':
+                for stream in streams or ():
+                    index.faculty.setdefault(str(stream).upper(), set()).add(pk)
+            if (working_at == 'HOD' or role == 'HOD') and hod_department:
+                index.hods.setdefault(hod_department.upper(), set()).add(pk)
+            if working_at == 'ADMIN_OFFICE' or role == 'ADMIN':
+                admins.add(pk)
+        index.admins = frozenset(admins)
+        return index
+
+    @property
+    def staff_ids(self) -> set:
+        ids = set(self.admins)
+        for group in (self.faculty, self.hods, self.working_at):
+            for members in group.values():
+                ids |= members
+        return ids
+
+    def staff_for(self, category, department, level) -> tuple:
+        """Ids of the staff responsible for a complaint, memoized per key."""
+        key = (category, department, level)
+        if key not in self.routes:
+            if category == 'FACULTY':
+                staff = set(self.faculty.get(department, ()))
+            else:
+                staff = set(self.working_at.get(CATEGORY_HANDLERS.get(category), ()))
+            if level in ('HOD', 'ADMIN'):
+                staff |= self.hods.get(STREAM_GROUPS.get(department), set())
+            if level == 'ADMIN' or not staff:
+                staff |= self.admins
+            self.routes[key] = tuple(sorted(staff))
+        return self.routes[key]
+
+
+_lock = threading.Lock()
+_index, _index_version = None, None
+
+
+def get_index() -> RoutingIndex:
+    """This process's index, rebuilt if staff changed since it was built."""
+    global _index, _index_version
+    version = cache.get(VERSION_KEY, 0)
+    with _lock:
+        if _index is None or _index_version != version:
+            _index, _index_version = RoutingIndex.build(), version
+        return _index
+
+
+def staff_changed() -> None:
+    def bump():
+        cache.set(VERSION_KEY, time.time_ns(), None)
+    bump()
+    # Again once committed, in case a process rebuilt from the old rows meanwhile
+    transaction.on_commit(bump)
+
+
+def is_routed(user_id) -> bool:
+    return user_id in get_index().staff_ids
+
+
+def _assignments(index, rows):
+    return [
+        ComplaintAssignment(staff_id=staff_id, complaint_id=row['id'], complaint_created_at=row['created_at'])
+        for row in rows if row['status'] != 'CLOSED'
+        for staff_id in index.staff_for(row['category'], row['department'], row['level'])
+    ]
+
+
+def assign_new(complaint) -> None:
+    """Put a just-filed complaint in its handlers' inboxes."""
+    row = {name: getattr(complaint, name) for name in ('id', 'category', 'department', 'level', 'status', 'created_at')}
+    assignments = _assignments(get_index(), [row])
+    if assignments:
+        ComplaintAssignment.objects.bulk_create(assignments)
+
+
+def route(rows) -> int:
+    """Replace the assignments of ``rows``, complaint dicts with id, category,
+    department, level, status and created_at; return how many were written.
+    """
+    index = get_index()
+    written = 0
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        ComplaintAssignment.objects.filter(complaint_id__in=[row['id'] for row in chunk]).delete()
+        written += len(ComplaintAssignment.objects.bulk_create(_assignments(index, chunk), batch_size=CHUNK_SIZE))
+    return written
+
+
+def route_open(batch_size: int = CHUNK_SIZE) -> tuple:
+    """Re-route every unresolved complaint, one transaction per batch; ``(complaints, assignments)``."""
+    pending = Complaint.objects.exclude(status='CLOSED').order_by('pk').values(
+        'id', 'category', 'department', 'level', 'status', 'created_at',
+    )
+    complaints = written = 0
+    last = 0
+    while rows := list(pending.filter(pk__gt=last)[:batch_size]):
+        with transaction.atomic():
+            written += route(rows)
+        complaints += len(rows)
+        last = rows[-1]['id']
+    return complaints, written
@@ -0,0 +1,176 @@
+"""Full-text search over complaint titles and descriptions.
+
+SQLite keeps an FTS5 external-content table (``complaints_complaint_fts``) in
+sync through triggers on the complaint table; MySQL uses a FULLTEXT index on
+``(title, description)``. Both are created by migration 0005; it and the
+migrations that reinstall the triggers after SQLite table rebuilds carry
+their own frozen copy of the DDL. Other backends fall back to
+``icontains`` so the search page still works, just unindexed.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import connections, router
+from django.db.models import Count, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .filters import apply_filters
+from .models import Complaint, normalize_department
+
+FTS_TABLE = 'complaints_complaint_fts'
+MYSQL_MATCH = 'MATCH (title, description) AGAINST (%s IN BOOLEAN MODE)'
+MAX_TERMS = 16
+
+# Private-use markers survive HTML escaping and are swapped for <mark> tags.
+_OPEN, _CLOSE = '\x02', '\x03'
+
+
+def search_terms(query: str):
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+
+def _sqlite_match(terms):
+    # Quote every term so FTS5 operators in user input are treated as text.
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _mysql_match(terms):
+    return ' '.join(f'+{term}*' for term in terms)
+
+
+def matching(queryset, query: str):
+    """Restrict ``queryset`` to complaints matching ``query`` through the index."""
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [_sqlite_match(terms)])
+        return queryset.filter(id__in=ids)
+    if vendor == 'mysql':
+        return queryset.annotate(
+            search_score=RawSQL(MYSQL_MATCH, [_mysql_match(terms)], output_field=FloatField())
+        ).filter(search_score__gt=0)
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition)
+
+
+def _marked_html(text: str):
+    return mark_safe(escape(text).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+def _highlight(text: str, terms, width=None):
+    """Python-side highlighting for backends without FTS5's snippet()."""
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(t) for t in terms) + r')\w*', re.IGNORECASE)
+    if width and len(text) > width:
+        found = pattern.search(text)
+        start = max(0, (found.start() if found else 0) - width // 3)
+        text = ('…' if start else '') + text[start:start + width] + ('…' if start + width < len(text) else '')
+    return pattern.sub(lambda m: f'{_OPEN}{m.group(0)}{_CLOSE}', text)
+
+
+@dataclass
+class SearchHit:
+    complaint: Complaint
+    rank: float
+    title_html: str
+    snippet_html: str
+
+
+def _ranked_sqlite(filtered, terms, limit):
+    # The FTS query, the filter subquery and the row fetch all read one database
+    using = filtered.db
+    match = _sqlite_match(terms)
+    sql = (
+        f"SELECT rowid, bm25({FTS_TABLE}, 5.0, 1.0), "
+        f"highlight({FTS_TABLE}, 0, %s, %s), "
+        f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    )
+    params = [_OPEN, _CLOSE, _OPEN, _CLOSE, match]
+    if filtered.query.where:
+        inner_sql, inner_params = filtered.values('id').query.get_compiler(using).as_sql()
+        sql += f' AND rowid IN ({inner_sql})'
+        params += list(inner_params)
+    sql += ' ORDER BY 2 LIMIT %s'
+    params.append(limit)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    complaints = filtered.model.objects.using(using).in_bulk([row[0] for row in rows])
+    return [
+        # bm25() is lower-is-better; flip it so callers can sort descending.
+        SearchHit(complaints[pk], -rank, _marked_html(title), _marked_html(snippet))
+        for pk, rank, title, snippet in rows if pk in complaints
+    ]
+
+
+def _ranked_generic(filtered, terms, limit):
+    qs = matching(filtered, ' '.join(terms))
+    if connections[qs.db].vendor == 'mysql':
+        qs = qs.order_by('-search_score', '-id')
+    else:
+        qs = qs.order_by('-created_at', '-id')
+    return [
+        SearchHit(
+            c, getattr(c, 'search_score', 0.0),
+            _marked_html(_highlight(c.title, terms)),
+            _marked_html(_highlight(c.description, terms, width=160)),
+        )
+        for c in qs[:limit]
+    ]
+
+
+FACET_FIELDS = ('category', 'status', 'department')
+
+
+def facet_counts(query: str, filters: dict, using=None):
+    """Counts per facet value over the matches, each facet ignoring its own filter.
+
+    One GROUP BY over the matching rows; the per-facet views are folded in Python.
+    """
+    def accepts(field, value):
+        wanted = filters.get(field)
+        if not wanted:
+            return True
+        if field == 'department':
+            return value == normalize_department(wanted)
+        return value == wanted
+
+    dims = ['category', 'status', 'level', 'department']
+    rows = matching(Complaint.objects.using(using).order_by(), query).values(*dims).annotate(n=Count('id'))
+    facets = {name: Counter() for name in FACET_FIELDS}
+    total = 0
+    for row in rows:
+        values = {
+            'category': row['category'], 'status': row['status'], 'level': row['level'],
+            'department': row['department'],
+        }
+        passes = {field: accepts(field, value) for field, value in values.items()}
+        if all(passes.values()):
+            total += row['n']
+        for name in FACET_FIELDS:
+            if all(ok for field, ok in passes.items() if field != name):
+                facets[name][values[name]] += row['n']
+    return {name: counts.most_common() for name, counts in facets.items()}, total
+
+
+def search_complaints(query: str, filters: dict, limit: int = 50):
+    """Ranked hits plus facet counts for ``query`` under the listing ``filters``."""
+    terms = search_terms(query)
+    if not terms:
+        return {'hits': [], 'facets': {}, 'total': 0}
+    # Resolved once, so hits from the index are never looked up on another database
+    using = router.db_for_read(Complaint)
+    filtered = apply_filters(Complaint.objects.using(using), filters)
+    if connections[using].vendor == 'sqlite':
+        hits = _ranked_sqlite(filtered, terms, limit)
+    else:
+        hits = _ranked_generic(filtered, terms, limit)
+    facets, total = facet_counts(query, filters, using=using)
+    return {'hits': hits, 'facets': facets, 'total': total}
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from . import counters, routing
+from .fragments import bump_complaints_version
+from .models import ArchivedComplaint, Complaint
+from .notifications import invalidate_open_count
+from .storage import release_blob
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def retire_complaint_fragments(sender, instance, **kwargs):
+    # Queryset .update() calls skip signals and bump the version themselves.
+    bump_complaints_version()
+
+
+@receiver(post_delete, sender=Complaint)
+def uncount_complaint(sender, instance, **kwargs):
+    counters.record_deleted(instance)
+    if instance.status == 'OPEN':
+        invalidate_open_count(instance.department)
+
+
+@receiver(post_delete, sender=Complaint)
+@receiver(post_delete, sender=ArchivedComplaint)
+def release_complaint_media(sender, instance, **kwargs):
+    if instance.media_blob_id:
+        release_blob(instance.media_blob_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def rebuild_routing_index(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only; students only matter once they become staff
+    if update_fields is not None and not set(update_fields) & set(routing.PROFILE_FIELDS):
+        return
+    if instance.role != 'STUDENT' or routing.is_routed(instance.pk):
+        routing.staff_changed()
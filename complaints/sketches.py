@@ -0,0 +1,213 @@
+"""Resolution-time percentiles from incrementally maintained sketches.
+
+Every status change appended to :class:`StatusTransition` also feeds a few
+samples into :class:`DurationBucket` rows, in the same transaction:
+
+* ``TO_CLOSE``: seconds from filing to closing, under the level the
+  complaint was closed at. Reopening takes the sample back out, so a
+  complaint closed twice counts once, with its latest close;
+* ``OPEN`` / ``IN_PROCESS``: seconds spent in that status before leaving it,
+  under the level it left at.
+
+Buckets are logarithmic (as in DDSketch): a sample of ``x`` seconds lands in
+bucket ``ceil(log(x) / log(GAMMA))``, so any percentile read back is within
+``RELATIVE_ACCURACY`` of the exact value, whatever the distribution. Sketches
+add bucket-wise, which gives the per-category and overall rows for free, and
+a read touches at most a few hundred buckets per category and level however
+many complaints there are. ``rebuild_duration_sketches`` replays the whole
+log and reports drift.
+"""
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import CATEGORY_CHOICES, LEVEL_CHOICES, DurationBucket, StatusTransition
+
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+QUANTILES = (0.5, 0.9, 0.99)
+# Statuses whose dwell time is sketched; time spent CLOSED is not a backlog
+DWELL_STATUSES = ('OPEN', 'IN_PROCESS')
+CHUNK_SIZE = 500
+
+
+@dataclass(frozen=True)
+class Entry:
+    """The transition that moved a complaint into its current status."""
+    elapsed: int
+    level: str
+
+
+def bucket(seconds) -> int:
+    if seconds < 1:
+        return 0
+    return max(1, math.ceil(math.log(seconds) / math.log(GAMMA)))
+
+
+def bucket_value(index: int) -> float:
+    """A representative duration for ``index``, within ``RELATIVE_ACCURACY`` of its samples."""
+    return 0.0 if index == 0 else 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def quantile(counts: dict, q: float):
+    """The ``q`` quantile of a sketch given as ``{bucket: count}``; None when empty."""
+    total = sum(counts.values())
+    if total <= 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for index in sorted(counts):
+        seen += counts[index]
+        if seen > rank:
+            return bucket_value(index)
+    return bucket_value(max(counts))
+
+
+def samples(entry, transition):
+    """``((metric, category, level, bucket), sign)`` pairs contributed by one status change.
+
+    ``entry`` is the complaint's previous status change, or None if it has
+    not changed status since it was filed.
+    """
+    category = transition.category
+    if transition.from_status in DWELL_STATUSES:
+        dwell = transition.elapsed - (entry.elapsed if entry else 0)
+        yield (transition.from_status, category, transition.from_level, bucket(dwell)), 1
+    if transition.from_status == 'CLOSED' and entry is not None:
+        yield ('TO_CLOSE', category, entry.level, bucket(entry.elapsed)), -1
+    if transition.to_status == 'CLOSED':
+        yield ('TO_CLOSE', category, transition.to_level, bucket(transition.elapsed)), 1
+
+
+def status_changes():
+    return StatusTransition.objects.exclude(from_status=F('to_status'))
+
+
+def last_entries(complaint_ids) -> dict:
+    """``{complaint_id: Entry}`` for the latest logged status change of each complaint."""
+    complaint_ids = sorted(set(complaint_ids))
+    entries = {}
+    for start in range(0, len(complaint_ids), CHUNK_SIZE):
+        rows = (
+            status_changes().filter(complaint_id__in=complaint_ids[start:start + CHUNK_SIZE])
+            .order_by('complaint_id', 'id').values_list('complaint_id', 'elapsed', 'to_level')
+        )
+        for complaint_id, elapsed, level in rows:
+            entries[complaint_id] = Entry(elapsed, level)
+    return entries
+
+
+def _key_filter(keys) -> Q:
+    condition = Q()
+    for metric, category, level, index in keys:
+        condition |= Q(metric=metric, category=category, level=level, bucket=index)
+    return condition
+
+
+def apply_deltas(deltas: dict) -> None:
+    """Add ``{(metric, category, level, bucket): n}`` to the bucket rows, creating missing rows.
+
+    Keys sharing a delta are folded into one UPDATE per ``CHUNK_SIZE`` keys.
+    """
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    DurationBucket.objects.bulk_create([
+        DurationBucket(metric=metric, category=category, level=level, bucket=index)
+        for metric, category, level, index in deltas
+    ], ignore_conflicts=True)
+    by_delta = defaultdict(list)
+    for key, n in deltas.items():
+        by_delta[n].append(key)
+    for n, keys in by_delta.items():
+        for start in range(0, len(keys), CHUNK_SIZE):
+            DurationBucket.objects.filter(_key_filter(keys[start:start + CHUNK_SIZE])).update(count=F('count') + n)
+
+
+def record_transitions(transitions) -> None:
+    """Fold unsaved :class:`StatusTransition` objects into the sketches.
+
+    Call inside the triage transaction, before the transitions are inserted.
+    """
+    moved = [t for t in transitions if t.from_status != t.to_status]
+    if not moved:
+        return
+    entries = last_entries(t.complaint_id for t in moved)
+    deltas = Counter()
+    for transition in moved:
+        for key, sign in samples(entries.get(transition.complaint_id), transition):
+            deltas[key] += sign
+    apply_deltas(deltas)
+
+
+def compute_buckets() -> dict:
+    """Replay the whole transition log into ``{(metric, category, level, bucket): count}``."""
+    counts = Counter()
+    current, entry = None, None
+    rows = status_changes().order_by('complaint_id', 'id').only(
+        'complaint_id', 'category', 'from_status', 'to_status', 'from_level', 'to_level', 'elapsed',
+    )
+    for transition in rows.iterator(chunk_size=2000):
+        if transition.complaint_id != current:
+            current, entry = transition.complaint_id, None
+        for key, sign in samples(entry, transition):
+            counts[key] += sign
+        entry = Entry(transition.elapsed, transition.to_level)
+    return {key: n for key, n in counts.items() if n}
+
+
+def find_drift(expected: dict) -> dict:
+    """Return ``{key: (stored, expected)}`` for every bucket that disagrees."""
+    stored = {
+        (row.metric, row.category, row.level, row.bucket): row.count
+        for row in DurationBucket.objects.filter(~Q(count=0))
+    }
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(stored) | set(expected)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+
+
+def rebuild(expected: dict, batch_size: int = 1000) -> None:
+    with transaction.atomic():
+        DurationBucket.objects.all().delete()
+        DurationBucket.objects.bulk_create([
+            DurationBucket(metric=metric, category=category, level=level, bucket=index, count=n)
+            for (metric, category, level, index), n in expected.items()
+        ], batch_size=batch_size)
+
+
+def _summary(counts: dict) -> dict:
+    summary = {'count': sum(counts.values())}
+    for q in QUANTILES:
+        value = quantile(counts, q)
+        summary[f'p{round(q * 100)}'] = None if value is None else round(value)
+    return summary
+
+
+def percentiles(metric: str) -> dict:
+    """p50/p90/p99 seconds of ``metric`` per category and level, per category, and overall."""
+    sketches = defaultdict(Counter)
+    buckets = DurationBucket.objects.filter(metric=metric, count__gt=0).values_list(
+        'category', 'level', 'bucket', 'count',
+    )
+    for category, level, index, n in buckets:
+        sketches[category, level][index] += n
+        # Sketches merge by adding counts
+        sketches[category, None][index] += n
+        sketches[None, None][index] += n
+    return {
+        'metric': metric,
+        'rows': [
+            {'category': category, 'level': level, **_summary(sketches[category, level])}
+            for category, _ in CATEGORY_CHOICES
+            for level in [key for key, _ in LEVEL_CHOICES] + [None]
+            if sketches[category, level]
+        ],
+        'overall': _summary(sketches[None, None]),
+        'relative_accuracy': RELATIVE_ACCURACY,
+    }
@@ -0,0 +1,98 @@
+"""Content-addressed, reference-counted storage for complaint attachments.
+
+Each distinct file is written once under ``blobs/<aa>/<bb>/<sha256><ext>``;
+further uploads of the same bytes only bump :class:`MediaBlob.refcount`.
+Deleting a complaint releases its reference; the file and its derived
+variants are removed after the transaction that dropped the last reference
+commits.
+"""
+import hashlib
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .media import VARIANTS, variant_name
+from .models import MediaBlob
+from .uploads import EXTENSIONS, sniff_content_type
+
+
+class BlobStorage(FileSystemStorage):
+    """MEDIA_ROOT storage where a name always means the same bytes."""
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+blob_storage = BlobStorage()
+
+
+def blob_name(sha256: str, content_type: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{EXTENSIONS.get(content_type, '')}"
+
+
+def _digest(uploaded):
+    """Digest computed while streaming, or hash now for files from other handlers."""
+    sha256 = getattr(uploaded, 'sha256', None)
+    if sha256:
+        return sha256, uploaded.content_type
+    digest = hashlib.sha256()
+    head = b''
+    for chunk in uploaded.chunks():
+        head = head or chunk[:16]
+        digest.update(chunk)
+    uploaded.seek(0)
+    return digest.hexdigest(), sniff_content_type(head)
+
+
+def store_upload(uploaded) -> MediaBlob:
+    """Take a reference on the blob for ``uploaded``, writing it if it is new.
+
+    Must run inside the transaction that saves the referencing complaint. A
+    new file is only written once that transaction commits, so a rollback
+    leaves nothing on disk.
+    """
+    sha256, content_type = _digest(uploaded)
+    name = blob_name(sha256, content_type)
+    blob, created = MediaBlob.objects.select_for_update().get_or_create(
+        sha256=sha256,
+        defaults={'name': name, 'size': uploaded.size, 'content_type': content_type or ''},
+    )
+    if created or not blob_storage.exists(blob.name):
+        transaction.on_commit(lambda: _write(blob.name, uploaded))
+    MediaBlob.objects.filter(pk=sha256).update(refcount=F('refcount') + 1)
+    blob.refcount += 1
+    return blob
+
+
+def _write(name, uploaded):
+    # A concurrent upload of the same bytes may have written it first
+    if not blob_storage.exists(name):
+        blob_storage.save(name, uploaded)
+
+
+def release_blob(sha256: str) -> None:
+    """Drop one reference; reclaim the file once nothing points at it."""
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(pk=sha256).first()
+        if blob is None:
+            return
+        if blob.refcount > 1:
+            MediaBlob.objects.filter(pk=sha256).update(refcount=F('refcount') - 1)
+            return
+        blob.delete()
+
+        def reclaim():
+            # A new upload of the same bytes may have re-created the blob meanwhile.
+            if not MediaBlob.objects.filter(pk=sha256).exists():
+                blob_storage.delete(blob.name)
+                # Variants are keyed by the digest, so they go with the blob
+                for kind, _, _ in VARIANTS:
+                    blob_storage.delete(variant_name(sha256, kind))
+
+        transaction.on_commit(reclaim)
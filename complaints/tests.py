@@ -1,3 +1,1340 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models import F, Sum
+from django.contrib.sessions.models import Session
+from django.test import (
+    AsyncRequestFactory, Client, SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts import views as account_views
+from accounts.context_processors import notifications
+from core import aio, metrics, replicas
+from accounts.models import User, STREAM_CHOICES
+from . import counters, escalation, fragments, ratelimit, rollups, routing, sketches, triage, views
+from .hub import Hub, hub
+from .management.commands import process_media
+from .media import VARIANTS, Image, render_variants, variant_name
+from .notifications import invalidate_open_count, open_count_for_department
+from .pagination import KeysetPage, decode_cursor, encode_cursor
+from .models import (
+    ArchivedComplaint, ArchivedValidationLog, Complaint, ComplaintAssignment, ComplaintCounter, CreditTransaction,
+    DailyComplaintStat, MediaBlob, MediaJob, StatusTransition, ValidationLog,
+    CATEGORY_CHOICES, STATUS_CHOICES, LEVEL_CHOICES,
+)
+
+# Synthetic rows seeded for plan assertions; raise it locally to look at
+# plans closer to production volumes (e.g. QUERY_PLAN_ROWS=200000).
+QUERY_PLAN_ROWS = int(os.getenv('QUERY_PLAN_ROWS', '5000'))
+
+DEPARTMENTS = ['BCA', 'BTECH', 'MTECH', 'MSCIT', 'MBA', 'BBA', 'MCA']
+
+
+def seed_complaints(rows: int, students: int = 200):
+    users = User.objects.bulk_create([
+        User(username=f'plan-student-{i}', role='STUDENT', department=DEPARTMENTS[i % len(DEPARTMENTS)])
+        for i in range(students)
+    ])
+    categories = [key for key, _ in CATEGORY_CHOICES]
+    statuses = [key for key, _ in STATUS_CHOICES]
+    levels = [key for key, _ in LEVEL_CHOICES]
+    Complaint.objects.bulk_create([
+        Complaint(
+            student=users[i % students],
+            department=users[i % students].department,
+            category=categories[i % len(categories)],
+            status=statuses[(i // 7) % len(statuses)],
+            level=levels[(i // 11) % len(levels)],
+            title=f'Complaint {i}',
+            description='Synthetic complaint body',
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    return users
+
+
+def analyze_tables():
+    """Refresh planner statistics so plans reflect the seeded distribution."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+        elif connection.vendor == 'mysql':
+            cursor.execute(f'ANALYZE TABLE {Complaint._meta.db_table}, {User._meta.db_table}')
+
+
+class QueryPlanTests(TestCase):
+    """Hot Complaint lookups must be served by an index, never a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_complaints(QUERY_PLAN_ROWS)
+        analyze_tables()
+
+    def full_scans(self, qs, table=Complaint._meta.db_table):
+        """Return the plan lines that read every row of ``table``."""
+        sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row[-1] for row in cursor.fetchall()]
+                # "SCAN t USING [COVERING] INDEX" walks an index in order and is
+                # bounded by LIMIT; a bare "SCAN t" reads the whole table.
+                return [d for d in details if re.fullmatch(rf'SCAN {table}( AS \w+)?', d)]
+            if connection.vendor == 'mysql':
+                cursor.execute(f'EXPLAIN {sql}', params)
+                columns = [col[0] for col in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return [r for r in rows if r['table'] == table and r['type'] == 'ALL']
+        self.skipTest(f'No plan assertions for {connection.vendor}')
+
+    def assertIndexed(self, qs):
+        scans = self.full_scans(qs)
+        self.assertEqual(scans, [], f'Full table scan in plan for: {qs.query}')
+
+    def test_cooldown_lookup(self):
+        qs = Complaint.objects.filter(student=self.students[0], category='CLEANING').order_by('-created_at')[:1]
+        self.assertIndexed(qs)
+
+    def test_status_filters(self):
+        for status, _ in STATUS_CHOICES:
+            with self.subTest(status=status):
+                self.assertIndexed(Complaint.objects.filter(status=status).values('id'))
+                self.assertIndexed(Complaint.objects.filter(status=status).order_by('-created_at', '-id')[:26])
+
+    def test_notifications_department_count(self):
+        self.assertIndexed(Complaint.objects.filter(status='OPEN', department='BCA').values('id'))
+        self.assertIndexed(Complaint.objects.filter(department='BCA').order_by('-created_at', '-id')[:26])
+
+    def test_list_pages(self):
+        newest = Complaint.objects.order_by('-created_at', '-id')
+        self.assertIndexed(newest[:26])
+        self.assertIndexed(Complaint.objects.filter(student=self.students[0]).order_by('-created_at', '-id')[:26])
+        self.assertIndexed(Complaint.objects.filter(category='INFRA').order_by('-created_at', '-id')[:26])
+
+    def test_due_escalations(self):
+        self.assertIndexed(escalation.due(timezone.now()).values_list('pk', flat=True)[:500])
+
+    def test_inbox_page(self):
+        staff = self.students[:3]
+        ComplaintAssignment.objects.bulk_create([
+            ComplaintAssignment(staff=staff[n % 3], complaint_id=pk, complaint_created_at=created)
+            for n, (pk, created) in enumerate(Complaint.objects.values_list('pk', 'created_at'))
+        ], batch_size=1000)
+        analyze_tables()
+        inbox = ComplaintAssignment.objects.filter(staff=staff[0]).order_by('-complaint_created_at', '-complaint_id')
+        self.assertEqual(self.full_scans(inbox[:26], ComplaintAssignment._meta.db_table), [])
+
+
+class ViewQueryCountTests(TestCase):
+    """Per-view query budgets; a new N+1 or an extra lookup fails here first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_complaints(300, students=20)
+        cls.student = cls.students[0]
+        cls.staff = User.objects.create_user('plan-staff', password='x', role='FACULTY', department='BCA')
+        cls.admin = User.objects.create_user('plan-admin', password='x', role='ADMIN')
+        cls.complaint = Complaint.objects.filter(student=cls.student).first()
+
+    def setUp(self):
+        cache.clear()
+        caches['template_fragments'].clear()
+
+    def test_student_dashboard(self):
+        self.client.force_login(self.student)
+        # user (cached from then on), rate-limit state, counter row, recent
+        # complaints; the session comes from the cache
+        with self.assertNumQueries(4):
+            self.client.get('/dashboard/')
+
+    def test_staff_dashboard(self):
+        self.client.force_login(self.staff)
+        # user, counter rows, recent complaints
+        with self.assertNumQueries(3):
+            self.client.get('/dashboard/')
+
+    def test_staff_list(self):
+        self.client.force_login(self.staff)
+        # user, one page of complaints; rows carry the department snapshot,
+        # so the student table is not joined
+        with self.assertNumQueries(2):
+            response = self.client.get('/complaints/?status=OPEN')
+        self.assertEqual(len(response.context['complaints']), 25)
+
+    def test_student_list(self):
+        self.client.force_login(self.student)
+        # user, one page of the student's own complaints
+        with self.assertNumQueries(2):
+            self.client.get('/complaints/')
+
+    def test_complaint_detail(self):
+        self.client.force_login(self.staff)
+        # user, complaint; the department snapshot needs no student row
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/complaints/{self.complaint.id}/')
+        self.assertContains(response, self.complaint.department)
+
+    def test_create_complaint(self):
+        student = User.objects.create_user('plan-new', password='x', role='STUDENT', department='BCA')
+        self.client.force_login(student)
+        self.client.get('/complaints/new/')  # warms the rate-limit state
+        routing.get_index()
+        # user (the profile cached by the GET isn't enough to file), then
+        # savepoint, student row lock, insert, counters (insert-ignore +
+        # update), inbox assignments, user update and release
+        with self.assertNumQueries(9):
+            self.client.post('/complaints/new/INFRA/', {'category': 'INFRA', 'title': 't', 'description': 'd'})
+        self.assertTrue(Complaint.objects.filter(student=student).exists())
+
+    def test_cooldown_blocks_second_complaint(self):
+        # The seeded CLEANING complaints were all filed just now
+        self.client.force_login(self.student)
+        before = Complaint.objects.filter(student=self.student).count()
+        self.client.post('/complaints/new/CLEANING/', {'category': 'CLEANING', 'title': 't', 'description': 'd'})
+        self.assertEqual(Complaint.objects.filter(student=self.student).count(), before)
+
+    def test_notifications_processor(self):
+        request = RequestFactory().get('/')
+        request.user = self.staff
+        with self.assertNumQueries(0):
+            context = notifications(request)
+        # department bucket + unassigned bucket on a cold cache, nothing once warm
+        with self.assertNumQueries(2):
+            cold = context['notifications_count']()
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications(request)['notifications_count'](), cold)
+
+
+class KeysetPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('page-student', password='x', role='STUDENT', department='BCA')
+        Complaint.objects.bulk_create([
+            Complaint(student=cls.student, department='BCA', category='INFRA', title=f'c{i}', description='d')
+            for i in range(11)
+        ])
+        # Most rows share one created_at, so only the id breaks the tie
+        at = timezone.now() - timedelta(days=1)
+        Complaint.objects.exclude(title__in=['c0', 'c10']).update(created_at=at)
+        cls.ordered = list(Complaint.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def page(self, cursor=None):
+        return KeysetPage(Complaint.objects.all(), cursor, page_size=4)
+
+    def test_walks_forward_and_back_across_equal_timestamps(self):
+        pages, page = [], self.page()
+        while True:
+            pages.append([c.id for c in page])
+            if not page.has_next:
+                break
+            page = self.page(page.next_cursor)
+        self.assertEqual([len(ids) for ids in pages], [4, 4, 3])
+        self.assertEqual(sum(pages, []), self.ordered)
+
+        back = []
+        while page.has_previous:
+            page = self.page(page.previous_cursor)
+            back.insert(0, [c.id for c in page])
+        self.assertEqual(back, pages[:-1])
+
+    def test_first_and_last_page_boundaries(self):
+        first = self.page()
+        self.assertFalse(first.has_previous)
+        self.assertIsNone(first.previous_cursor)
+        self.assertTrue(first.has_next)
+        last = self.page(self.page(first.next_cursor).next_cursor)
+        self.assertFalse(last.has_next)
+        self.assertIsNone(last.next_cursor)
+        self.assertTrue(last.has_previous)
+        # Stepping back onto the first page ends the backward walk too
+        again = self.page(self.page(last.previous_cursor).previous_cursor)
+        self.assertEqual([c.id for c in again], [c.id for c in first])
+        self.assertFalse(again.has_previous)
+        self.assertTrue(again.has_next)
+        # A cursor past either end yields an empty page with no links
+        beyond = self.page(encode_cursor('n', *Complaint.objects.values_list('created_at', 'id').get(id=self.ordered[-1])))
+        self.assertEqual(len(beyond), 0)
+        self.assertFalse(beyond.has_next or beyond.has_previous)
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        def forged(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+        first = [c.id for c in self.page()]
+        cursors = [
+            'not a cursor', '%%%', forged('n|yesterday|1'), forged('x|2024-01-01T00:00:00+00:00|1'),
+            forged('n|2024-01-01T00:00:00+00:00'), forged('n|2024-01-01T00:00:00|1'),
+            forged('n|2024-01-01T00:00:00+00:00|' + '9' * 30), forged('p|2024-01-01T00:00:00+00:00|-' + '9' * 30),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                self.assertEqual([c.id for c in self.page(cursor)], first)
+
+        self.client.force_login(self.student)
+        for cursor in cursors:
+            with self.subTest(view=cursor):
+                response = self.client.get('/complaints/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['complaints'].has_previous)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('search-student', password='x', role='STUDENT', department='BCA')
+        cls.staff = User.objects.create_user('search-staff', password='x', role='FACULTY', department='BCA')
+        cls.leak = Complaint.objects.create(
+            student=cls.student, category='INFRA', title='Leaking roof in lab 3',
+            description='Water drips onto the <b>computers</b> whenever it rains.',
+        )
+        cls.fan = Complaint.objects.create(
+            student=cls.student, category='CLEANING', title='Dusty fans',
+            description='The ceiling fans in lab 3 have not been cleaned.', status='CLOSED',
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        from .search import matching
+        self.assertEqual(list(matching(Complaint.objects.all(), 'roof')), [self.leak])
+        self.leak.title = 'Broken window'
+        self.leak.save()
+        self.assertFalse(matching(Complaint.objects.all(), 'roof').exists())
+        self.assertEqual(list(matching(Complaint.objects.all(), 'window')), [self.leak])
+        self.fan.delete()
+        self.assertFalse(matching(Complaint.objects.all(), 'fans').exists())
+
+    def test_ranked_results_with_facets_and_snippets(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/complaints/search/', {'q': 'lab', 'status': 'OPEN'})
+        self.assertEqual([hit.complaint for hit in response.context['hits']], [self.leak])
+        self.assertEqual(response.context['total'], 1)
+        statuses = {item['label']: item['count'] for item in response.context['facets']['status']}
+        self.assertEqual(statuses, {'Open': 1, 'Closed': 1})
+        payload = self.client.get('/complaints/search/', {'q': 'computers', 'format': 'json'}).json()
+        self.assertIn('<mark>computers</mark>', payload['results'][0]['snippet'])
+        self.assertIn('&lt;b&gt;', payload['results'][0]['snippet'])
+
+    def test_reads_come_from_one_database(self):
+        from .search import search_complaints
+        # Routing is decided once: hits found by the index are fetched from the same database
+        with mock.patch.object(replicas.ReplicaRouter, 'db_for_read', return_value=None) as db_for_read:
+            results = search_complaints('lab', {})
+        self.assertEqual({hit.complaint for hit in results['hits']}, {self.leak, self.fan})
+        routed = [call.args[0] for call in db_for_read.call_args_list]
+        self.assertEqual(routed, [Complaint])
+
+    def test_students_cannot_search(self):
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get('/complaints/search/', {'q': 'lab'}), '/dashboard/')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='complaint-media-'))
+class AttachmentStorageTests(TransactionTestCase):
+    # Blob files are written and reclaimed once transactions really commit
+    PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        # Staff from earlier tests may linger in this process's routing index
+        routing.staff_changed()
+
+    def submit(self, username, category, payload, name='photo.png', content_type='image/png'):
+        student = User.objects.create_user(username, password='x', role='STUDENT', department='BCA')
+        self.client.force_login(student)
+        self.post(category, payload, name, content_type)
+        return Complaint.objects.filter(student=student).first()
+
+    def post(self, category, payload, name='photo.png', content_type='image/png'):
+        upload = SimpleUploadedFile(name, payload, content_type=content_type)
+        self.client.post(f'/complaints/new/{category}/', {
+            'category': category, 'title': 't', 'description': 'd', 'media': upload,
+        })
+
+    def blob_files(self):
+        return [name for _, _, names in os.walk(os.path.join(settings.MEDIA_ROOT, 'blobs')) for name in names]
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.submit('media-a', 'INFRA', self.PNG)
+        second = self.submit('media-b', 'INFRA', self.PNG)
+        self.assertEqual(first.media_blob_id, second.media_blob_id)
+        self.assertEqual(first.media.name, second.media.name)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        path = os.path.join(settings.MEDIA_ROOT, blob.name)
+        variants = [os.path.join(settings.MEDIA_ROOT, variant_name(blob.sha256, kind)) for kind, _, _ in VARIANTS]
+        for variant in variants:
+            os.makedirs(os.path.dirname(variant), exist_ok=True)
+            open(variant, 'wb').close()
+
+        first.delete()
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(all(os.path.exists(variant) for variant in variants))
+        second.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(any(os.path.exists(variant) for variant in variants))
+
+    def test_rolled_back_upload_leaves_no_file(self):
+        self.submit('media-e', 'INFRA', self.PNG)
+        # Fails after the blob was stored, rolling the complaint back
+        with mock.patch.object(routing, 'assign_new', side_effect=IntegrityError), self.assertRaises(IntegrityError):
+            self.submit('media-f', 'CLEANING', self.PNG + b'\x01')
+        self.assertEqual(MediaBlob.objects.count(), 1)
+        self.assertEqual(len(self.blob_files()), 1)
+
+    def test_handler_is_scoped_to_the_complaint_form(self):
+        self.assertNotIn('complaints.uploads.HashingUploadHandler', settings.FILE_UPLOAD_HANDLERS)
+        student = User.objects.create_user('media-csrf', password='x', role='STUDENT', department='BCA')
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(student)
+        upload = SimpleUploadedFile('photo.png', self.PNG, content_type='image/png')
+        response = client.post('/complaints/new/INFRA/', {
+            'category': 'INFRA', 'title': 't', 'description': 'd', 'media': upload,
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_rejects_unrecognised_content(self):
+        complaint = self.submit('media-c', 'INFRA', b'MZ' + b'\x00' * 64, name='photo.png')
+        self.assertIsNone(complaint)
+        self.assertFalse(MediaBlob.objects.exists())
+
+    @override_settings(COMPLAINT_MEDIA_MAX_BYTES=32)
+    def test_rejects_oversized_upload(self):
+        self.assertIsNone(self.submit('media-d', 'INFRA', self.PNG))
+
+
+class InlinePool:
+    """Stand-in for ProcessPoolExecutor running jobs in the test process."""
+    instances = 0
+    broken_instances = 0
+
+    def __init__(self, max_workers=None):
+        type(self).instances += 1
+        self.broken = type(self).instances <= type(self).broken_instances
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool('A child process terminated abruptly')
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@skipIf(Image is None, 'Pillow is not installed')
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='complaint-media-'))
+class MediaWorkerTests(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        InlinePool.instances = InlinePool.broken_instances = 0
+        pool = mock.patch.object(process_media, 'ProcessPoolExecutor', InlinePool)
+        pool.start()
+        self.addCleanup(pool.stop)
+        student = User.objects.create_user('media-worker', password='x', role='STUDENT', department='BCA')
+        blob = MediaBlob.objects.create(
+            sha256='c' * 64, name='blobs/cc/cc/photo.jpg', size=1, content_type='image/jpeg', refcount=1,
+        )
+        self.path = os.path.join(settings.MEDIA_ROOT, blob.name)
+        os.makedirs(os.path.dirname(self.path))
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        Image.new('RGB', (2000, 1000), 'red').save(self.path, 'JPEG', exif=exif.tobytes())
+        self.complaint = Complaint.objects.create(
+            student=student, category='INFRA', title='t', description='d', media=blob.name, media_blob=blob,
+        )
+        self.job = MediaJob.objects.create(complaint=self.complaint)
+
+    def drain(self, *args):
+        call_command('process_media', '--workers', '1', *args, stdout=StringIO())
+        self.job.refresh_from_db()
+
+    def test_render_variants_bounds_size_and_drops_metadata(self):
+        variants = render_variants(self.path, str(settings.MEDIA_ROOT), 'c' * 64)
+        self.assertEqual(
+            {kind: (v['name'], v['width'], v['height']) for kind, v in variants.items()},
+            {'thumb': (variant_name('c' * 64, 'thumb'), 320, 160),
+             'preview': (variant_name('c' * 64, 'preview'), 1280, 640)},
+        )
+        with Image.open(os.path.join(settings.MEDIA_ROOT, variants['thumb']['name'])) as thumb:
+            self.assertFalse(thumb.getexif())
+        # Rendered once per blob: a second call reuses the files
+        self.assertEqual(render_variants(self.path, str(settings.MEDIA_ROOT), 'c' * 64), variants)
+
+    def test_done_job_stores_variants(self):
+        self.drain()
+        self.assertEqual((self.job.status, self.job.attempts), ('DONE', 1))
+        self.complaint.refresh_from_db()
+        self.assertEqual(set(self.complaint.media_variants), {'thumb', 'preview'})
+
+    def test_failing_job_is_retried_then_failed(self):
+        with mock.patch.object(process_media, 'render_variants', side_effect=OSError('truncated image')):
+            self.drain('--max-attempts', '2')
+        self.assertEqual((self.job.status, self.job.attempts), ('FAILED', 2))
+        self.assertEqual(self.job.last_error, 'OSError: truncated image')
+
+    def test_broken_pool_is_replaced_and_the_batch_requeued(self):
+        InlinePool.broken_instances = 1
+        self.drain('--max-attempts', '2')
+        self.assertEqual(InlinePool.instances, 2)
+        self.assertEqual((self.job.status, self.job.attempts), ('DONE', 2))
+
+    def test_stale_jobs_out_of_attempts_are_failed(self):
+        MediaJob.objects.filter(pk=self.job.pk).update(
+            status='RUNNING', attempts=3, claimed_at=timezone.now() - timedelta(hours=1),
+        )
+        self.drain('--max-attempts', '3', '--stale-after', '60')
+        self.assertEqual((self.job.status, self.job.attempts), ('FAILED', 3))
+        self.assertEqual(self.job.last_error, 'Worker hung or died')
+
+
+class CreditLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('ledger-student', password='x', role='STUDENT', department='BCA')
+        cls.other = User.objects.create_user('ledger-other', password='x', role='STUDENT', department='MCA')
+        cls.staff = User.objects.create_user('ledger-staff', password='x', role='HOD', department='BCA')
+        cls.complaints = [
+            Complaint.objects.create(student=student, category=category, title='t', description='d')
+            for student in (cls.student, cls.other) for category in ('INFRA', 'CLEANING')
+        ]
+
+    def test_revalidating_does_not_pay_twice(self):
+        complaint = self.complaints[0]
+        self.client.force_login(self.staff)
+        for _ in range(2):
+            self.client.post(f'/complaints/{complaint.id}/validate/', {'valid': 'true'})
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.credits, 25)
+        self.assertEqual(CreditTransaction.objects.filter(complaint=complaint).count(), 1)
+        self.assertEqual(ValidationLog.objects.filter(complaint=complaint).count(), 2)
+
+    def test_bulk_validate_in_one_transaction(self):
+        self.client.force_login(self.staff)
+        ids = [c.id for c in self.complaints]
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                '/complaints/validate/bulk/', {'complaint_ids': ','.join(map(str, ids + [999999])), 'valid': 'true'},
+                HTTP_ACCEPT='application/json',
+            )
+        self.assertEqual(response.json(), {'validated': 4, 'rewarded': 4, 'credits_paid': 20, 'missing': [999999]})
+        self.assertEqual(User.objects.get(pk=self.student.pk).credits, 30)
+        self.assertEqual(User.objects.get(pk=self.other.pk).credits, 30)
+        self.assertEqual(Complaint.objects.filter(is_valid=True).count(), 4)
+        again = self.client.post('/complaints/validate/bulk/', {'complaint_ids': ids, 'valid': 'true'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(again.json()['credits_paid'], 0)
+
+    def test_students_cannot_bulk_validate(self):
+        self.client.force_login(self.student)
+        response = self.client.post('/complaints/validate/bulk/', {'complaint_ids': self.complaints[0].id, 'valid': 'true'})
+        self.assertRedirects(response, '/dashboard/')
+        self.assertFalse(ValidationLog.objects.exists())
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('counter-student', password='x', role='STUDENT', department='BCA')
+        self.complaints = [
+            Complaint.objects.create(student=self.student, category='INFRA', title='t', description='d')
+            for _ in range(2)
+        ]
+        counters.rebuild(counters.compute_counters())
+        self.addCleanup(cache.clear)
+
+    def test_check_reports_drift_and_rebuild_fixes_it(self):
+        ComplaintCounter.objects.filter(key=counters.GLOBAL_KEY).update(open=F('open') + 3)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 counter row(s) drifted.'):
+            call_command('rebuild_complaint_counters', '--check', stdout=out)
+        self.assertIn('global: open 5->2', out.getvalue())
+
+        call_command('rebuild_complaint_counters', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_complaint_counters', '--check', stdout=out)
+        self.assertIn('Counters are consistent.', out.getvalue())
+
+    def test_deleting_a_complaint_uncounts_it(self):
+        self.assertEqual(open_count_for_department('BCA'), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complaints[0].delete()
+        self.assertEqual(counters.find_drift(counters.compute_counters()), {})
+        self.assertEqual(counters.staff_counters()[counters.GLOBAL_KEY].open, 1)
+        self.assertEqual(open_count_for_department('BCA'), 1)
+
+
+class BulkTriageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('triage-staff', password='x', role='ADMIN')
+        students = [
+            User.objects.create_user(f'triage-student-{dept}', password='x', role='STUDENT', department=dept)
+            for dept in ('BCA', 'MCA')
+        ]
+        for n in range(6):
+            Complaint.objects.create(
+                student=students[n % 2], category='INFRA' if n < 4 else 'CLEANING', title='t', description='d',
+            )
+        counters.rebuild(counters.compute_counters())
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_selected_ids_in_one_request(self):
+        ids = list(Complaint.objects.filter(category='INFRA').values_list('id', flat=True))
+        response = self.client.post(
+            '/complaints/triage/', {'complaint_ids': ids, 'new_status': 'CLOSED', 'new_level': 'ADMIN'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json(), {'matched': 4, 'updated': 4, 'status_changed': 4, 'level_changed': 4})
+        self.assertEqual(Complaint.objects.filter(status='CLOSED', level='ADMIN').count(), 4)
+        self.assertEqual(counters.find_drift(counters.compute_counters()), {})
+
+    def test_filter_expression(self):
+        response = self.client.post(
+            '/complaints/triage/',
+            {'apply_to': 'filter', 'department': 'bca', 'new_status': 'IN_PROCESS'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json()['status_changed'], 3)
+        self.assertEqual(counters.staff_counters()[counters.GLOBAL_KEY].in_process, 3)
+        self.assertEqual(counters.find_drift(counters.compute_counters()), {})
+
+    def test_refuses_unfiltered_filter_mode(self):
+        response = self.client.post(
+            '/complaints/triage/', {'apply_to': 'filter', 'new_status': 'CLOSED'}, HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Complaint.objects.filter(status='CLOSED').exists())
+
+    @override_settings(BULK_ACTION_MAX_IDS=2)
+    def test_filter_mode_is_capped(self):
+        response = self.client.post(
+            '/complaints/triage/',
+            {'apply_to': 'filter', 'department': 'bca', 'new_status': 'CLOSED'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Complaint.objects.filter(status='CLOSED').exists())
+
+    def test_single_status_update_reuses_triage(self):
+        complaint = Complaint.objects.first()
+        response = self.client.post(f'/complaints/{complaint.id}/status/', {'status': 'CLOSED'})
+        self.assertRedirects(response, f'/complaints/{complaint.id}/', fetch_redirect_response=False)
+        complaint.refresh_from_db()
+        self.assertEqual((complaint.status, complaint.level), ('CLOSED', 'CLASS'))
+        self.assertEqual(self.client.post('/complaints/999999/status/', {'status': 'CLOSED'}).status_code, 404)
+
+
+class SeedAndBenchCommandTests(TestCase):
+    def test_seed_data_is_consistent(self):
+        call_command('seed_data', students=14, staff=12, complaints=300, batch_size=64, stdout=StringIO())
+        self.assertEqual(Complaint.objects.count(), 300)
+        self.assertEqual(set(User.objects.filter(role='STUDENT').values_list('stream', flat=True)), set(dict(STREAM_CHOICES)))
+        self.assertEqual(counters.find_drift(counters.compute_counters()), {})
+        valid = Complaint.objects.filter(is_valid=True).count()
+        self.assertEqual(CreditTransaction.objects.count(), valid)
+        self.assertEqual(User.objects.filter(role='STUDENT').aggregate(n=Sum('credits'))['n'], 14 * 20 + valid * 5)
+
+    def test_bench_views_cleans_up(self):
+        call_command('seed_data', students=7, staff=6, complaints=50, stdout=StringIO())
+        sessions = Session.objects.count()
+        out = StringIO()
+        call_command('bench_views', iterations=2, warmup=0, stdout=out)
+        self.assertIn('create_complaint', out.getvalue())
+        self.assertEqual(Complaint.objects.count(), 50)
+        self.assertFalse(User.objects.filter(username__startswith='bench-views-').exists())
+        self.assertEqual(Session.objects.count(), sessions)
+        self.assertEqual(counters.find_drift(counters.compute_counters()), {})
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        caches['template_fragments'].clear()
+        for histogram in metrics.HISTOGRAMS:
+            histogram.reset()
+        self.student = User.objects.create_user('metrics-student', password='x', role='STUDENT', department='BCA')
+        Complaint.objects.create(student=self.student, category='INFRA', title='t', description='d')
+        self.client.force_login(self.student)
+
+    def test_records_queries_render_time_and_size_per_url_name(self):
+        self.client.get('/complaints/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('django_request_db_queries_count{view="complaints_list"} 1', body)
+        self.assertIn('django_request_db_queries_sum{view="complaints_list"} 2.000000', body)
+        self.assertIn('django_request_duration_seconds_count{view="complaints_list",method="GET",status="200"} 1', body)
+        self.assertRegex(body, r'django_request_render_duration_seconds_sum\{view="complaints_list"\} 0\.0*[1-9]')
+        self.assertIn('django_response_size_bytes_count{view="complaints_list"} 1', body)
+        self.assertNotIn('view="metrics"', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='s3cret')
+    def test_scrape_requires_allowed_ip_or_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    @override_settings(REQUEST_QUERY_BUDGET=1)
+    def test_logs_requests_over_budget_with_sql(self):
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get('/complaints/')
+        self.assertIn('complaints_list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('frag-student', password='x', role='STUDENT', department='BCA')
+        cls.staff = User.objects.create_user('frag-staff', password='x', role='ADMIN')
+        cls.complaint = Complaint.objects.create(student=cls.student, category='INFRA', title='Leaky roof', description='d')
+
+    def setUp(self):
+        caches['template_fragments'].clear()
+
+    def test_warm_pages_skip_their_queries(self):
+        self.client.force_login(self.staff)
+        # The first request also loads the user row; its profile is cached after
+        for url, cold in (('/dashboard/', 3), ('/complaints/', 1)):
+            with self.subTest(url=url):
+                with self.assertNumQueries(cold):
+                    self.client.get(url)
+                # Session and user come from the cache
+                with self.assertNumQueries(0):
+                    self.assertContains(self.client.get(url), 'Leaky roof')
+
+    def test_writes_retire_fragments(self):
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get('/complaints/'), '<td>Open</td>')
+        self.client.get(f'/complaints/{self.complaint.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/complaints/{self.complaint.id}/status/', {'status': 'CLOSED'})
+        self.assertContains(self.client.get('/complaints/'), '<td>Closed</td>')
+        self.assertContains(self.client.get(f'/complaints/{self.complaint.id}/'), '<strong>Status:</strong> Closed')
+
+    def test_students_do_not_share_list_fragments(self):
+        other = User.objects.create_user('frag-other', password='x', role='STUDENT', department='BCA')
+        self.client.force_login(self.student)
+        self.assertContains(self.client.get('/complaints/'), 'Leaky roof')
+        self.client.force_login(other)
+        self.assertNotContains(self.client.get('/complaints/'), 'Leaky roof')
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user('limit-student', password='x', role='STUDENT', department='BCA')
+        self.client.force_login(self.student)
+
+    def post(self, category='INFRA'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/complaints/new/{category}/', {'category': category, 'title': 't', 'description': 'd'})
+
+    def test_category_window(self):
+        self.post()
+        self.post()
+        self.post('CLEANING')
+        self.assertEqual(sorted(Complaint.objects.values_list('category', flat=True)), ['CLEANING', 'INFRA'])
+        self.student.refresh_from_db()
+        self.assertEqual(set(ratelimit.locked_categories(self.student)), {'CLEANING', 'INFRA'})
+        self.assertTrue(self.student.can_raise_again())
+
+    def test_tiles_read_one_cached_entry(self):
+        self.post()
+        self.student.refresh_from_db()
+        with self.assertNumQueries(0):
+            locked = ratelimit.locked_categories(self.student)
+        self.assertEqual(list(locked), ['INFRA'])
+        response = self.client.get('/complaints/new/')
+        self.assertContains(response, 'section-tile locked', count=1)
+
+    def test_stale_cache_entry_is_rebuilt(self):
+        self.post()
+        # Another process filed a complaint; our cache entry predates it.
+        cache.set(ratelimit._cache_key(self.student.pk), {'as_of': None, 'last': {}}, 60)
+        self.post()
+        self.assertEqual(Complaint.objects.count(), 1)
+
+    @override_settings(COMPLAINT_GLOBAL_COOLDOWN=timedelta(hours=1))
+    def test_global_window(self):
+        self.post()
+        self.post('CLEANING')
+        self.assertEqual(Complaint.objects.count(), 1)
+        self.student.refresh_from_db()
+        self.assertFalse(self.student.can_raise_again())
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('async-student', password='x', role='STUDENT', department='BCA')
+        cls.staff = User.objects.create_user('async-staff', password='x', role='ADMIN')
+        cls.complaint = Complaint.objects.create(student=cls.student, category='INFRA', title='Leaky roof', description='d')
+
+    def setUp(self):
+        caches['template_fragments'].clear()
+        # The dashboards fill rate-limit entries keyed by pks later tests reuse
+        self.addCleanup(cache.clear)
+
+    def request(self, path, user):
+        request = AsyncRequestFactory().get(path)
+        request.user = user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    async def test_pages_render_like_the_sync_views(self):
+        for user in (self.student, self.staff):
+            pages = (
+                (account_views.dashboard_async, '/dashboard/', {}),
+                (views.list_complaints_async, '/complaints/?status=OPEN', {}),
+                (views.complaint_detail_async, f'/complaints/{self.complaint.id}/', {'complaint_id': self.complaint.id}),
+            )
+            for view, path, kwargs in pages:
+                with self.subTest(user=user.username, path=path):
+                    response = await view(self.request(path, user), **kwargs)
+                    self.assertContains(response, 'Leaky roof')
+
+    def test_cached_fragments_skip_their_reads(self):
+        # Sync test: assertNumQueries can't be entered from the event loop
+        pages = (
+            (account_views.dashboard_async, '/dashboard/', 'Leaky roof'),
+            (views.list_complaints_async, '/complaints/', 'Leaky roof'),
+        )
+        for view, path, text in pages:
+            with self.subTest(path=path):
+                async_to_sync(view)(self.request(path, self.staff))
+                with self.assertNumQueries(0):
+                    response = async_to_sync(view)(self.request(path, self.staff))
+                self.assertContains(response, text)
+
+    def test_fragment_evicted_before_render_still_renders_data(self):
+        # The fragment looked cached when the reads were skipped, but is gone at render time
+        with mock.patch.object(fragments, 'is_cached', return_value=True):
+            response = async_to_sync(account_views.dashboard_async)(self.request('/dashboard/', self.staff))
+        self.assertContains(response, 'Leaky roof')
+        self.assertContains(response, 'Infrastructure')
+
+    @override_settings(ASYNC_PARALLEL_QUERIES=True)
+    async def test_gather_keeps_order_on_worker_threads(self):
+        results = await aio.gather(lambda: 1, lambda: 2, lambda: 3)
+        self.assertEqual(results, [1, 2, 3])
+
+    async def test_metrics_middleware_runs_natively_under_asgi(self):
+        metrics.REQUEST_QUERIES.reset()
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get('/complaints/')
+        self.assertEqual(response.status_code, 200)
+        count, queries = metrics.REQUEST_QUERIES.totals('complaints_list')
+        self.assertEqual((count, queries), (1, 2))
+
+
+class NotificationStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('stream-student', password='x', role='STUDENT', department='BCA')
+        cls.hod = User.objects.create_user('stream-hod', password='x', role='HOD', department='BCA')
+        Complaint.objects.create(student=cls.student, category='INFRA', title='t', description='d')
+
+    def setUp(self):
+        cache.clear()
+
+    def file_complaint(self, student, queries):
+        with self.assertNumQueries(queries), self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(student=student, category='INFRA', title='t', description='d')
+            invalidate_open_count(complaint.department)
+
+    async def test_hub_hands_each_subscriber_the_latest_value(self):
+        local = Hub()
+        first, second = local.subscribe('BCA'), local.subscribe('BCA')
+        publisher = threading.Thread(target=lambda: [local.publish('BCA', n) for n in (1, 1, 2)])
+        publisher.start()
+        publisher.join()
+        await asyncio.sleep(0)
+        self.assertEqual([await first.get(1), await second.get(1)], [2, 2])
+        self.assertEqual(local.publish('BCA', 2), 0)
+        local.unsubscribe(first)
+        local.unsubscribe(second)
+        self.assertEqual(local.keys(), [])
+
+    async def test_commits_push_to_affected_streams_only(self):
+        events = views._badge_events('BCA')
+        self.assertEqual(await anext(events), 'retry: 15000\ndata: 1\n\n')
+        mba = await User.objects.acreate(username='stream-mba', role='STUDENT', department='MBA')
+        # Another department's complaint recounts nothing for this stream;
+        # one in its own department costs a single recount
+        await sync_to_async(self.file_complaint)(mba, 1)
+        await sync_to_async(self.file_complaint)(self.student, 2)
+        self.assertEqual(await asyncio.wait_for(anext(events), 1), 'data: 2\n\n')
+        await events.aclose()
+        self.assertEqual(hub.keys(), [])
+
+    async def test_view_serves_staff_only(self):
+        request = AsyncRequestFactory().get('/complaints/notifications/stream/')
+        for user, status in ((self.student, 403), (self.hod, 200)):
+            async def auser(user=user):
+                return user
+            request.user, request.auser = user, auser
+            response = await views.notifications_stream(request)
+            self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('export-student', password='x', role='STUDENT', department='BCA')
+        cls.staff = User.objects.create_user('export-staff', password='x', role='HOD', department='BCA')
+        for n in range(5):
+            Complaint.objects.create(
+                student=cls.student, category='INFRA' if n % 2 else 'CLEANING', title=f'=HYPERLINK("x") {n}',
+                description='d', status='OPEN' if n < 3 else 'CLOSED',
+            )
+        complaint = Complaint.objects.first()
+        CreditTransaction.objects.create(user=cls.student, complaint=complaint, amount=5, reason='Reward')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def download(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_filtered_csv_is_anonymized_and_batched(self):
+        body = self.download('/complaints/export/complaints/?status=OPEN&category=CLEANING').decode()
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(rows[0][:3], ['id', 'created_at', 'updated_at'])
+        self.assertNotIn('student_id', rows[0])
+        self.assertEqual([row[4] for row in rows[1:]], ['OPEN', 'OPEN'])
+        self.assertTrue(all(row[8].startswith("'=HYPERLINK") for row in rows[1:]))
+        self.assertEqual(len(self.download('/complaints/export/complaints/').decode().splitlines()), 6)
+
+    def test_gzipped_jsonl_with_date_range(self):
+        today = timezone.localdate()
+        response = self.client.get(f'/complaints/export/credits/?format=jsonl&gzip=1&since={today}&until={today}')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.jsonl.gz', response['Content-Disposition'])
+        records = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual((records[0]['amount'], records[0]['department']), (5, 'BCA'))
+        self.assertNotIn('user_id', records[0])
+        yesterday = today - timedelta(days=1)
+        self.assertEqual(self.download(f'/complaints/export/credits/?format=jsonl&until={yesterday}'), b'')
+
+    def test_rejects_students_and_bad_input(self):
+        self.assertEqual(self.client.get('/complaints/export/complaints/?since=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/complaints/export/students/').status_code, 404)
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get('/complaints/export/complaints/'), '/dashboard/')
+
+    async def test_streams_under_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get('/complaints/export/complaints/')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.decode().splitlines()), 6)
+
+    def test_command_can_include_identities(self):
+        path = os.path.join(tempfile.mkdtemp(), 'complaints.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('export_data', 'complaints', '--with-identities', '--status', 'CLOSED', '-o', path, stderr=StringIO())
+        with open(path, newline='') as handle:
+            rows = list(csv.DictReader(handle))
+        self.assertEqual({row['student_username'] for row in rows}, {'export-student'})
+        self.assertEqual(len(rows), 2)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('archive-student', password='x', role='STUDENT', department='BCA')
+        self.staff = User.objects.create_user('archive-staff', password='x', role='HOD', department='BCA')
+        blob = MediaBlob.objects.create(sha256='a' * 64, name='blobs/a', size=1, content_type='image/png', refcount=1)
+        self.old_closed = Complaint.objects.create(
+            student=self.student, category='INFRA', title='Old', description='d', status='CLOSED', media_blob=blob,
+        )
+        self.old_open = Complaint.objects.create(student=self.student, category='INFRA', title='Open', description='d')
+        self.recent_closed = Complaint.objects.create(
+            student=self.student, category='INFRA', title='Recent', description='d', status='CLOSED',
+        )
+        ValidationLog.objects.create(complaint=self.old_closed, reviewer=self.staff, valid=True)
+        CreditTransaction.objects.create(user=self.student, complaint=self.old_closed, amount=5, reason='Reward')
+        long_ago = timezone.now() - timedelta(days=400)
+        Complaint.objects.filter(pk__in=[self.old_closed.pk, self.old_open.pk]).update(updated_at=long_ago)
+
+    def test_moves_old_closed_complaints_with_their_logs(self):
+        expected_counters = counters.compute_counters()
+        out = StringIO()
+        call_command('archive_complaints', '--batch-size', '1', stdout=out)
+        self.assertIn('Archived 1 complaint(s) and 1 validation log(s) in 1 batch(es).', out.getvalue())
+
+        self.assertEqual(
+            set(Complaint.objects.values_list('pk', flat=True)), {self.old_open.pk, self.recent_closed.pk},
+        )
+        archived = ArchivedComplaint.objects.get(pk=self.old_closed.pk)
+        self.assertEqual((archived.title, archived.media_blob_id), ('Old', 'a' * 64))
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+        self.assertTrue(ArchivedValidationLog.objects.filter(complaint=archived, valid=True).exists())
+        self.assertFalse(ValidationLog.objects.exists())
+        credit = CreditTransaction.objects.get()
+        self.assertEqual((credit.complaint_id, credit.archived_complaint_id), (None, archived.pk))
+        self.assertEqual(counters.compute_counters(), expected_counters)
+
+        call_command('archive_complaints', stdout=out)
+        self.assertEqual(ArchivedComplaint.objects.count(), 1)
+
+    def test_archived_complaints_stay_readable(self):
+        call_command('archive_complaints', stdout=StringIO())
+        self.client.force_login(self.staff)
+        response = self.client.get(f'/complaints/{self.old_closed.pk}/')
+        self.assertContains(response, 'Archived complaint (read-only).')
+        self.assertNotContains(response, 'Record Validation')
+
+        body = b''.join(self.client.get('/complaints/export/complaints/?status=CLOSED').streaming_content).decode()
+        ids = [int(row[0]) for row in list(csv.reader(StringIO(body)))[1:]]
+        self.assertEqual(ids, [self.old_closed.pk, self.recent_closed.pk])
+        body = b''.join(self.client.get('/complaints/export/credits/?format=jsonl').streaming_content)
+        record = json.loads(body)
+        self.assertEqual((record['complaint_id'], record['department']), (self.old_closed.pk, 'BCA'))
+
+    def test_deleting_an_archived_complaint_releases_its_blob(self):
+        call_command('archive_complaints', stdout=StringIO())
+        ArchivedComplaint.objects.get().delete()
+        self.assertFalse(MediaBlob.objects.exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def route(self, model, **state):
+        token = replicas.current_state.set(replicas.RoutingState(**state))
+        try:
+            return replicas.ReplicaRouter().db_for_read(model)
+        finally:
+            replicas.current_state.reset(token)
+
+    def test_only_marked_unpinned_reads_of_project_models_leave_the_primary(self):
+        self.assertEqual(self.route(Complaint, replica='replica1'), 'replica1')
+        self.assertIsNone(self.route(Complaint))
+        self.assertIsNone(self.route(Complaint, replica='replica1', pinned=True))
+        self.assertIsNone(self.route(Session, replica='replica1'))
+        self.assertIsNone(self.route(User, replica='replica1'))
+        self.assertIsNone(replicas.ReplicaRouter().db_for_read(Complaint))
+        with replicas.use_replica():
+            self.assertEqual(replicas.read_alias(), 'replica1')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_MAX_LAG=7)
+class ReplicaPinningTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('pin-staff', password='x', role='HOD', department='BCA')
+        student = User.objects.create_user('pin-student', password='x', role='STUDENT', department='BCA')
+        self.complaint = Complaint.objects.create(student=student, category='INFRA', title='t', description='d')
+        self.client.force_login(self.staff)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        self.assertNotIn(replicas.PIN_COOKIE, self.client.get('/complaints/').cookies)
+        response = self.client.post(f'/complaints/{self.complaint.pk}/status/', {'status': 'IN_PROCESS', 'level': 'HOD'})
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], 7)
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=600)
+    def test_fragments_rendered_from_a_replica_expire_within_the_lag(self):
+        def reads_from_replica():
+            # As in production, where the test transaction would not keep reads on the primary
+            state = replicas.current_state.get()
+            return state is not None and state.replica is not None and not state.pinned
+
+        with mock.patch.object(replicas, 'reads_from_replica', reads_from_replica):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/complaints/{self.complaint.pk}/status/', {'status': 'CLOSED', 'level': 'HOD'})
+            # The writer is pinned to the primary; everyone else may read a lagging replica
+            self.assertEqual(self.client.get('/complaints/').context['fragment_timeout'], 600)
+            reader = Client()
+            reader.force_login(self.staff)
+            self.assertEqual(reader.get('/complaints/').context['fragment_timeout'], 7)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('rollup-staff', password='x', role='HOD', department='BCA')
+        student = User.objects.create_user('rollup-student', password='x', role='STUDENT', department='BCA')
+        self.today = timezone.localdate()
+        self.complaints = []
+        for days_ago, category in ((2, 'INFRA'), (2, 'INFRA'), (1, 'CLEANING')):
+            complaint = Complaint.objects.create(student=student, category=category, title='t', description='d')
+            at = timezone.now() - timedelta(days=days_ago)
+            Complaint.objects.filter(pk=complaint.pk).update(created_at=at, updated_at=at)
+            self.complaints.append(complaint)
+        log = ValidationLog.objects.create(complaint=self.complaints[0], reviewer=self.staff, valid=True)
+        ValidationLog.objects.create(complaint=self.complaints[2], reviewer=self.staff, valid=False)
+        ValidationLog.objects.filter(pk=log.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+    def stats(self):
+        return {
+            (row.day, row.category, row.status): row.complaints for row in DailyComplaintStat.objects.all()
+        }
+
+    @override_settings(ROLLUP_CHUNK_DAYS=1)
+    def test_refresh_folds_only_changed_days(self):
+        call_command('rollup_stats', stdout=StringIO())
+        two_ago, one_ago = self.today - timedelta(days=2), self.today - timedelta(days=1)
+        self.assertEqual(self.stats(), {(two_ago, 'INFRA', 'OPEN'): 2, (one_ago, 'CLEANING', 'OPEN'): 1})
+
+        Complaint.objects.filter(pk=self.complaints[1].pk).update(status='CLOSED', updated_at=timezone.now())
+        result = rollups.refresh()
+        self.assertEqual((result.complaint_days, result.validation_days), (1, 1))
+        self.assertEqual(self.stats(), {
+            (two_ago, 'INFRA', 'OPEN'): 1, (two_ago, 'INFRA', 'CLOSED'): 1, (one_ago, 'CLEANING', 'OPEN'): 1,
+        })
+
+        # Archiving moves rows without changing the totals
+        Complaint.objects.filter(pk=self.complaints[1].pk).update(updated_at=timezone.now() - timedelta(days=400))
+        call_command('archive_complaints', stdout=StringIO())
+        rollups.rebuild()
+        self.assertEqual(self.stats()[two_ago, 'INFRA', 'CLOSED'], 1)
+
+    def test_analytics_reads_only_the_rollups(self):
+        rollups.rebuild()
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/complaints/analytics/?format=json&by=category').json()
+        self.assertFalse([q['sql'] for q in queries if re.search(r'"complaints_(complaint|validationlog)"', q['sql'])])
+        self.assertEqual(len(data['days']), rollups.DEFAULT_DAYS)
+        self.assertEqual((data['totals'], data['series']['INFRA'][-3:]), ({'CLEANING': 1, 'INFRA': 2}, [2, 0, 0]))
+        self.assertEqual(data['validation_rate'][-3:], [1.0, None, 0.0])
+        self.assertContains(self.client.get('/complaints/analytics/?by=status'), 'Validation rate')
+
+        self.assertEqual(self.client.get('/complaints/analytics/?by=level').status_code, 400)
+        self.assertEqual(self.client.get('/complaints/analytics/?since=2020-01-01&until=2024-01-01').status_code, 400)
+        self.client.force_login(User.objects.get(username='rollup-student'))
+        self.assertRedirects(self.client.get('/complaints/analytics/'), '/dashboard/')
+
+
+class DurationSketchTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('sketch-staff', password='x', role='ADMIN')
+        self.student = User.objects.create_user('sketch-student', password='x', role='STUDENT', department='BCA')
+        self.client.force_login(self.staff)
+
+    def file(self, hours_ago, category='INFRA'):
+        complaint = Complaint.objects.create(student=self.student, category=category, title='t', description='d')
+        Complaint.objects.filter(pk=complaint.pk).update(created_at=timezone.now() - timedelta(hours=hours_ago))
+        return complaint
+
+    def test_quantiles_within_relative_accuracy(self):
+        values = [30, 600, 3600, 7200, 86400, 5 * 86400] * 50 + list(range(1, 1000, 7))
+        counts = Counter(sketches.bucket(v) for v in values)
+        values.sort()
+        for q in sketches.QUANTILES:
+            exact = values[int(q * (len(values) - 1))]
+            self.assertLessEqual(abs(sketches.quantile(counts, q) - exact), exact * sketches.RELATIVE_ACCURACY)
+        self.assertIsNone(sketches.quantile({}, 0.5))
+
+    def test_transitions_feed_sketches_incrementally(self):
+        slow, fast = self.file(48), self.file(2, category='CLEANING')
+        self.client.post(f'/complaints/{slow.id}/status/', {'status': 'IN_PROCESS', 'level': 'HOD'})
+        self.client.post('/complaints/triage/', {'complaint_ids': [slow.id, fast.id], 'new_status': 'CLOSED'})
+        # Reopening withdraws the close; closing again counts it once
+        self.client.post(f'/complaints/{fast.id}/status/', {'status': 'OPEN'})
+        self.client.post(f'/complaints/{fast.id}/status/', {'status': 'CLOSED', 'level': 'ADMIN'})
+
+        history = list(StatusTransition.objects.filter(complaint=slow).values_list(
+            'from_status', 'to_status', 'from_level', 'to_level', 'changed_by',
+        ))
+        self.assertEqual(history, [
+            ('OPEN', 'IN_PROCESS', 'CLASS', 'HOD', self.staff.pk), ('IN_PROCESS', 'CLOSED', 'HOD', 'HOD', self.staff.pk),
+        ])
+        self.assertEqual(sketches.find_drift(sketches.compute_buckets()), {})
+
+        data = self.client.get('/complaints/analytics/resolution/?format=json').json()
+        rows = {(row['category'], row['level']): row for row in data['rows']}
+        self.assertEqual(data['overall']['count'], 2)
+        self.assertEqual(set(rows), {('INFRA', 'HOD'), ('INFRA', None), ('CLEANING', 'ADMIN'), ('CLEANING', None)})
+        self.assertAlmostEqual(rows['INFRA', 'HOD']['p50'], 48 * 3600, delta=48 * 3600 * sketches.RELATIVE_ACCURACY)
+        self.assertEqual(
+            self.client.get('/complaints/analytics/resolution/?metric=OPEN&format=json').json()['overall']['count'], 3,
+        )
+        self.assertContains(self.client.get('/complaints/analytics/resolution/'), 'Time to close')
+        self.assertEqual(self.client.get('/complaints/analytics/resolution/?metric=CLOSED').status_code, 400)
+
+    def test_history_survives_archiving_and_rebuild_reports_drift(self):
+        complaint = self.file(24)
+        self.client.post(f'/complaints/{complaint.id}/status/', {'status': 'CLOSED'})
+        Complaint.objects.filter(pk=complaint.pk).update(updated_at=timezone.now() - timedelta(days=400))
+        self.file(1)  # the newest complaint is never archived
+        call_command('archive_complaints', stdout=StringIO())
+        self.assertTrue(ArchivedComplaint.objects.filter(pk=complaint.pk).exists())
+        self.assertEqual(StatusTransition.objects.filter(complaint_id=complaint.pk).count(), 1)
+
+        sketches.apply_deltas({('TO_CLOSE', 'INFRA', 'CLASS', 1): 3})
+        with self.assertRaises(CommandError):
+            call_command('rebuild_duration_sketches', '--check', stdout=StringIO())
+        call_command('rebuild_duration_sketches', stdout=StringIO())
+        call_command('rebuild_duration_sketches', '--check', stdout=StringIO())
+
+
+@override_settings(COMPLAINT_ESCALATION_HOURS={
+    '*': {'CLASS': 72, 'HOD': 120}, 'INFRA': {'CLASS': 24, 'HOD': 0},
+})
+class EscalationTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('sla-staff', password='x', role='ADMIN')
+        self.student = User.objects.create_user('sla-student', password='x', role='STUDENT', department='BCA')
+
+    def file(self, category):
+        return Complaint.objects.create(student=self.student, category=category, title='t', description='d')
+
+    def make_due(self, *complaints):
+        Complaint.objects.filter(pk__in=[c.pk for c in complaints]).update(
+            escalate_at=timezone.now() - timedelta(minutes=1),
+        )
+
+    def test_deadlines_per_category_and_level(self):
+        infra, cleaning = self.file('INFRA'), self.file('CLEANING')
+        self.assertAlmostEqual(infra.escalate_at - infra.created_at, timedelta(hours=24), delta=timedelta(seconds=5))
+        self.assertAlmostEqual(cleaning.escalate_at - cleaning.created_at, timedelta(hours=72), delta=timedelta(seconds=5))
+        untouched = self.file('STAFF')
+        self.make_due(infra, cleaning)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = escalation.run(batch_size=10)
+        self.assertEqual((result.escalated, result.batches), (2, 1))
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "complaints_complaint"')]
+        self.assertEqual(len(updates), 1)
+
+        infra.refresh_from_db()
+        cleaning.refresh_from_db()
+        untouched.refresh_from_db()
+        # INFRA's HOD step is disabled, so it stays at HOD
+        self.assertEqual((infra.level, infra.escalate_at), ('HOD', None))
+        self.assertEqual(cleaning.level, 'HOD')
+        self.assertAlmostEqual(cleaning.escalate_at - timezone.now(), timedelta(hours=120), delta=timedelta(seconds=5))
+        self.assertEqual(untouched.level, 'CLASS')
+        self.assertEqual(
+            list(StatusTransition.objects.filter(complaint=cleaning).values_list('from_level', 'to_level', 'changed_by')),
+            [('CLASS', 'HOD', None)],
+        )
+
+        self.make_due(cleaning)
+        self.assertEqual(escalation.run(batch_size=1).escalated, 1)
+        cleaning.refresh_from_db()
+        self.assertEqual((cleaning.level, cleaning.escalate_at), ('ADMIN', None))
+        self.assertEqual(escalation.run(batch_size=10).escalated, 0)
+
+    def test_triage_restarts_the_clock(self):
+        complaint = self.file('CLEANING')
+        self.make_due(complaint)
+        triage.apply(Complaint.objects.filter(pk=complaint.pk), status='IN_PROCESS', actor=self.staff)
+        complaint.refresh_from_db()
+        self.assertGreater(complaint.escalate_at, timezone.now() + timedelta(hours=71))
+        triage.apply(Complaint.objects.filter(pk=complaint.pk), status='CLOSED', actor=self.staff)
+        complaint.refresh_from_db()
+        self.assertIsNone(complaint.escalate_at)
+        self.assertEqual(escalation.run(batch_size=10).escalated, 0)
+
+    def test_backfill_schedules_older_complaints(self):
+        old, closed = self.file('CLEANING'), self.file('STAFF')
+        Complaint.objects.filter(pk=closed.pk).update(status='CLOSED')
+        Complaint.objects.update(escalate_at=None, updated_at=timezone.now() - timedelta(days=10))
+        out = StringIO()
+        call_command('escalate_complaints', '--backfill', '--batch-size', '1', stdout=out)
+        self.assertIn('Scheduled 1 existing complaint(s).', out.getvalue())
+        self.assertIn('Escalated 1 complaint(s) in 1 batch(es).', out.getvalue())
+        old.refresh_from_db()
+        self.assertEqual(old.level, 'HOD')
+        self.assertIsNone(Complaint.objects.get(pk=closed.pk).escalate_at)
+
+
+class RoutingTests(TestCase):
+    def setUp(self):
+        def staff(username, role, working_at, **profile):
+            return User.objects.create_user(username, password='x', role=role, working_at=working_at, **profile)
+        self.bca_faculty = staff('route-bca', 'FACULTY', 'TEACHING_FACULTY', faculty_streams=['BCA', 'MCA'])
+        self.sst_faculty = staff('route-sst', 'FACULTY', 'TEACHING_FACULTY', faculty_streams=['MSCIT'])
+        self.hod = staff('route-hod', 'HOD', 'HOD', hod_department='COMPUTING')
+        self.infra = staff('route-infra', 'STAFF', 'INFRA_MANAGER', infra_building='NEW')
+        self.admin = staff('route-admin', 'ADMIN', 'ADMIN_OFFICE')
+        self.student = User.objects.create_user('route-student', password='x', role='STUDENT', department='BCA')
+
+    def inbox(self, user):
+        self.client.force_login(user)
+        return [a.complaint_id for a in self.client.get('/complaints/inbox/').context['assignments']]
+
+    def test_index_rules_and_rebuild_on_profile_change(self):
+        index = routing.get_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(routing.get_index().staff_for('FACULTY', 'BCA', 'CLASS'), (self.bca_faculty.pk,))
+            self.assertEqual(index.staff_for('FACULTY', 'BCA', 'HOD'), (self.bca_faculty.pk, self.hod.pk))
+            self.assertEqual(index.staff_for('INFRA', 'MSCIT', 'ADMIN'), (self.infra.pk, self.admin.pk))
+            # Nobody handles CLEANING yet: the admin office does
+            self.assertEqual(index.staff_for('CLEANING', 'BCA', 'CLASS'), (self.admin.pk,))
+
+        self.client.force_login(self.sst_faculty)  # saves last_login only
+        self.assertIs(routing.get_index(), index)
+        self.sst_faculty.faculty_streams.append('BCA')
+        self.sst_faculty.save()
+        self.assertEqual(
+            routing.get_index().staff_for('FACULTY', 'BCA', 'CLASS'), (self.bca_faculty.pk, self.sst_faculty.pk),
+        )
+
+    def test_inbox_follows_filing_triage_and_closing(self):
+        self.client.force_login(self.student)
+        self.client.post('/complaints/new/FACULTY/', {'category': 'FACULTY', 'title': 't', 'description': 'd'})
+        complaint = Complaint.objects.get(student=self.student)
+        self.assertEqual(self.inbox(self.bca_faculty), [complaint.pk])
+        self.assertEqual((self.inbox(self.sst_faculty), self.inbox(self.hod)), ([], []))
+
+        triage.apply(Complaint.objects.filter(pk=complaint.pk), level='HOD', actor=self.admin)
+        self.assertEqual(self.inbox(self.hod), [complaint.pk])
+        triage.apply(Complaint.objects.filter(pk=complaint.pk), status='CLOSED', actor=self.admin)
+        self.assertFalse(ComplaintAssignment.objects.exists())
+
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get('/complaints/inbox/'), '/dashboard/')
+
+    @override_settings(COMPLAINTS_PAGE_SIZE=2)
+    def test_inbox_pages_on_the_assignment_index(self):
+        ids = [
+            Complaint.objects.create(student=self.student, category='INFRA', title=f't{n}', description='d').pk
+            for n in range(3)
+        ]
+        out = StringIO()
+        call_command('route_complaints', stdout=out)
+        self.assertIn('Routed 3 complaint(s) to 3 inbox assignment(s).', out.getvalue())
+
+        self.client.force_login(self.infra)
+        self.client.get('/complaints/inbox/')
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get('/complaints/inbox/').context['assignments']
+            self.assertEqual([a.complaint_id for a in first], ids[:0:-1])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"complaints_complaintassignment"."staff_id" =', queries[0]['sql'])
+        second = self.client.get(f'/complaints/inbox/?{first.next_query}').context['assignments']
+        self.assertEqual([a.complaint_id for a in second], ids[:1])
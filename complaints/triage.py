@@ -0,0 +1,111 @@
+"""Bulk status and level changes for staff triage.
+
+A triage call locks the selected complaints, then issues one UPDATE per chunk
+of ids for the rows that actually change. Counter deltas are folded per scope
+key and applied once at the end, and the notification badge is invalidated
+only for departments whose OPEN set changed. Every change is appended to
+:class:`StatusTransition` and folded into the resolution-time sketches in the
+same transaction, the SLA escalation clock (``escalate_at``) restarts at
+each changed complaint's new level, and the changed complaints are re-routed
+to their new handlers' inboxes. Chunking keeps every ``IN (...)``
+list below the backend's parameter limit, so a filter matching thousands of
+complaints is still handled in one request and one transaction.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from . import counters, routing, sketches
+from .fragments import bump_complaints_version
+from .models import STATUS_CHOICES, LEVEL_CHOICES, StatusTransition, escalation_due
+from .notifications import invalidate_open_count
+
+CHUNK_SIZE = 500
+
+
+@dataclass
+class TriageResult:
+    matched: int = 0
+    updated: int = 0
+    status_changed: int = 0
+    level_changed: int = 0
+
+
+def _escalate_at(transitions, now):
+    """The new ``escalate_at`` of each changed complaint, as a value or a CASE over their pks."""
+    due = defaultdict(list)
+    for t in transitions:
+        due[escalation_due(t.category, t.to_level, now, t.to_status)].append(t.complaint_id)
+    if len(due) == 1:
+        return next(iter(due))
+    return Case(
+        *[When(pk__in=pks, then=Value(at)) for at, pks in due.items()],
+        default=Value(None), output_field=DateTimeField(),
+    )
+
+
+def apply(queryset, status: str = None, level: str = None, actor=None) -> TriageResult:
+    """Set ``status`` and/or ``level`` on every complaint in ``queryset``, logged as changed by ``actor``."""
+    if status is not None and status not in dict(STATUS_CHOICES):
+        raise ValueError(f'Unknown status {status!r}')
+    if level is not None and level not in dict(LEVEL_CHOICES):
+        raise ValueError(f'Unknown level {level!r}')
+    changes = {name: value for name, value in (('status', status), ('level', level)) if value is not None}
+    result = TriageResult()
+    if not changes:
+        return result
+
+    now = timezone.now()
+    deltas = defaultdict(lambda: dict.fromkeys(counters.STATUS_COLUMNS.values(), 0))
+    touched_open = set()
+    with transaction.atomic():
+        # Lock in id order so overlapping triage batches cannot deadlock.
+        rows = list(
+            queryset.select_for_update().order_by('pk')
+            .values('id', 'student_id', 'category', 'department', 'status', 'level', 'created_at')
+        )
+        result.matched = len(rows)
+        changed = [row for row in rows if any(row[name] != value for name, value in changes.items())]
+        transitions = [
+            StatusTransition(
+                complaint_id=row['id'], changed_by_id=actor.pk if actor else None, category=row['category'],
+                from_status=row['status'], to_status=status or row['status'],
+                from_level=row['level'], to_level=level or row['level'],
+                elapsed=max(0, int((now - row['created_at']).total_seconds())), created_at=now,
+            )
+            for row in changed
+        ]
+        for start in range(0, len(changed), CHUNK_SIZE):
+            chunk = transitions[start:start + CHUNK_SIZE]
+            queryset.model.objects.filter(pk__in=[t.complaint_id for t in chunk]).update(
+                **changes, escalate_at=_escalate_at(chunk, now), updated_at=now,
+            )
+
+        # Before inserting: the sketches look up each complaint's previous change
+        sketches.record_transitions(transitions)
+        StatusTransition.objects.bulk_create(transitions, batch_size=CHUNK_SIZE)
+        routing.route([
+            {**row, 'status': status or row['status'], 'level': level or row['level']} for row in changed
+        ])
+
+        for row in changed:
+            if level is not None and row['level'] != level:
+                result.level_changed += 1
+            if status is None or row['status'] == status:
+                continue
+            result.status_changed += 1
+            for key in counters.scope_keys(row['category'], row['department'], row['student_id']):
+                deltas[key][counters.STATUS_COLUMNS[row['status']]] -= 1
+                deltas[key][counters.STATUS_COLUMNS[status]] += 1
+            if 'OPEN' in (row['status'], status):
+                touched_open.add((row['department'] or '').strip().lower())
+        result.updated = len(changed)
+        counters.apply_deltas(deltas)
+        if changed:
+            bump_complaints_version()
+        for department in touched_open:
+            invalidate_open_count(department)
+    return result
@@ -0,0 +1,92 @@
+"""Streaming upload handler for complaint attachments.
+
+Uploads are spooled to a temporary file chunk by chunk while a SHA-256 digest
+is computed on the fly, so the content-addressed store never has to re-read
+the file. Size and type limits are enforced as the bytes arrive: an oversized
+or unrecognised upload stops the multipart parser instead of being read to
+the end first.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+# Leading bytes identifying each accepted media type; MP4/QuickTime carry
+# their "ftyp" box four bytes in.
+MEDIA_SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+    (4, b'ftypqt', 'video/quicktime'),
+    (4, b'ftyp', 'video/mp4'),
+]
+
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'video/webm': '.webm',
+    'video/quicktime': '.mov',
+    'video/mp4': '.mp4',
+}
+
+
+def sniff_content_type(head: bytes):
+    for offset, signature, content_type in MEDIA_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    return None
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Spool to disk, hash while streaming and reject uploads over the limits.
+
+    Rejections are recorded on ``request.upload_errors`` for the view to report.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.max_bytes = settings.COMPLAINT_MEDIA_MAX_BYTES
+        # A declared body far beyond the limit cannot hold an acceptable file;
+        # refuse it as soon as the first file part starts.
+        self.body_too_large = content_length > self.max_bytes + 1024 * 1024
+        return None
+
+    def _reject(self, message):
+        errors = getattr(self.request, 'upload_errors', [])
+        errors.append(message)
+        self.request.upload_errors = errors
+        raise StopUpload(connection_reset=True)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        if getattr(self, 'body_too_large', False):
+            self._reject(f'Attachments must be smaller than {filesizeformat(self.max_bytes)}.')
+        if content_type not in settings.COMPLAINT_MEDIA_TYPES:
+            self._reject('Only image or video attachments are allowed.')
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.digest = hashlib.sha256()
+        self.sniffed_type = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            self.sniffed_type = sniff_content_type(raw_data[:16])
+            if self.sniffed_type not in settings.COMPLAINT_MEDIA_TYPES:
+                self._reject('The attachment does not look like a supported image or video.')
+        if start + len(raw_data) > self.max_bytes:
+            self._reject(f'Attachments must be smaller than {filesizeformat(self.max_bytes)}.')
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not file_size:
+            # An empty file part is treated as no attachment at all.
+            self.file.close()
+            return None
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.digest.hexdigest()
+        uploaded.content_type = self.sniffed_type
+        return uploaded
@@ -1,13 +1,33 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('', views.list_complaints, name='complaints_list'),
+    # The ASGI app (core.asgi) serves the read-heavy pages with async views
+    path(
+        '',
+        views.list_complaints_async if settings.ASYNC_VIEWS else views.list_complaints,
+        name='complaints_list',
+    ),
+    path('inbox/', views.inbox, name='complaint_inbox'),
+    path('search/', views.search, name='complaint_search'),
+    path('validate/bulk/', views.bulk_validate, name='bulk_validate'),
+    path('triage/', views.bulk_triage, name='bulk_triage'),
+    path('export/<str:kind>/', views.export, name='export'),
+    path('analytics/', views.analytics, name='analytics'),
+    path('analytics/resolution/', views.resolution_times, name='resolution_times'),
     # New: selection page first
     path('new/', views.select_category, name='select_complaint_category'),
     # Form page for a chosen category
     path('new/<str:category>/', views.create_complaint, name='create_complaint'),
-    path('<int:complaint_id>/', views.complaint_detail, name='complaint_detail'),
+    path(
+        '<int:complaint_id>/',
+        views.complaint_detail_async if settings.ASYNC_VIEWS else views.complaint_detail,
+        name='complaint_detail',
+    ),
     path('<int:complaint_id>/validate/', views.validate_complaint, name='validate_complaint'),
     path('<int:complaint_id>/status/', views.update_status, name='update_status'),
 ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns.append(path('notifications/stream/', views.notifications_stream, name='notifications_stream'))
@@ -1,19 +1,258 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
+from django.shortcuts import render, redirect, aget_object_or_404, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
-from .models import Complaint, CATEGORY_CHOICES, STATUS_CHOICES, LEVEL_CHOICES, ValidationLog, CreditTransaction
+from django.db import transaction
+from . import counters, exports, fragments, ledger, ratelimit, rollups, routing, sketches, triage
+from .hub import hub
+from .notifications import count_for_key, invalidate_open_count, stream_key, sweep_counts
+from .models import (
+    ArchivedComplaint, Complaint, ComplaintAssignment, CATEGORY_CHOICES, DURATION_METRIC_CHOICES, STATUS_CHOICES,
+    LEVEL_CHOICES, MediaJob,
+)
+from .filters import clean_filters, apply_filters
+from .pagination import KeysetPage
+from .search import search_complaints
+from .storage import store_upload
+from .uploads import HashingUploadHandler
 from accounts.models import User
+from core import replicas
+from core.replicas import replica_reads
 
+@replica_reads
 @login_required
 def list_complaints(request):
+    context = _list_context(request)
+    context.update(fragments.context())
+    return render(request, 'complaints/list.html', context)
+
+
+@replica_reads
+@login_required
+async def list_complaints_async(request):
+    """:func:`list_complaints` for the ASGI app; the page is read with the async ORM."""
+    request.user = await request.auser()
+    context = _list_context(request)
+    context.update(await sync_to_async(fragments.context)())
+    cached = await sync_to_async(fragments.is_cached)(
+        'complaint_list', context['complaints_version'], context['list_scope'], request.GET.urlencode(),
+    )
+    if not cached:
+        await context['complaints'].aload()
+    return await sync_to_async(render)(request, 'complaints/list.html', context)
+
+
+def _list_context(request):
+    # Builds the page lazily; nothing here touches the database
+    filters = clean_filters(request.GET)
     if request.user.role == 'STUDENT':
-        qs = Complaint.objects.filter(student=request.user).order_by('-created_at')
-        context = {'complaints': qs, 'is_staff_view': False}
+        qs = Complaint.objects.filter(student_id=request.user.pk)
+        is_staff_view = False
     else:
-        qs = Complaint.objects.all().select_related('student').order_by('-created_at')
-        context = {'complaints': qs, 'is_staff_view': True}
-    return render(request, 'complaints/list.html', context)
+        qs = Complaint.objects.all()
+        is_staff_view = True
+    qs = apply_filters(qs, filters)
+    page = KeysetPage(qs, request.GET.get('cursor'), settings.COMPLAINTS_PAGE_SIZE, params=filters)
+    return {
+        'complaints': page,
+        'is_staff_view': is_staff_view,
+        # Staff share one rendering of each page; students see only their own
+        'list_scope': 'staff' if is_staff_view else f'student:{request.user.pk}',
+        'filters': filters,
+        'categories': CATEGORY_CHOICES,
+        'statuses': STATUS_CHOICES,
+        'levels': LEVEL_CHOICES,
+    }
+
+@replica_reads
+@login_required
+def inbox(request):
+    """Unresolved complaints routed to the signed-in staff member, newest first."""
+    if request.user.role == 'STUDENT':
+        messages.error(request, 'Only staff have an inbox.')
+        return redirect('dashboard')
+    assignments = ComplaintAssignment.objects.filter(staff_id=request.user.pk).select_related('complaint')
+    page = KeysetPage(
+        assignments, request.GET.get('cursor'), settings.COMPLAINTS_PAGE_SIZE,
+        fields=('complaint_created_at', 'complaint_id'),
+    )
+    return render(request, 'complaints/inbox.html', {'assignments': page})
+
+
+@replica_reads
+@login_required
+def search(request):
+    """Ranked full-text search over complaints for staff, with facet counts."""
+    if request.user.role == 'STUDENT':
+        messages.error(request, 'Only staff can search complaints.')
+        return redirect('dashboard')
+    query = (request.GET.get('q') or '').strip()
+    filters = clean_filters(request.GET)
+    results = search_complaints(query, filters)
+    labels = {'category': dict(CATEGORY_CHOICES), 'status': dict(STATUS_CHOICES), 'department': {}}
+    facets = {}
+    for name, counts in results['facets'].items():
+        current = (filters.get(name) or '').upper()
+        facets[name] = []
+        for value, count in counts:
+            selected = bool(current) and current == value.upper()
+            # Facet links toggle their own filter and keep everything else
+            params = {**filters, 'q': query, name: '' if selected else value}
+            facets[name].append({
+                'label': labels[name].get(value) or value or 'Unassigned',
+                'count': count,
+                'selected': selected,
+                'query': urlencode({k: v for k, v in params.items() if v}),
+            })
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'query': query,
+            'total': results['total'],
+            'facets': results['facets'],
+            'results': [
+                {
+                    'id': hit.complaint.id,
+                    'rank': hit.rank,
+                    'category': hit.complaint.category,
+                    'status': hit.complaint.status,
+                    'title': hit.title_html,
+                    'snippet': hit.snippet_html,
+                }
+                for hit in results['hits']
+            ],
+        })
+    return render(request, 'complaints/search.html', {
+        'query': query,
+        'filters': filters,
+        'hits': results['hits'],
+        'total': results['total'],
+        'facets': facets,
+    })
+
+@replica_reads
+@login_required
+def analytics(request):
+    """Complaint trends and the validation rate for staff, read only from the daily rollups.
+
+    ``?format=json`` returns the same series as JSON.
+    """
+    if request.user.role == 'STUDENT':
+        messages.error(request, 'Only staff can view analytics.')
+        return redirect('dashboard')
+    by = request.GET.get('by') or 'category'
+    if by not in rollups.GROUPINGS:
+        return HttpResponseBadRequest('by must be category, department or status.')
+    try:
+        first, last = rollups.parse_days(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    filters = clean_filters(request.GET)
+    data = rollups.trends(first, last, by, filters)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+    labels = {'category': dict(CATEGORY_CHOICES), 'status': dict(STATUS_CHOICES)}.get(by, {})
+    columns = list(data['series'])
+    return render(request, 'complaints/analytics.html', {
+        **data,
+        'filters': filters,
+        'groupings': rollups.GROUPINGS,
+        'categories': CATEGORY_CHOICES,
+        'statuses': STATUS_CHOICES,
+        'headers': [labels.get(key) or key or 'Unassigned' for key in columns],
+        'rows': [
+            (day, [data['series'][key][n] for key in columns], data['validation_rate'][n])
+            for n, day in enumerate(data['days'])
+        ],
+        'column_totals': [data['totals'][key] for key in columns],
+    })
+
+
+def _duration(seconds):
+    """``3d 4h``, ``5h 20m``, ``12m`` or ``40s``."""
+    if seconds is None:
+        return '—'
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f'{days}d {hours}h'
+    if hours:
+        return f'{hours}h {minutes}m'
+    return f'{minutes}m' if minutes else f'{secs}s'
+
+
+@replica_reads
+@login_required
+def resolution_times(request):
+    """p50/p90/p99 time to close (or time open / in process) per category and level, from the sketches.
+
+    ``?format=json`` returns the same numbers, in seconds.
+    """
+    if request.user.role == 'STUDENT':
+        messages.error(request, 'Only staff can view analytics.')
+        return redirect('dashboard')
+    metric = request.GET.get('metric') or 'TO_CLOSE'
+    if metric not in dict(DURATION_METRIC_CHOICES):
+        return HttpResponseBadRequest('metric must be TO_CLOSE, OPEN or IN_PROCESS.')
+    data = sketches.percentiles(metric)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+    categories, levels = dict(CATEGORY_CHOICES), dict(LEVEL_CHOICES)
+    percentiles = [f'p{round(q * 100)}' for q in sketches.QUANTILES]
+    return render(request, 'complaints/resolution.html', {
+        **data,
+        'metrics': DURATION_METRIC_CHOICES,
+        'metric_label': dict(DURATION_METRIC_CHOICES)[metric],
+        'percentiles': percentiles,
+        'table': [
+            (
+                categories[row['category']], levels.get(row['level'], 'All levels'), row['count'],
+                [_duration(row[p]) for p in percentiles],
+            )
+            for row in data['rows']
+        ],
+        'overall_cells': [_duration(data['overall'][p]) for p in percentiles],
+        'accuracy_percent': round(data['relative_accuracy'] * 100),
+    })
+
+
+@replica_reads
+@login_required
+def export(request, kind):
+    """Stream complaints, validations or credit transactions as CSV/JSONL for staff.
+
+    Takes the list filters plus ``since``/``until`` dates, ``format`` and
+    ``gzip=1``; students stay anonymous (see :mod:`complaints.exports`).
+    """
+    if request.user.role == 'STUDENT':
+        messages.error(request, 'Only staff can export complaints.')
+        return redirect('dashboard')
+    if kind not in exports.EXPORTS:
+        raise Http404('Unknown export.')
+    fmt = request.GET.get('format') or 'csv'
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest('format must be csv or jsonl.')
+    try:
+        since, until = exports.parse_range(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    compress = request.GET.get('gzip') == '1'
+    # Bound now: the rows are read after this view (and its routing) returned
+    chunks = exports.stream(
+        kind, fmt, compress, clean_filters(request.GET), since, until, using=replicas.read_alias(),
+    )
+    if isinstance(request, ASGIRequest):
+        chunks = exports.aiterate(chunks)
+    content_type = 'application/gzip' if compress else f'{exports.FORMATS[fmt]}; charset=utf-8'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{exports.filename(kind, fmt, compress)}"'
+    return response
 
 @login_required
 def select_category(request):
@@ -31,11 +270,24 @@ def select_category(request):
         {'value': 'STUDENT', 'title': 'Student Behaviour', 'emoji': '🧑\u200d🎓', 'label': labels.get('STUDENT', 'Student Behavior')},
         {'value': 'CLEANING', 'title': 'Cleaning Complaint', 'emoji': '🧹', 'label': labels.get('CLEANING', 'Cleaning')},
     ]
+    # One cache read (or one grouped query) covers every tile
+    locked = ratelimit.locked_categories(user)
+    for tile in tiles:
+        tile['available_at'] = locked.get(tile['value'])
     return render(request, 'complaints/select_category.html', {'tiles': tiles})
 
 
 @login_required
+@csrf_exempt
 def create_complaint(request, category=None):
+    # Attachment limits apply to this form only. The handlers must be swapped
+    # before anything reads request.POST, so the CSRF check runs afterwards.
+    request.upload_handlers = [HashingUploadHandler(request)]
+    return _create_complaint(request, category)
+
+
+@csrf_protect
+def _create_complaint(request, category=None):
     user: User = request.user
     if user.role != 'STUDENT':
         messages.error(request, 'Only students can create complaints.')
@@ -53,19 +305,24 @@ def create_complaint(request, category=None):
 
     if request.method == 'POST':
         category = request.POST.get('category') or category
-        # Enforce 5-day cooldown per category
-        last = Complaint.objects.filter(student=user, category=category).order_by('-created_at').first()
-        if last and timezone.now() < last.created_at + timezone.timedelta(days=5):
-            messages.error(request, 'You can raise a new complaint in this section after 5 days.')
+        upload_errors = getattr(request, 'upload_errors', None)
+        if upload_errors:
+            messages.error(request, upload_errors[0])
             return redirect('create_complaint', category=category)
         title = request.POST.get('title')
         description = request.POST.get('description')
         media = request.FILES.get('media')
-        complaint = Complaint.objects.create(
-            student=user, category=category, title=title, description=description, media=media
-        )
-        user.last_complaint_at = timezone.now()
-        user.save(update_fields=['last_complaint_at'])
+        try:
+            with transaction.atomic():
+                # Locks the student row, so a double-submit waits here and is refused
+                ratelimit.acquire(user, category)
+                complaint = _file_complaint(user, category, title, description, media)
+        except ratelimit.RateLimited as exc:
+            messages.error(
+                request,
+                f'You can raise a new complaint in this section after {exc.available_at:%Y-%m-%d %H:%M} UTC.',
+            )
+            return redirect('create_complaint', category=category)
         messages.success(request, 'Complaint submitted!')
         return redirect('complaint_detail', complaint_id=complaint.id)
 
@@ -78,49 +335,232 @@ def create_complaint(request, category=None):
     })
 
 
+def _file_complaint(user, category, title, description, media):
+    blob = store_upload(media) if media else None
+    complaint = Complaint.objects.create(
+        student=user, category=category, title=title, description=description,
+        media=blob.name if blob else None, media_blob=blob,
+    )
+    if blob and blob.content_type.startswith('image/'):
+        # Previews are rendered by the process_media worker, off the request path
+        MediaJob.objects.create(complaint=complaint)
+    counters.record_created(complaint)
+    routing.assign_new(complaint)
+    invalidate_open_count(complaint.department)
+    ratelimit.record(user, complaint)
+    return complaint
+
+
+@replica_reads
 @login_required
 def complaint_detail(request, complaint_id):
-    c = get_object_or_404(Complaint, id=complaint_id)
-    # Ensure anonymity: staff can't see student identity; only their department
-    student_dept = c.student.department
-    context = {'complaint': c, 'student_dept': student_dept if request.user.role != 'STUDENT' else None}
-    return render(request, 'complaints/detail.html', context)
+    # Archived complaints are shown read-only
+    c = Complaint.objects.filter(id=complaint_id).first() or get_object_or_404(ArchivedComplaint, id=complaint_id)
+    return render(request, 'complaints/detail.html', _detail_context(request, c))
+
+
+@replica_reads
+@login_required
+async def complaint_detail_async(request, complaint_id):
+    """:func:`complaint_detail` for the ASGI app."""
+    request.user = await request.auser()
+    c = await Complaint.objects.filter(id=complaint_id).afirst() or await aget_object_or_404(
+        ArchivedComplaint, id=complaint_id,
+    )
+    return await sync_to_async(render)(request, 'complaints/detail.html', _detail_context(request, c))
+
+
+def _detail_context(request, c):
+    # Ensure anonymity: staff can't see student identity; only their department,
+    # read from the complaint's snapshot so the student row is never loaded
+    return {
+        'complaint': c,
+        'complaint_version': fragments.complaint_version(c),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'student_dept': c.department if request.user.role != 'STUDENT' else None,
+        'archived': isinstance(c, ArchivedComplaint),
+    }
+
+
+@login_required
+async def notifications_stream(request):
+    """Server-sent events carrying the user's notification badge count.
+
+    Routed only under ASGI: under WSGI the endless stream would hold a
+    worker for as long as the tab stays open.
+    """
+    user = await request.auser()
+    key = stream_key(user)
+    if key is None:
+        return HttpResponseForbidden('No notifications for this role.')
+    response = StreamingHttpResponse(_badge_events(key), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _badge_events(key):
+    # The current count, then every change pushed through the hub, with a
+    # keep-alive comment whenever the stream is idle for a heartbeat
+    heartbeat = settings.NOTIFICATIONS_STREAM_HEARTBEAT
+    subscription = hub.subscribe(key)
+    try:
+        count = await sync_to_async(count_for_key)(key)
+        yield f'retry: {heartbeat * 1000}\ndata: {count}\n\n'
+        while True:
+            try:
+                count = await subscription.get(heartbeat)
+            except TimeoutError:
+                await sync_to_async(sweep_counts)()
+                yield ': keep-alive\n\n'
+            else:
+                yield f'data: {count}\n\n'
+    finally:
+        hub.unsubscribe(subscription)
+
+
+STAFF_ROLES = ['FACULTY', 'HOD', 'ADMIN', 'STAFF']
+
+
+def _wants_json(request):
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+
+def _posted_ids(request):
+    """Complaint ids from repeated ``complaint_ids`` fields or one comma-separated value."""
+    raw = []
+    for value in request.POST.getlist('complaint_ids'):
+        raw.extend(value.split(','))
+    return [int(v) for v in raw if v.strip().isdigit()]
+
+
+def _redirect_back(request):
+    """Return to the (filtered) listing the bulk form was posted from."""
+    target = request.POST.get('next', '')
+    if target and url_has_allowed_host_and_scheme(
+        target, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return redirect(target)
+    return redirect('complaints_list')
 
 
 @login_required
 def validate_complaint(request, complaint_id):
     # Allow all staff roles to validate (FACULTY, HOD, ADMIN, STAFF)
-    if request.user.role not in ['FACULTY', 'HOD', 'ADMIN', 'STAFF']:
+    if request.user.role not in STAFF_ROLES:
         messages.error(request, 'Not authorized to validate complaints.')
         return redirect('dashboard')
-    c = get_object_or_404(Complaint, id=complaint_id)
     valid = request.POST.get('valid') == 'true'
     note = request.POST.get('note', '')
-    c.is_valid = valid
-    c.save(update_fields=['is_valid'])
-    ValidationLog.objects.create(complaint=c, reviewer=request.user, valid=valid, note=note)
-    if valid:
-        c.student.credits += 5
-        c.student.save(update_fields=['credits'])
-        CreditTransaction.objects.create(user=c.student, amount=5, reason='Valid Complaint Reward')
+    result = ledger.record_validations([complaint_id], request.user, valid, note)
+    if result.missing:
+        raise Http404('No Complaint matches the given query.')
     messages.success(request, 'Validation recorded.')
     return redirect('complaint_detail', complaint_id=complaint_id)
 
 
+@login_required
+@require_POST
+def bulk_validate(request):
+    """Validate many complaints in one transaction."""
+    if request.user.role not in STAFF_ROLES:
+        if _wants_json(request):
+            return JsonResponse({'error': 'Not authorized to validate complaints.'}, status=403)
+        messages.error(request, 'Not authorized to validate complaints.')
+        return redirect('dashboard')
+    ids = _posted_ids(request)
+    if len(ids) > settings.BULK_ACTION_MAX_IDS:
+        message = f'At most {settings.BULK_ACTION_MAX_IDS} complaints can be validated at once.'
+        if _wants_json(request):
+            return JsonResponse({'error': message}, status=400)
+        messages.error(request, message)
+        return redirect('complaints_list')
+    valid = request.POST.get('valid') == 'true'
+    result = ledger.record_validations(ids, request.user, valid, request.POST.get('note', ''))
+    if _wants_json(request):
+        return JsonResponse({
+            'validated': len(result.validated),
+            'rewarded': len(result.rewarded),
+            'credits_paid': result.credits_paid,
+            'missing': result.missing,
+        })
+    messages.success(
+        request,
+        f'Validation recorded for {len(result.validated)} complaint(s); '
+        f'{len(result.rewarded)} newly rewarded.',
+    )
+    return _redirect_back(request)
+
+
 @login_required
 def update_status(request, complaint_id):
     # Allow all staff roles to update status as well
-    if request.user.role not in ['FACULTY', 'HOD', 'ADMIN', 'STAFF']:
+    if request.user.role not in STAFF_ROLES:
         messages.error(request, 'Not authorized to update status.')
         return redirect('dashboard')
-    c = get_object_or_404(Complaint, id=complaint_id)
     status = request.POST.get('status')
-    level = request.POST.get('level', c.level)
-    if status in dict(STATUS_CHOICES):
-        c.status = status
-    if level in dict(LEVEL_CHOICES):
-        c.level = level
-    c.save(update_fields=['status', 'level'])
+    level = request.POST.get('level')
+    result = triage.apply(
+        Complaint.objects.filter(id=complaint_id),
+        status=status if status in dict(STATUS_CHOICES) else None,
+        level=level if level in dict(LEVEL_CHOICES) else None,
+        actor=request.user,
+    )
+    if not result.matched:
+        raise Http404('No Complaint matches the given query.')
     messages.success(request, 'Status updated.')
     return redirect('complaint_detail', complaint_id=complaint_id)
 
+
+@login_required
+@require_POST
+def bulk_triage(request):
+    """Change status and/or level for selected complaints or everything matching the filters."""
+    def fail(message, status=400):
+        if _wants_json(request):
+            return JsonResponse({'error': message}, status=status)
+        messages.error(request, message)
+        return redirect('dashboard') if status == 403 else _redirect_back(request)
+
+    if request.user.role not in STAFF_ROLES:
+        return fail('Not authorized to update status.', status=403)
+    status = request.POST.get('new_status') or None
+    level = request.POST.get('new_level') or None
+    if status is not None and status not in dict(STATUS_CHOICES):
+        return fail('Unknown status.')
+    if level is not None and level not in dict(LEVEL_CHOICES):
+        return fail('Unknown level.')
+    if status is None and level is None:
+        return fail('Choose a status or level to apply.')
+
+    if request.POST.get('apply_to') == 'filter':
+        filters = clean_filters(request.POST)
+        if not filters:
+            return fail('Refusing to triage every complaint; narrow the filters first.')
+        queryset = apply_filters(Complaint.objects.all(), filters)
+        # Same cap as the id path: one transaction locks every match
+        ids = list(queryset.values_list('pk', flat=True)[:settings.BULK_ACTION_MAX_IDS + 1])
+        if len(ids) > settings.BULK_ACTION_MAX_IDS:
+            return fail(
+                f'More than {settings.BULK_ACTION_MAX_IDS} complaints match; narrow the filters or select them page by page.'
+            )
+        queryset = queryset.filter(pk__in=ids)
+    else:
+        ids = _posted_ids(request)
+        if not ids:
+            return fail('Select at least one complaint.')
+        if len(ids) > settings.BULK_ACTION_MAX_IDS:
+            return fail(f'At most {settings.BULK_ACTION_MAX_IDS} complaints can be updated at once.')
+        queryset = Complaint.objects.filter(pk__in=ids)
+
+    result = triage.apply(queryset, status=status, level=level, actor=request.user)
+    if _wants_json(request):
+        return JsonResponse({
+            'matched': result.matched,
+            'updated': result.updated,
+            'status_changed': result.status_changed,
+            'level_changed': result.level_changed,
+        })
+    messages.success(request, f'Updated {result.updated} of {result.matched} complaint(s).')
+    return _redirect_back(request)
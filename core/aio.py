@@ -0,0 +1,40 @@
+"""Helpers for the async views served by the ASGI app.
+
+Django's async ORM still runs every query through ``sync_to_async`` on the
+request's single sync thread, so awaiting several of them together only lets
+*other* requests run in the meantime. :func:`gather` can instead put each
+independent read on its own worker thread, and therefore its own database
+connection, so the queries of one request overlap as well.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import metrics
+
+
+def _on_worker_thread(func):
+    def run():
+        try:
+            with metrics.track_queries():
+                return func()
+        finally:
+            # Worker threads outlive the request; don't leave connections behind
+            close_old_connections()
+    return run
+
+
+async def gather(*funcs):
+    """Call independent, read-only blocking callables concurrently; results in order.
+
+    With ``ASYNC_PARALLEL_QUERIES`` each runs on a worker thread with its own
+    connection (outside any transaction the request holds, so use it only
+    for reads). Otherwise they run one after another on the request thread.
+    """
+    if settings.ASYNC_PARALLEL_QUERIES:
+        calls = [sync_to_async(_on_worker_thread(func), thread_sensitive=False) for func in funcs]
+    else:
+        calls = [sync_to_async(func) for func in funcs]
+    return await asyncio.gather(*(call() for call in calls))
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Serve the read-heavy pages with their async views (see core.settings)
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
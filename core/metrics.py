@@ -0,0 +1,177 @@
+"""In-process request metrics exposed in the Prometheus text format.
+
+:class:`core.middleware.RequestMetricsMiddleware` fills the histograms below
+once per request, labelled by the resolved URL name. Every worker process
+keeps its own registry, so scrape each worker (or run a single one per
+scrape target) when serving with several processes.
+"""
+import bisect
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# How many statements a request keeps for the over-budget log line.
+MAX_RECORDED_QUERIES = 50
+
+
+@dataclass
+class RequestStats:
+    """What one request did; collected by the middleware and the template backend."""
+    queries: int = 0
+    db_time: float = 0.0
+    render_time: float = 0.0
+    statements: list = field(default_factory=list)
+    # Async views may run a request's queries on several threads at once
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record_query(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.db_time += duration
+            if len(self.statements) < MAX_RECORDED_QUERIES:
+                self.statements.append((duration, sql))
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+
+@contextmanager
+def track_queries(stats: Optional[RequestStats] = None):
+    """Record the queries this thread runs, on every connection, into ``stats``.
+
+    Defaults to the current request's stats; does nothing outside a request.
+    Connections are per thread, so code that queries from another thread
+    (see :func:`core.aio.gather`) enters this there as well.
+    """
+    stats = stats or current_stats.get()
+    if stats is None:
+        yield
+        return
+
+    def wrapper(execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.record_query(sql, time.perf_counter() - began)
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        yield
+
+
+def record_render(duration: float) -> None:
+    stats = current_stats.get()
+    if stats is not None:
+        stats.render_time += duration
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def totals(self, *label_values):
+        """``(count, sum)`` observed for one label combination."""
+        with self._lock:
+            series = self._series.get(label_values)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        with self._lock:
+            series = {labels: ([*counts], total, n) for labels, (counts, total, n) in self._series.items()}
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, n) in sorted(series.items()):
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            prefix = base + ',' if base else ''
+            running = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                running += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {running}')
+            suffix = f'{{{base}}}' if base else ''
+            lines.append(f'{self.name}_sum{suffix} {total:.6f}')
+            lines.append(f'{self.name}_count{suffix} {n}')
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_LATENCY = Histogram(
+    'django_request_duration_seconds', 'Wall time spent handling the request.',
+    LATENCY_BUCKETS, ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'django_request_db_queries', 'SQL statements executed per request.', QUERY_BUCKETS, ('view',),
+)
+REQUEST_DB_TIME = Histogram(
+    'django_request_db_duration_seconds', 'Time spent in SQL per request.', LATENCY_BUCKETS, ('view',),
+)
+REQUEST_RENDER_TIME = Histogram(
+    'django_request_render_duration_seconds', 'Time spent rendering templates per request.',
+    LATENCY_BUCKETS, ('view',),
+)
+RESPONSE_SIZE = Histogram(
+    'django_response_size_bytes', 'Size of non-streaming response bodies.', SIZE_BUCKETS, ('view',),
+)
+HISTOGRAMS = [REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, REQUEST_RENDER_TIME, RESPONSE_SIZE]
+
+
+def observe_request(view, method, status, elapsed, stats: RequestStats, size=None):
+    REQUEST_LATENCY.observe(elapsed, view, method, str(status))
+    REQUEST_QUERIES.observe(stats.queries, view)
+    REQUEST_DB_TIME.observe(stats.db_time, view)
+    REQUEST_RENDER_TIME.observe(stats.render_time, view)
+    if size is not None:
+        RESPONSE_SIZE.observe(size, view)
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, limited to METRICS_ALLOWED_IPS or a bearer token."""
+    token = settings.METRICS_TOKEN
+    authorized = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        authorized = True
+    if not authorized:
+        return HttpResponseForbidden('Forbidden\n', content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,127 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics, replicas
+
+logger = logging.getLogger('core.metrics')
+
+
+class RequestMetricsMiddleware:
+    """Count queries, DB time, render time and response size per URL name.
+
+    Results feed the histograms in :mod:`core.metrics`. Requests over
+    ``REQUEST_QUERY_BUDGET`` queries or ``REQUEST_LATENCY_BUDGET_MS`` are
+    logged as warnings together with their SQL. Works under both WSGI and
+    ASGI, so async views are not forced back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = metrics.RequestStats()
+        token = metrics.current_stats.set(stats)
+        began = time.perf_counter()
+        try:
+            with metrics.track_queries(stats):
+                response = self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        return self.finish(request, response, time.perf_counter() - began, stats)
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_stats.set(stats)
+        # Sync code of an ASGI request, the async ORM included, runs on one
+        # thread per request; the query wrapper has to be installed there.
+        tracking = metrics.track_queries(stats)
+        began = time.perf_counter()
+        await sync_to_async(tracking.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(tracking.__exit__)(None, None, None)
+            metrics.current_stats.reset(token)
+        return self.finish(request, response, time.perf_counter() - began, stats)
+
+    def finish(self, request, response, elapsed, stats):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unresolved'
+        if view == 'metrics':
+            return response
+        size = None if response.streaming else len(response.content)
+        metrics.observe_request(view, request.method, response.status_code, elapsed, stats, size)
+        self.check_budget(request, view, elapsed, stats)
+        return response
+
+    def check_budget(self, request, view, elapsed, stats):
+        over_queries = stats.queries > settings.REQUEST_QUERY_BUDGET
+        over_time = elapsed * 1000 > settings.REQUEST_LATENCY_BUDGET_MS
+        if not (over_queries or over_time):
+            return
+        statements = '\n'.join(
+            f'  {duration * 1000:8.2f} ms  {sql}'
+            for duration, sql in sorted(stats.statements, key=lambda item: item[0], reverse=True)
+        )
+        logger.warning(
+            'Request over budget: %s %s (%s) took %.0f ms, %d queries (%.0f ms SQL, %.0f ms render)\n%s',
+            request.method, request.path, view, elapsed * 1000, stats.queries,
+            stats.db_time * 1000, stats.render_time * 1000, statements,
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """Give each request the :mod:`core.replicas` routing state.
+
+    Views marked with ``replica_reads`` read from a replica unless the client
+    carries the ``db_primary`` cookie, which is set for
+    ``DATABASE_REPLICA_MAX_LAG`` seconds on any response whose request wrote.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = replicas.RoutingState(pinned=replicas.PIN_COOKIE in request.COOKIES)
+        token = replicas.current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.current_state.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = replicas.RoutingState(pinned=replicas.PIN_COOKIE in request.COOKIES)
+        token = replicas.current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.current_state.reset(token)
+        return self.finish(response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = replicas.current_state.get()
+        if state is not None and getattr(view_func, 'replica_reads', False):
+            state.replica = replicas.choose_replica()
+
+    def finish(self, response, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                replicas.PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_MAX_LAG, httponly=True, samesite='Lax',
+            )
+        return response
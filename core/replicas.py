@@ -0,0 +1,94 @@
+"""Read replicas (``DATABASE_REPLICAS``) for the reporting pages.
+
+Reads stay on the primary unless the view is marked with
+:func:`replica_reads` (dashboards, listings, detail, exports) or run inside
+:func:`use_replica`. Writes always go to the primary, and a client that just
+wrote gets a ``db_primary`` cookie keeping its reads there for
+``DATABASE_REPLICA_MAX_LAG`` seconds, so the page it is redirected to shows
+its own write. Reads inside a transaction stay on the primary too, as do the
+session, auth and content-type tables: only this project's apps are routed,
+and of those not the user model, so ``request.user`` is never read stale.
+
+The state lives in a context variable set per request by
+:class:`core.middleware.ReplicaRoutingMiddleware`; it is a mutable object so
+sync_to_async threads (and core.aio.gather workers) share it.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary'
+ROUTED_APPS = {'accounts', 'complaints'}
+
+
+@dataclass
+class RoutingState:
+    # The client wrote within the last DATABASE_REPLICA_MAX_LAG seconds
+    pinned: bool = False
+    # Replica this request reads from, if its view allows it
+    replica: str | None = None
+    wrote: bool = False
+
+
+current_state = ContextVar('replica_routing', default=None)
+
+
+def replica_reads(view):
+    """Mark ``view`` as safe to serve from a replica."""
+    view.replica_reads = True
+    return view
+
+
+def choose_replica():
+    return random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+@contextmanager
+def use_replica():
+    """Route the block's reads to a replica, outside a marked view or after it returned."""
+    outer = current_state.get()
+    token = current_state.set(RoutingState(pinned=bool(outer and outer.pinned), replica=choose_replica()))
+    try:
+        yield
+    finally:
+        current_state.reset(token)
+
+
+def read_alias() -> str:
+    """Database the current context reads from."""
+    state = current_state.get()
+    if state is None or state.replica is None or state.pinned:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return state.replica
+
+
+def reads_from_replica() -> bool:
+    return read_alias() != DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS and model._meta.label != settings.AUTH_USER_MODEL:
+            alias = read_alias()
+            if alias != DEFAULT_DB_ALIAS:
+                return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None and model._meta.app_label in ROUTED_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -49,11 +50,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its query count and latency cover the rest of the stack
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware with request.user served from a cached profile
+    'accounts.usercache.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,7 +67,8 @@ ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for the request metrics
+        'BACKEND': 'core.template_backend.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -103,9 +109,73 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock when a transaction starts so concurrent
+                # workers serialize instead of failing with "database is locked"
+                # when a read transaction tries to upgrade.
+                'transaction_mode': 'IMMEDIATE',
+            },
         }
     }
 
+# Read replicas for the reporting pages (core.replicas): MySQL hosts as
+# host[:port] sharing the primary's credentials, or SQLite files kept in sync
+# with `manage.py sync_sqlite_replicas` for local testing. Tests read the
+# primary through them (TEST MIRROR).
+if DB_ENGINE == 'mysql':
+    for n, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+        name, _, port = host.strip().partition(':')
+        DATABASES[f'replica{n}'] = {
+            **DATABASES['default'], 'HOST': name, 'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    for n, path in enumerate(filter(None, os.getenv('DB_REPLICA_FILES', '').split(',')), start=1):
+        DATABASES[f'replica{n}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / path.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Seconds replicas may trail the primary: a client that wrote reads from the
+# primary this long, and counts read from a replica are cached no longer
+DATABASE_REPLICA_MAX_LAG = int(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+
+
+# Cache
+# Local-memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) when running
+# several worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'complaint-portal'),
+    },
+    # Rendered template fragments ({% cache %}); e.g. FileBasedCache with a
+    # directory as FRAGMENT_CACHE_LOCATION to share them between processes
+    'template_fragments': {
+        'BACKEND': os.getenv('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('FRAGMENT_CACHE_LOCATION', 'complaint-fragments'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', '5000'))},
+    },
+}
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+# Seconds a logged-in user's cached profile (accounts.usercache) may live
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '600'))
+
+# Seconds a cached OPEN-complaint count may live before being recounted
+NOTIFICATIONS_CACHE_TIMEOUT = int(os.getenv('NOTIFICATIONS_CACHE_TIMEOUT', '300'))
+# Seconds between keep-alives on the badge stream; each process also re-reads
+# the streamed counts this often to pick up other processes' writes
+NOTIFICATIONS_STREAM_HEARTBEAT = int(os.getenv('NOTIFICATIONS_STREAM_HEARTBEAT', '15'))
+
+# Seconds a rendered fragment is kept; fragments are versioned, so this only
+# bounds how long retired versions occupy the cache
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', '600'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -149,11 +219,74 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Complaint attachments are streamed through a hashing handler, installed by
+# the create_complaint view, and stored once per distinct content (see
+# complaints.storage)
+COMPLAINT_MEDIA_MAX_BYTES = int(os.getenv('COMPLAINT_MEDIA_MAX_BYTES', str(25 * 1024 * 1024)))
+COMPLAINT_MEDIA_TYPES = [
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp',
+    'video/mp4', 'video/quicktime', 'video/webm',
+]
+
 # Auth redirects
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Complaint listings use keyset pagination; rows per page
+COMPLAINTS_PAGE_SIZE = int(os.getenv('COMPLAINTS_PAGE_SIZE', '25'))
+
+# Complaint submission rate limits (complaints.ratelimit): a cooldown per
+# category, optional per-category overrides, e.g. {'CLEANING': timedelta(days=1)},
+# and a minimum gap between any two complaints (0 disables it)
+COMPLAINT_COOLDOWN = timedelta(days=int(os.getenv('COMPLAINT_COOLDOWN_DAYS', '5')))
+COMPLAINT_CATEGORY_COOLDOWNS = {}
+COMPLAINT_GLOBAL_COOLDOWN = timedelta(hours=int(os.getenv('COMPLAINT_GLOBAL_COOLDOWN_HOURS', '0')))
+
+# Upper bound on complaints touched by one bulk staff action
+BULK_ACTION_MAX_IDS = int(os.getenv('BULK_ACTION_MAX_IDS', '5000'))
+
+# Rows fetched per query by the streaming exports (complaints.exports)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# CLOSED complaints untouched for this many days are moved to the archive
+# tables by `manage.py archive_complaints`, this many per transaction
+COMPLAINT_ARCHIVE_AFTER_DAYS = int(os.getenv('COMPLAINT_ARCHIVE_AFTER_DAYS', '365'))
+COMPLAINT_ARCHIVE_BATCH_SIZE = int(os.getenv('COMPLAINT_ARCHIVE_BATCH_SIZE', '500'))
+
+# Daily rollups behind the analytics page (complaints.rollups): how far each
+# refresh re-reads before its watermark, for transactions that committed
+# late, and how many days one rebuild transaction covers
+ROLLUP_OVERLAP_SECONDS = int(os.getenv('ROLLUP_OVERLAP_SECONDS', '300'))
+ROLLUP_CHUNK_DAYS = int(os.getenv('ROLLUP_CHUNK_DAYS', '31'))
+
+# SLA escalation (manage.py escalate_complaints): hours a complaint may sit
+# untouched at CLASS, then at HOD, before moving up a level; 0 disables that
+# step. ESCALATION_CATEGORY_HOURS overrides per category, e.g. INFRA:24:48
+COMPLAINT_ESCALATION_HOURS = {
+    '*': dict(zip(('CLASS', 'HOD'), map(int, os.getenv('ESCALATION_HOURS', '72,120').split(',')))),
+}
+for spec in filter(None, os.getenv('ESCALATION_CATEGORY_HOURS', '').split(',')):
+    category, class_hours, hod_hours = spec.split(':')
+    COMPLAINT_ESCALATION_HOURS[category.strip().upper()] = {'CLASS': int(class_hours), 'HOD': int(hod_hours)}
+COMPLAINT_ESCALATION_BATCH_SIZE = int(os.getenv('ESCALATION_BATCH_SIZE', '500'))
+
+# Request metrics (served at /metrics in the Prometheus text format)
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Requests above either budget are logged with their SQL by core.middleware
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', '30'))
+REQUEST_LATENCY_BUDGET_MS = int(os.getenv('REQUEST_LATENCY_BUDGET_MS', '500'))
+
+# Set by core.asgi: route the dashboard, list and detail pages to their async
+# views and enable the notification badge stream, which needs ASGI
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() == 'true'
+# Let async views run independent reads on separate connections in parallel
+# (core.aio.gather). Off by default on SQLite, where reads gain little from it.
+ASYNC_PARALLEL_QUERIES = os.getenv(
+    'ASYNC_PARALLEL_QUERIES', 'true' if DB_ENGINE == 'mysql' else 'false'
+).lower() == 'true'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,30 @@
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+from .metrics import record_render
+
+
+class TimedTemplate:
+    """Wraps a backend template so top-level renders count towards request render time."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        began = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            record_render(time.perf_counter() - began)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))